@@ -0,0 +1,87 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+benchmarks/import_time.py : measure the cold import time of pysic modules
+
+Each target is imported in a fresh interpreter, so that module caching does not hide the cost of the import. The
+interpreter start-up time (python -c 'pass') is measured the same way and subtracted.
+
+USAGE:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py -n 20 pysic.property.si pysic.core
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "import_time.py measures the cold import time of pysic modules"
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+targets = ['pysic', 'pysic.property.si', 'pysic.property.sw', 'pysic.property', 'pysic.core']
+heavy_modules = ['pandas', 'scipy', 'matplotlib', 'openpyxl', 'xarray']
+n_repeat = 10
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(statement):
+    """
+    :param statement: string, python statement to execute in a fresh interpreter
+    :return: float, wall time in second
+    """
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], check=True, cwd=ROOT_DIR)
+    return time.perf_counter() - t0
+
+
+def loaded_heavy_modules(target):
+    """
+    List the heavy dependencies imported as a side effect of importing target
+    :param target: string, module name
+    :return: list of string
+    """
+    statement = 'import sys, %s; print(",".join(m for m in %r if m in sys.modules))' % (target, heavy_modules)
+    out = subprocess.run([sys.executable, '-c', statement], check=True, cwd=ROOT_DIR, capture_output=True, text=True)
+    return list(filter(None, out.stdout.strip().split(',')))
+
+
+def import_time(target, n_repeat=n_repeat):
+    """
+    Median cold import time of a module, interpreter start-up excluded
+    :param target: string, module name
+    :param n_repeat: int, number of fresh interpreter to start
+    :return: float, import time in second
+    """
+    t_base = np.median([_run('pass') for _ in range(n_repeat)])
+    t_import = np.median([_run('import %s' % target) for _ in range(n_repeat)])
+    return max(t_import - t_base, 0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold import time of pysic modules')
+    parser.add_argument('targets', nargs='*', default=targets)
+    parser.add_argument('-n', '--repeat', type=int, default=n_repeat)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for target in args.targets:
+        results[target] = import_time(target, n_repeat=args.repeat)
+        heavy = loaded_heavy_modules(target)
+        print('%-24s %8.1f ms   heavy: %s' % (target, results[target] * 1e3, ', '.join(heavy) if heavy else '-'))
+    return results
+
+
+if __name__ == '__main__':
+    main()
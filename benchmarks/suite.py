@@ -0,0 +1,529 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+benchmarks/suite.py : benchmark suite for pysic
+
+Time ice core import (spreadsheet version 1.0, 1.1 and MOSAiC), stacking, discretization, statistics, orientation and
+the property kernels on a synthetic dataset generated by benchmarks/synthetic.py. Results are stored as json in
+benchmarks/results and compared with a reference run, by default the previous run at the same scale. A benchmark slower
+than the reference by more than the threshold is reported as a regression.
+
+USAGE:
+    python benchmarks/suite.py
+    python benchmarks/suite.py -n 50 -r 5 -k import discretize
+    python benchmarks/suite.py --compare benchmarks/results/20261018-120000.json --fail
+    python benchmarks/suite.py -k import --trace pysic_trace.json
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "suite.py times pysic core operations and property kernels on synthetic ice cores"
+
+import argparse
+import contextlib
+import datetime
+import glob
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synthetic
+
+RESULT_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'results')
+
+n_core = 12
+n_point = 100000
+n_repeat = 3
+threshold = 0.2
+seed = 0
+dy = 0.1
+
+
+# setup
+def make_context(dirpath, n_core=n_core, n_point=n_point, seed=seed):
+    """
+    Generate the synthetic dataset and the intermediate products shared by the benchmarks
+    :param dirpath: string, directory of the synthetic dataset
+    :param n_core: int, number of core per spreadsheet version
+    :param n_point: int, size of the arrays passed to the property kernels
+    :param seed: int, seed of the random generator
+    :return: dict
+    """
+    import pysic.core
+    from pysic.core.corestack import stack_cores
+
+    ctx = {'dirpath': dirpath}
+    ctx['ic_paths'] = synthetic.make_dataset(os.path.join(dirpath, 'source'), n_core=n_core, seed=seed)
+    ctx['ics_dict'] = pysic.core.import_ic_list(ctx['ic_paths'][1.1])
+    ctx['ic_stack'] = stack_cores(ctx['ics_dict'])
+
+    y_max = np.ceil(ctx['ic_stack'].y_sup.max() / dy) * dy
+    ctx['y_bins'] = np.round(np.arange(0, y_max + dy / 2, dy), 3)
+    ctx['y_mid'] = (ctx['y_bins'][1:] + ctx['y_bins'][:-1]) / 2
+    ctx['ic_stack_d'] = ctx['ic_stack'].discretize(y_bins=ctx['y_bins'], y_mid=ctx['y_mid'])
+
+    rng = np.random.RandomState(seed)
+    ctx['s'] = rng.uniform(2, 12, n_point)
+    ctx['t'] = rng.uniform(-20, -2, n_point)
+    return ctx
+
+
+# benchmarks
+def bench_import_ic_path(version, fast_xlsx=True):
+    def setup(ctx):
+        return ctx['ic_paths'][version]
+
+    def run(ic_paths):
+        import pysic.core
+        from pysic.tools import xlsx
+        enabled = xlsx.ENABLED
+        xlsx.ENABLED = fast_xlsx
+        try:
+            for ic_path in ic_paths:
+                pysic.core.import_ic_path(ic_path)
+        finally:
+            xlsx.ENABLED = enabled
+    return setup, run
+
+
+def bench_import_ic_list(prefetch=0):
+    def setup(ctx):
+        return ctx['ic_paths'][1.1]
+
+    def run(ic_paths):
+        import pysic.core
+        pysic.core.import_ic_list(ic_paths, prefetch=prefetch)
+    return setup, run
+
+
+def bench_import_ic_table():
+    def setup(ctx):
+        path = os.path.join(ctx['dirpath'], 'ic_stack.csv')
+        ctx['ic_stack'].to_csv(path, index=False)
+        return path
+
+    def run(path):
+        from pysic.core import tabular
+        tabular.import_ic_table(path)
+    return setup, run
+
+
+def bench_stack_cores():
+    def setup(ctx):
+        return ctx['ics_dict']
+
+    def run(ics_dict):
+        from pysic.core.corestack import stack_cores
+        stack_cores(ics_dict)
+    return setup, run
+
+
+def bench_discretize_profile():
+    def setup(ctx):
+        ic_stack = ctx['ic_stack']
+        return ic_stack[ic_stack.name == ic_stack.names()[0]], ctx['y_bins'], ctx['y_mid']
+
+    def run(args):
+        from pysic.core.profile import discretize_profile
+        profile, y_bins, y_mid = args
+        discretize_profile(profile, y_bins=y_bins, y_mid=y_mid)
+    return setup, run
+
+
+def bench_discretize(n_worker=1):
+    def setup(ctx):
+        return ctx['ic_stack'], ctx['y_bins'], ctx['y_mid']
+
+    def run(args):
+        ic_stack, y_bins, y_mid = args
+        ic_stack.discretize(y_bins=y_bins, y_mid=y_mid, n_worker=n_worker)
+    return setup, run
+
+
+def bench_grouped_stat(n_worker=1):
+    def setup(ctx):
+        return ctx['ic_stack_d'].copy(), ctx['y_bins']
+
+    def run(args):
+        from pysic.core.corestack import grouped_stat
+        ic_stack, y_bins = args
+        grouped_stat(ic_stack, groups=[{'y_mid': y_bins}], variables=['salinity', 'temperature'],
+                     stats=['min', 'mean', 'max', 'std'], dropemptyrow=True, n_worker=n_worker)
+    return setup, run
+
+
+def bench_set_orientation():
+    def setup(ctx):
+        return ctx['ic_stack']
+
+    def run(ic_stack):
+        ic_stack.set_orientation('bottom')
+    return setup, run
+
+
+def bench_check():
+    def setup(ctx):
+        return ctx['ic_stack']
+
+    def run(ic_stack):
+        ic_stack.check()
+    return setup, run
+
+
+def bench_to_netcdf():
+    def setup(ctx):
+        return ctx['ic_stack_d'], os.path.join(ctx['dirpath'], 'netcdf')
+
+    def run(args):
+        from pysic.core import netcdf
+        ic_stack, path = args
+        netcdf.to_netcdf(ic_stack, path, chunk_core=4)
+    return setup, run
+
+
+def bench_read_netcdf():
+    def setup(ctx):
+        from pysic.core import netcdf
+        path = os.path.join(ctx['dirpath'], 'netcdf-read')
+        netcdf.to_netcdf(ctx['ic_stack_d'], path, chunk_core=4)
+        return path
+
+    def run(path):
+        from pysic.core import netcdf
+        netcdf.read_netcdf(path)
+    return setup, run
+
+
+def bench_chunked(module, function, variables=['s', 't'], executor='thread'):
+    """
+    Before timing, the result of two workers (pool used whatever the number of CPU) is checked against the function
+    evaluated in a single call
+    """
+    def setup(ctx):
+        import importlib
+        from pysic.property import chunked
+        func = getattr(importlib.import_module('pysic.property.' + module), function)
+        x = [ctx[v] for v in variables]
+        out = np.empty_like(x[0])
+        chunked.evaluate(func, *x, out=out, chunk_size=-(-out.size // 2), n_worker=2, executor=executor)
+        if not np.array_equal(out, func(*x), equal_nan=True):
+            raise ValueError('chunked evaluation differs from %s.%s' % (module, function))
+        return func, x, out
+
+    def run(args):
+        from pysic.property import chunked
+        func, x, out = args
+        chunked.evaluate(func, *x, out=out, executor=executor)
+    return setup, run
+
+
+def bench_kernel(kernel, backend):
+    """
+    :param kernel: string, 'remap', 'fill_gap', 'diffusion' or 'discretize_profile'
+    :param backend: string, 'numpy' or 'numba'
+    """
+    def setup(ctx):
+        from pysic.tools import kernels
+        if backend == 'numba' and not kernels.HAS_NUMBA:
+            raise ImportError('numba is not installed')
+        rng = np.random.RandomState(seed)
+        n_section = 300
+        y = np.cumsum(rng.uniform(0.01, 0.1, n_section + 1))
+        y_bins = np.linspace(0, y[-1], 201)
+        x = rng.uniform(2, 12, (n_section, 2))
+        x[rng.rand(n_section) < 0.1, 0] = np.nan
+        u0 = np.tile(rng.uniform(-20, -2, (200, 1)), (1, 50))
+        k = np.full_like(u0, 1e-6)
+        ic_stack = ctx['ic_stack']
+        args = {'remap': (y[:-1], y[1:], x, y_bins), 'fill_gap': (y[:-1], y[1:], x[:, 0]),
+                'diffusion': (u0, u0.copy(), k, 0.1, 1e-6, 1e-6),
+                'discretize_profile': (ic_stack[ic_stack.name == ic_stack.names()[0]], ctx['y_bins'], ctx['y_mid'])}
+        # warm up: numba compilation and remap matrix cache are not timed
+        run(args[kernel])
+        return args[kernel]
+
+    def run(args):
+        from pysic.tools import kernels
+        from pysic.core.profile import discretize_profile, remap_profile
+        enabled = kernels.ENABLED
+        kernels.ENABLED = backend == 'numba'
+        try:
+            if kernel == 'remap':
+                remap_profile(*args)
+            elif kernel == 'fill_gap':
+                kernels.fill_gap(*args)
+            elif kernel == 'diffusion':
+                for _ in range(100):
+                    kernels.diffusion_step(*args)
+            else:
+                profile, y_bins, y_mid = args
+                discretize_profile(profile, y_bins=y_bins, y_mid=y_mid)
+        finally:
+            kernels.ENABLED = enabled
+    return setup, run
+
+
+def bench_property(module, function, variables=['s', 't']):
+    def setup(ctx):
+        import importlib
+        return getattr(importlib.import_module('pysic.property.' + module), function), [ctx[v] for v in variables]
+
+    def run(args):
+        func, x = args
+        func(*x)
+    return setup, run
+
+
+benchmarks = {'import_ic_path-v1.0': bench_import_ic_path(1.0),
+              'import_ic_path-v1.1': bench_import_ic_path(1.1),
+              'import_ic_path-MOSAiC': bench_import_ic_path('MOSAiC'),
+              'import_ic_path-v1.1-openpyxl': bench_import_ic_path(1.1, fast_xlsx=False),
+              'import_ic_path-MOSAiC-openpyxl': bench_import_ic_path('MOSAiC', fast_xlsx=False),
+              'import_ic_list': bench_import_ic_list(),
+              'import_ic_list-prefetch': bench_import_ic_list(prefetch=4),
+              'import_ic_table': bench_import_ic_table(),
+              'stack_cores': bench_stack_cores(),
+              'discretize_profile': bench_discretize_profile(),
+              'CoreStack.discretize': bench_discretize(),
+              'CoreStack.discretize-process': bench_discretize(n_worker=None),
+              'grouped_stat': bench_grouped_stat(),
+              'grouped_stat-process': bench_grouped_stat(n_worker=None),
+              'CoreStack.set_orientation': bench_set_orientation(),
+              'CoreStack.check': bench_check(),
+              'to_netcdf': bench_to_netcdf(),
+              'read_netcdf': bench_read_netcdf(),
+              'si.density': bench_property('si', 'density'),
+              'si.brine_volume_fraction': bench_property('si', 'brine_volume_fraction'),
+              'si.thermal_conductivity': bench_property('si', 'thermal_conductivity'),
+              'si.latent_heat': bench_property('si', 'latent_heat'),
+              'brine.salinity': bench_property('brine', 'salinity', ['t']),
+              'brine.density': bench_property('brine', 'density', ['t']),
+              'ice.density': bench_property('ice', 'density', ['t']),
+              'sw.freezingtemp': bench_property('sw', 'freezingtemp', ['s']),
+              'chunked.si.brine_volume_fraction': bench_chunked('si', 'brine_volume_fraction'),
+              'chunked.si.permeability': bench_chunked('si', 'permeability'),
+              'chunked.si.thermal_conductivity': bench_chunked('si', 'thermal_conductivity'),
+              'chunked.si.brine_volume_fraction-process': bench_chunked('si', 'brine_volume_fraction',
+                                                                         executor='process'),
+              'chunked.si.permeability-process': bench_chunked('si', 'permeability', executor='process'),
+              'chunked.si.thermal_conductivity-process': bench_chunked('si', 'thermal_conductivity',
+                                                                        executor='process'),
+              'chunked.sw.freezingtemp-process': bench_chunked('sw', 'freezingtemp', ['s'], executor='process'),
+              'kernel.remap-numpy': bench_kernel('remap', 'numpy'),
+              'kernel.remap-numba': bench_kernel('remap', 'numba'),
+              'kernel.fill_gap-numpy': bench_kernel('fill_gap', 'numpy'),
+              'kernel.fill_gap-numba': bench_kernel('fill_gap', 'numba'),
+              'kernel.diffusion-numpy': bench_kernel('diffusion', 'numpy'),
+              'kernel.diffusion-numba': bench_kernel('diffusion', 'numba'),
+              'kernel.discretize_profile-numpy': bench_kernel('discretize_profile', 'numpy'),
+              'kernel.discretize_profile-numba': bench_kernel('discretize_profile', 'numba')}
+
+
+# runner
+@contextlib.contextmanager
+def _quiet():
+    """
+    Silence print, logging and warnings emitted by pysic while timing
+    """
+    logging.disable(logging.CRITICAL)
+    with warnings.catch_warnings(), contextlib.redirect_stdout(io.StringIO()):
+        warnings.simplefilter('ignore')
+        try:
+            yield
+        finally:
+            logging.disable(logging.NOTSET)
+
+
+def time_benchmark(setup, run, ctx, n_repeat=n_repeat):
+    """
+    Time a benchmark, setup excluded
+    :return: dict, median, min and max wall time in second
+    """
+    timing = []
+    for _ in range(n_repeat):
+        args = setup(ctx)
+        t0 = time.perf_counter()
+        run(args)
+        timing.append(time.perf_counter() - t0)
+    return {'median': float(np.median(timing)), 'min': float(np.min(timing)), 'max': float(np.max(timing)),
+            'n_repeat': n_repeat}
+
+
+def run_suite(ctx, names=None, n_repeat=n_repeat):
+    """
+    :param ctx: dict, as returned by make_context
+    :param names: list of string, run only benchmark containing one of these strings. Default all.
+    :return: dict, {benchmark name: timing}
+    """
+    results = {}
+    for name in benchmarks:
+        if names and not any(key in name for key in names):
+            continue
+        setup, run = benchmarks[name]
+        try:
+            with _quiet():
+                results[name] = time_benchmark(setup, run, ctx, n_repeat=n_repeat)
+        except Exception as e:
+            results[name] = {'error': '%s: %s' % (type(e).__name__, e)}
+        _print_line(name, results[name])
+    return results
+
+
+def _print_line(name, result, reference=None):
+    if 'error' in result:
+        print('%-28s %s' % (name, result['error']))
+        return
+    line = '%-28s %10.2f ms' % (name, result['median'] * 1e3)
+    if reference is not None and 'median' in reference:
+        ratio = result['median'] / reference['median']
+        line += '  %10.2f ms  x%5.2f' % (reference['median'] * 1e3, ratio)
+    print(line)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    for module in ['pandas', 'openpyxl', 'scipy', 'numba']:
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return versions
+
+
+def save_results(results, n_core, n_point, result_dir=RESULT_DIR):
+    """
+    Store the results of a run as json in result_dir
+    :return: string, path of the result file
+    """
+    if not os.path.exists(result_dir):
+        os.makedirs(result_dir)
+    date = datetime.datetime.now()
+    run = {'date': date.isoformat(timespec='seconds'), 'commit': _git_commit(), 'versions': _versions(),
+           'n_core': n_core, 'n_point': n_point, 'results': results}
+    result_path = os.path.join(result_dir, date.strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(result_path, 'w') as f:
+        json.dump(run, f, indent=2)
+    return result_path
+
+
+def load_reference(n_core, n_point, result_dir=RESULT_DIR, exclude=None):
+    """
+    Latest stored run at the same scale
+    :return: dict or None
+    """
+    for result_path in sorted(glob.glob(os.path.join(result_dir, '*.json')), reverse=True):
+        if exclude is not None and os.path.samefile(result_path, exclude):
+            continue
+        with open(result_path) as f:
+            run = json.load(f)
+        if run.get('n_core') == n_core and run.get('n_point') == n_point:
+            run['path'] = result_path
+            return run
+    return None
+
+
+def compare(results, reference, threshold=threshold):
+    """
+    Compare the results with a reference run
+    :param threshold: float, relative slow-down above which a benchmark is a regression
+    :return: list of string, name of the regressed benchmarks
+    """
+    regressions = []
+    print('\n%-28s %13s %13s %7s' % ('benchmark', 'current', 'reference', 'ratio'))
+    for name in results:
+        if name not in reference['results']:
+            continue
+        _print_line(name, results[name], reference['results'][name])
+        if 'median' in results[name] and 'median' in reference['results'][name]:
+            if results[name]['median'] > reference['results'][name]['median'] * (1 + threshold):
+                regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the pysic benchmark suite')
+    parser.add_argument('-k', '--keyword', nargs='*', default=None, help='run benchmark containing keyword')
+    parser.add_argument('-n', '--n-core', type=int, default=n_core, help='number of core per spreadsheet version')
+    parser.add_argument('-p', '--n-point', type=int, default=n_point, help='array size for the property kernels')
+    parser.add_argument('-r', '--repeat', type=int, default=n_repeat)
+    parser.add_argument('--seed', type=int, default=seed)
+    parser.add_argument('--data', default=None, help='directory for the synthetic dataset, default temporary')
+    parser.add_argument('--compare', default=None, help='reference result file, default previous run')
+    parser.add_argument('--threshold', type=float, default=threshold)
+    parser.add_argument('--no-save', action='store_true', help='do not store the results')
+    parser.add_argument('--fail', action='store_true', help='exit with status 1 on regression')
+    parser.add_argument('--trace', default=None, help='enable pysic.tools.instrument and write a chrome trace')
+    args = parser.parse_args(argv)
+
+    dirpath = args.data if args.data is not None else tempfile.mkdtemp(prefix='pysic-benchmark-')
+    try:
+        with _quiet():
+            ctx = make_context(dirpath, n_core=args.n_core, n_point=args.n_point, seed=args.seed)
+        if args.trace is not None:
+            from pysic.tools import instrument
+            instrument.reset()
+            instrument.enable()
+        results = run_suite(ctx, names=args.keyword, n_repeat=args.repeat)
+    finally:
+        if args.data is None:
+            shutil.rmtree(dirpath)
+
+    if args.trace is not None:
+        instrument.disable()
+        print('')
+        instrument.summary()
+        print('\ntrace stored in %s' % instrument.export_chrome_trace(args.trace))
+
+    result_path = None
+    if not args.no_save:
+        result_path = save_results(results, args.n_core, args.n_point)
+        print('\nresults stored in %s' % result_path)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            reference = json.load(f)
+        reference['path'] = args.compare
+    else:
+        reference = load_reference(args.n_core, args.n_point, exclude=result_path)
+
+    regressions = []
+    if reference is not None:
+        print('reference: %s (%s)' % (reference['path'], reference.get('commit')))
+        regressions = compare(results, reference, threshold=args.threshold)
+        if regressions:
+            print('\nREGRESSION (> %d%% slower): %s' % (args.threshold * 100, ', '.join(regressions)))
+    if regressions and args.fail:
+        sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+benchmarks/synthetic.py : generate deterministic synthetic ice core spreadsheets
+
+Cores are written in the layout read by pysic.core.import_ic_path (spreadsheet version 1.0 and 1.1) and by
+pysic.core.import_ic_path_MOSAiC (MOSAiC metadata-coring/metadata-core layout). Each core holds a continuous temperature
+profile (T_ice), a step salinity/conductivity profile (S_ice) and, except for version 1.0 which has no oil sheet, a
+step oil volume fraction profile (Vf_oil). Sections are randomly missing (gap), left empty or cut short at the ice
+surface and ice bottom (extremity), as in the testing-*-TS.xlsx cores of data/ice_cores.
+
+The same seed always produces the same cores.
+
+USAGE:
+    python benchmarks/synthetic.py /tmp/ic_synthetic -n 100
+    python benchmarks/synthetic.py /tmp/ic_synthetic -n 20 --version 1.0 1.1 MOSAiC --seed 1
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "synthetic.py generates synthetic ice core spreadsheets for benchmarking"
+
+import argparse
+import datetime
+import os
+
+import numpy as np
+import openpyxl
+
+versions = [1.0, 1.1, 'MOSAiC']
+n_core = 12
+h_section = 0.05
+dz_temperature = 0.1
+gap_ratio = 0.1
+empty_ratio = 0.05
+n_blank = 5
+seed = 0
+
+# conductivity measured at 15 °C, interpolated from the testing cores
+_s_table = [0, 5, 10, 20, 35]
+_c_table = [0, 7.2, 13.7, 25.89, 42.9]
+
+
+def _rng(seed, n):
+    """
+    Independent random state for the n-th core of the dataset
+    """
+    return np.random.RandomState([seed, n])
+
+
+def core_data(name, rng, h_section=h_section, dz_temperature=dz_temperature, gap_ratio=gap_ratio,
+              empty_ratio=empty_ratio, gap=None, extremity=None):
+    """
+    Draw the metadata and profiles of a synthetic ice core
+    :param name: string, name of the ice core
+    :param rng: np.random.RandomState
+    :param h_section: float, thickness of a salinity/oil section in m
+    :param dz_temperature: float, vertical spacing of the temperature measurement in m
+    :param gap_ratio: float, fraction of the sections missing in the salinity and oil profiles
+    :param empty_ratio: float, fraction of the sections without measurement in the salinity and oil profiles
+    :param gap: boolean or None, if None drawn at random
+    :param extremity: boolean or None, if None drawn at random
+    :return: dict
+    """
+    if gap is None:
+        gap = rng.rand() < 0.5
+    if extremity is None:
+        extremity = rng.rand() < 0.5
+
+    date = datetime.datetime(2015, 1, 1) + datetime.timedelta(days=int(rng.randint(0, 180)), hours=int(rng.randint(0, 24)))
+    h_i = np.round(rng.uniform(0.8, 2.0), 2)
+    length = np.round(h_i + rng.uniform(-0.05, 0.02), 2)
+    data = {'name': name,
+            'date': date,
+            'origin': rng.choice(['BRW', 'CS', 'BS', 'SVL']),
+            'lat': np.round(71.3 + rng.uniform(-0.2, 0.2), 4),
+            'lon': np.round(-156.5 + rng.uniform(-0.5, 0.5), 4),
+            'snow_depth': np.round(rng.uniform(0, 0.4, size=3), 2),
+            'freeboard': np.round(rng.uniform(0.02, 0.1), 2),
+            'ice_thickness': h_i,
+            'length': length,
+            'gap': gap,
+            'extremity': extremity}
+
+    # temperature: continuous, linear between the ice surface and the freezing point at the ice bottom
+    t_surface = rng.uniform(-25, -5)
+    y_t = np.round(np.arange(0, length, dz_temperature), 3)
+    if not extremity:
+        y_t = y_t[1:]
+    t = t_surface + (-1.8 - t_surface) * y_t / length + rng.normal(0, 0.1, size=y_t.__len__())
+    data['T_ice'] = {'y_mid': y_t, 'temperature': np.round(t, 2)}
+
+    # salinity: step, C-shaped profile
+    y_low = np.round(np.arange(0, length - h_section / 2, h_section), 3)
+    y_sup = np.round(np.minimum(y_low + h_section, length), 3)
+    if not extremity:
+        y_low[0] = np.round(h_section / 2, 3)
+        y_sup[-1] = np.round(y_sup[-1] - h_section / 2, 3)
+    keep = np.ones(y_low.__len__(), dtype=bool)
+    if gap:
+        keep[1:-1] = rng.rand(y_low.__len__() - 2) > gap_ratio
+    y_low, y_sup = y_low[keep], y_sup[keep]
+    x = (y_low + y_sup) / 2 / length
+    s = 4 + 12 * (x - 0.45) ** 2 + rng.normal(0, 0.3, size=x.__len__())
+    s = np.round(np.clip(s, 0.1, None), 2)
+    empty = rng.rand(x.__len__()) < empty_ratio
+    s[empty] = np.nan
+    c = np.round(np.interp(s, _s_table, _c_table), 2)
+    data['S_ice'] = {'y_low': y_low, 'y_sup': y_sup, 'salinity': s, 'conductivity': c,
+                     'conductivity measurement temperature': np.where(np.isnan(s), np.nan, 15),
+                     'specific conductance': c}
+
+    # oil volume fraction: step, oil lens in the upper half of the core
+    vf_oil = np.round(0.05 * np.exp(-((x - 0.3) / 0.1) ** 2) * rng.uniform(0.5, 1.5, size=x.__len__()), 4)
+    vf_oil[rng.rand(x.__len__()) < empty_ratio] = np.nan
+    data['Vf_oil'] = {'y_low': y_low, 'y_sup': y_sup, 'Vf_oil': vf_oil,
+                      'oil mass': np.round(vf_oil * 916 * 1e-3 * h_section, 6)}
+    return data
+
+
+def _value(x):
+    """
+    Convert numpy scalar to python value, np.nan to empty cell
+    """
+    if isinstance(x, (float, np.floating)) and np.isnan(x):
+        return None
+    if isinstance(x, np.generic):
+        return x.item()
+    return x
+
+
+def _write_rows(ws, row_start, columns, n_blank=n_blank):
+    """
+    Write data columns starting at row_start, followed by n_blank formatted empty rows as in the spreadsheet template
+    :param columns: list of (column letter, array)
+    """
+    n_row = columns[0][1].__len__()
+    for ii in range(n_row):
+        for col, values in columns:
+            if values is not None:
+                ws[col + str(row_start + ii)] = _value(values[ii])
+    for ii in range(n_row, n_row + n_blank):
+        for col, _ in columns:
+            ws[col + str(row_start + ii)].number_format = '0.00'
+
+
+def _summary(ws, data, version, collection):
+    """
+    Summary sheet, version 1.0 and 1.1
+    """
+    ws['A1'] = 'date and time'
+    ws['A2'] = 'date | time'
+    ws['B2'] = 'DD-MMM-YY | hhmm'
+    ws['C2'] = data['date']
+    ws['D2'] = 'UTC'
+    ws['A3'] = 'ice core spreasheet'
+    ws['B3'] = 'version'
+    ws['C3'] = 1 if version == 1.0 else 1.1
+    ws['A4'] = 'station description'
+    ws['A5'] = 'location'
+    ws['C5'] = data['origin']
+    ws['A6'] = 'coordinates (N | W)'
+    ws['B6'] = '°'
+    ws['C6'] = data['lat']
+    ws['D6'] = data['lon']
+    ws['A8'] = 'ice geometry'
+    ws['A9'] = 'snow depth'
+    ws['B9'] = 'm'
+    for ii, h_s in enumerate(data['snow_depth']):
+        ws.cell(row=9, column=3 + ii).value = _value(h_s)
+    ws['A10'] = 'freeboard'
+    ws['B10'] = 'm'
+    ws['C10'] = data['freeboard']
+    ws['A11'] = 'ice thickness'
+    ws['B11'] = 'm'
+    ws['C11'] = data['ice_thickness']
+    ws['A12'] = 'water depth'
+    ws['B12'] = 'm'
+    ws['C12'] = 'n/a'
+    ws['A14'] = 'ice temperature'
+    for row, label in zip(range(15, 19), ['air temperature', 'snow temperature', 'snow/ice temperature',
+                                          'water temperature']):
+        ws['A' + str(row)] = label
+        ws['B' + str(row)] = '°C'
+    ws['C18'] = -1.8
+    ws['A20'] = 'core sampling description'
+    ws['A21'] = 'core name'
+    ws['C21'] = data['name']
+
+    # version 1.0 has an extra row 'core number in series', removed in version 1.1
+    row = 22
+    if version == 1.0:
+        ws['A22'] = 'core number in series'
+        ws['C22'] = collection.index(data['name']) + 1
+        row += 1
+    ws['A' + str(row)] = 'core serie name'
+    for ii, name in enumerate(collection):
+        ws.cell(row=row, column=3 + ii).value = name
+    ws['A' + str(row + 1)] = 'observer'
+    ws['A' + str(row + 2)] = 'procedure'
+    ws['A30'] = 'comments'
+    ws['C30'] = 'synthetic core'
+
+
+def _sheet_header(ws, data, v_ref, version):
+    """
+    Core name, length, notes and, from version 1.1, vertical reference rows of a profile sheet
+    :return: int, header row
+    """
+    ws['A1'] = 'core'
+    ws['C1'] = data['name']
+    ws['A2'] = 'core length'
+    ws['B2'] = 'm'
+    ws['C2'] = data['length']
+    ws['A3'] = 'notes'
+    if version == 1.0:
+        return 4
+    ws['A4'] = 'vertical reference'
+    ws['C4'] = v_ref
+    return 5
+
+
+def _write_v1(wb, data, version, collection, v_ref='top', n_blank=n_blank):
+    """
+    Ice core spreadsheet version 1.0 and 1.1
+    """
+    ws = wb.active
+    ws.title = 'summary'
+    _summary(ws, data, version, collection)
+
+    # temperature
+    ws = wb.create_sheet('T_ice')
+    row = _sheet_header(ws, data, v_ref, version)
+    ws['A' + str(row)], ws['B' + str(row)], ws['C' + str(row)] = 'depth', 'temperature', 'comments'
+    if version == 1.1:
+        ws['A' + str(row + 1)], ws['B' + str(row + 1)] = 'd', 'T'
+        row += 1
+    ws['A' + str(row + 1)], ws['B' + str(row + 1)], ws['C' + str(row + 1)] = 'm', '˚C', '-'
+    profile = data['T_ice']
+    _write_rows(ws, row + 2, [('A', profile['y_mid']), ('B', profile['temperature'])], n_blank=n_blank)
+
+    # salinity
+    profile = data['S_ice']
+    ws = wb.create_sheet('S_ice')
+    row = _sheet_header(ws, data, v_ref, version)
+    if version == 1.0:
+        # layout before the 1.1 update: salinity measurement temperature, isotopes and comments before conductivity
+        headers = ['depth 1', 'depth 2', 'mid depth', 'salinity', 'temperature', 'd18O', 'dD', 'comments',
+                   'conductivity', 'conductivity measurement temperature', 'specific conductance']
+        units = ['m', 'm', 'm', 'PSU', '˚C', '‰', '‰', '-', 'mS/cm', '˚C', 'mS/cm']
+        columns = [('A', profile['y_low']), ('B', profile['y_sup']), ('C', None), ('D', profile['salinity']),
+                   ('I', profile['conductivity']), ('J', profile['conductivity measurement temperature']),
+                   ('K', profile['specific conductance'])]
+    else:
+        headers = ['depth 1', 'depth 2', 'mid depth', 'salinity', 'conductivity',
+                   'conductivity measurement temperature', 'specific conductance', 'd18O', 'dD', 'comments']
+        units = ['m', 'm', 'm', 'PSU', 'mS/cm', '˚C', 'mS/cm', '‰', '‰', '-']
+        notations = ['d_1', 'd_2', 'd', 'S', 'σ', 'T_σ', 'κ', None, None, None]
+        columns = [('A', profile['y_low']), ('B', profile['y_sup']), ('C', None), ('D', profile['salinity']),
+                   ('E', profile['conductivity']), ('F', profile['conductivity measurement temperature']),
+                   ('G', profile['specific conductance'])]
+    for ii, header in enumerate(headers):
+        ws.cell(row=row, column=1 + ii).value = header
+        if version == 1.1:
+            ws.cell(row=row + 1, column=1 + ii).value = notations[ii]
+    if version == 1.1:
+        row += 1
+    for ii, unit in enumerate(units):
+        ws.cell(row=row + 1, column=1 + ii).value = unit
+    _write_rows(ws, row + 2, columns, n_blank=n_blank)
+
+    # oil volume fraction, only defined for version 1.1
+    if version == 1.1:
+        profile = data['Vf_oil']
+        ws = wb.create_sheet('Vf_oil')
+        row = _sheet_header(ws, data, v_ref, version)
+        for ii, (header, unit) in enumerate(zip(['depth 1', 'depth 2', 'mid depth', 'Vf_oil', 'oil mass'],
+                                                ['m', 'm', 'm', '-', 'g'])):
+            ws.cell(row=row, column=1 + ii).value = header
+            ws.cell(row=row + 2, column=1 + ii).value = unit
+        ws['H' + str(row)] = 'comments'
+        _write_rows(ws, row + 3, [('A', profile['y_low']), ('B', profile['y_sup']), ('C', None),
+                                  ('D', profile['Vf_oil']), ('E', profile['oil mass'])], n_blank=n_blank)
+
+    ws = wb.create_sheet('lists')
+    ws['A1'] = 'Snow hardness'
+    ws = wb.create_sheet('abreviation')
+    ws['A1'], ws['B1'] = 'n/a', 'not available'
+
+
+def _mosaic_sheet(wb, title, headers, subheaders, units, columns, n_blank=n_blank):
+    """
+    MOSAiC profile sheet: reference in row 1, header, subheader and unit in row 2 to 4, data from row 5
+    """
+    ws = wb.create_sheet(title)
+    ws['A1'], ws['B1'], ws['C1'], ws['D1'], ws['E1'] = 'Reference', 'zero vertical', 'ice surface', 'direction', 'down'
+    for ii, (header, subheader, unit) in enumerate(zip(headers, subheaders, units)):
+        ws.cell(row=2, column=1 + ii).value = header
+        ws.cell(row=3, column=1 + ii).value = subheader
+        ws.cell(row=4, column=1 + ii).value = unit
+    _write_rows(ws, 5, columns, n_blank=max(n_blank, 1))
+
+
+def _write_mosaic(wb, data, collection, n_blank=n_blank):
+    """
+    Ice core spreadsheet in MOSAiC layout
+    """
+    ws = wb.active
+    ws.title = 'metadata-coring'
+    ws['A1'], ws['C1'] = 'VERSION', 1.3
+    ws['A3'], ws['C3'] = 'Project', data['origin']
+    ws['A8'], ws['B8'], ws['C8'], ws['F8'] = 'Latitude', 'N', data['lat'], data['lat']
+    ws['A9'], ws['B9'], ws['C9'], ws['F9'] = 'Longitude', 'E', data['lon'], data['lon']
+    ws['A16'], ws['B16'] = 'Snow depth', 'm'
+    ws['C16'] = _value(np.round(np.mean(data['snow_depth']), 3))
+    for ii, h_s in enumerate(data['snow_depth']):
+        ws.cell(row=16, column=4 + ii).value = _value(h_s)
+    ws['A28'], ws['C28'] = 'Water temperature', -1.8
+    ws['A30'], ws['C30'] = 'Station', 'synthetic'
+    ws['A31'] = 'Core collection'
+    for ii, name in enumerate(collection):
+        ws.cell(row=31, column=3 + ii).value = name
+
+    ws = wb.create_sheet('metadata-core')
+    ws['A1'], ws['C1'] = 'Core name', data['name']
+    ws['A2'], ws['C2'], ws['D2'] = 'Date', datetime.datetime.combine(data['date'].date(), datetime.time()), 'UTC'
+    ws['A3'], ws['C3'] = 'Time', data['date'].time()
+    ws['A7'], ws['C7'] = 'Ice thickness', data['ice_thickness']
+    ws['A8'], ws['C8'] = 'Ice draft', _value(np.round(data['ice_thickness'] - data['freeboard'], 2))
+    ws['A10'], ws['C10'] = 'Core length', data['length']
+    ws['A12'] = 'INSTRUMENT'
+    for row, (instrument, model) in enumerate([('corer', 'Kovacs Mark II'), ('thermometer', 'Testo 720'),
+                                               ('salinometer', 'YSI 3100')]):
+        ws.cell(13 + row, 1).value = instrument
+        ws.cell(13 + row, 3).value = model
+
+    profile = data['T_ice']
+    _mosaic_sheet(wb, 'TEMP', ['depth center', 'temperature', 'comment'], ['value', None, '-'], ['m', '°C', '-'],
+                  [('A', profile['y_mid']), ('B', profile['temperature']), ('C', None)], n_blank=n_blank)
+    # depth center is read for step profile too, and used to merge the profiles of the core
+    profile = data['S_ice']
+    y_mid = np.round((profile['y_low'] + profile['y_sup']) / 2, 4)
+    _mosaic_sheet(wb, 'SALO18',
+                  ['depth 1', 'depth 2', 'depth center', 'salinity', 'conductivity',
+                   'conductivity measurement temperature', 'specific conductance', 'comment'],
+                  ['value', 'value', 'value', None, None, None, None, '-'],
+                  ['m', 'm', 'm', 'PSU', 'mS/cm', '°C', 'mS/cm', '-'],
+                  [('A', profile['y_low']), ('B', profile['y_sup']), ('C', y_mid), ('D', profile['salinity']),
+                   ('E', profile['conductivity']), ('F', profile['conductivity measurement temperature']),
+                   ('G', profile['specific conductance']), ('H', None)], n_blank=n_blank)
+    profile = data['Vf_oil']
+    # header and subheader are joined with '_' in MOSAiC layout, Vf_oil would be read as Vf
+    _mosaic_sheet(wb, 'Vf_oil', ['depth 1', 'depth 2', 'depth center', 'oil volume fraction', 'oil mass', 'comment'],
+                  ['value', 'value', 'value', None, None, '-'], ['m', 'm', 'm', '-', 'g', '-'],
+                  [('A', profile['y_low']), ('B', profile['y_sup']), ('C', y_mid), ('D', profile['Vf_oil']),
+                   ('E', profile['oil mass']), ('F', None)], n_blank=n_blank)
+
+
+def write_core(ic_path, data, version=1.1, collection=None, v_ref='top', n_blank=n_blank):
+    """
+    Write a synthetic ice core to a xlsx spreadsheet
+    :param ic_path: string, path of the spreadsheet to write
+    :param data: dict, ice core data as returned by core_data
+    :param version: 1.0, 1.1 or 'MOSAiC'
+    :param collection: list of string, name of the cores in the same collection. Default [data['name']]
+    :param v_ref: 'top' or 'bottom', vertical reference of the profiles
+    :param n_blank: int, number of formatted empty rows after the data, as in the spreadsheet template
+    :return: string, ic_path
+    """
+    if collection is None:
+        collection = [data['name']]
+
+    wb = openpyxl.Workbook()
+    if version == 'MOSAiC':
+        _write_mosaic(wb, data, collection, n_blank=n_blank)
+    elif version in [1.0, 1.1]:
+        _write_v1(wb, data, version, collection, v_ref=v_ref, n_blank=n_blank)
+    else:
+        raise ValueError('ice core spreadsheet version %s not defined' % str(version))
+    wb.save(ic_path)
+    wb.close()
+    return ic_path
+
+
+def make_dataset(dirpath, n_core=n_core, versions=versions, seed=seed, h_section=h_section,
+                 dz_temperature=dz_temperature, gap_ratio=gap_ratio, empty_ratio=empty_ratio, n_collection=2,
+                 n_blank=n_blank):
+    """
+    Generate n_core synthetic ice cores for each spreadsheet version
+    :param dirpath: string, directory where the cores are written. Created if it does not exist.
+    :param n_core: int, number of core per version
+    :param versions: list, spreadsheet version among 1.0, 1.1 and 'MOSAiC'
+    :param seed: int, seed of the random generator
+    :param n_collection: int, number of cores sharing a collection (e.g. a salinity and a temperature core)
+    :return: dict, {version: list of ice core path}
+    """
+    if not os.path.exists(dirpath):
+        os.makedirs(dirpath)
+
+    ic_paths = {}
+    for n_version, version in enumerate(versions):
+        tag = 'MOSAiC' if version == 'MOSAiC' else 'v' + str(version)
+        names = ['synthetic-%s-%04d' % (tag, ii) for ii in range(n_core)]
+        ic_paths[version] = []
+        for ii, name in enumerate(names):
+            rng = _rng(seed, n_version * n_core + ii)
+            data = core_data(name, rng, h_section=h_section, dz_temperature=dz_temperature, gap_ratio=gap_ratio,
+                             empty_ratio=empty_ratio)
+            first = ii - ii % n_collection
+            collection = names[first:first + n_collection]
+            ic_path = os.path.join(dirpath, name + '.xlsx')
+            write_core(ic_path, data, version=version, collection=collection, n_blank=n_blank)
+            ic_paths[version].append(ic_path)
+    return ic_paths
+
+
+def _version(string):
+    if string == 'MOSAiC':
+        return string
+    return float(string)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate synthetic ice core spreadsheets')
+    parser.add_argument('dirpath')
+    parser.add_argument('-n', '--n-core', type=int, default=n_core, help='number of core per version')
+    parser.add_argument('--version', type=_version, nargs='+', default=versions)
+    parser.add_argument('--seed', type=int, default=seed)
+    parser.add_argument('--h-section', type=float, default=h_section)
+    parser.add_argument('--gap-ratio', type=float, default=gap_ratio)
+    args = parser.parse_args(argv)
+
+    ic_paths = make_dataset(args.dirpath, n_core=args.n_core, versions=args.version, seed=args.seed,
+                            h_section=args.h_section, gap_ratio=args.gap_ratio)
+    for version in ic_paths:
+        print('%-8s %d cores' % (version, ic_paths[version].__len__()))
+    return ic_paths
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,8 @@ import datetime as dt
 import sys
 
 import pysic
+from pysic.property import precision, workspace
+from pysic.tools import kernels
 
 
 # =====================================================================================================================#
@@ -35,6 +37,10 @@ TEMPERATURE = [-20]
 h_levels = [0.05, 0.1, 0.2]
 mesh = 'fine'
 core_diameter = 0.1  # m
+dtype = np.float32  # float32 halves the memory of the fields, see pysic.property.precision for the accuracy
+
+# property kernels keep the dtype of the fields
+precision.set_policy('preserve')
 
 # =====================================================================================================================#
 # LOAD CONFIG
@@ -105,8 +111,8 @@ for month in MONTH:
     xv, yv = np.meshgrid(x_mid, y_mid)
 
     # ice core before collection
-    T_field = np.array([T] * (len(x)-1)).transpose()
-    S_field = np.array([S] * (len(x)-1)).transpose()
+    T_field = np.array([T] * (len(x)-1), dtype=dtype).transpose()
+    S_field = np.array([S] * (len(x)-1), dtype=dtype).transpose()
 
     T_field_ref = T_field.copy()
 
@@ -118,24 +124,27 @@ for month in MONTH:
         t0_field[0, :] = T_atm
         t0_field[-1, :] = T_atm
 
+        t0_mask = ~np.isnan(t0_field)
+
         # initial conditon of ice core after extraction
         T0_field = T_field.copy()
-        T0_field[~np.isnan(t0_field)] = t0_field[~np.isnan(t0_field)]
-        D0_field = pysic.property.si.thermal_diffusivity(S_field.copy(), T_field)
-        T_field = T0_field
+        T0_field[t0_mask] = t0_field[t0_mask]
+        # scratch arrays of the property functions, reused at each time step
+        work = workspace.Workspace()
+        D0_field = pysic.property.si.thermal_diffusivity(S_field, T_field, work=work)
+        T_field = T0_field.copy()
         dx2, dy2 = dx*dx, dy*dy
-        dt = dx2 * dy2 / (2 * np.nanmax(D0_field) * (dx2 + dy2))
+        dt = float(dx2 * dy2 / (2 * np.nanmax(D0_field) * (dx2 + dy2)))
 
         plt.figure()
         plt.imshow(T0_field)
         plt.show()
 
         def do_timestep_only(u0, u, k, dt):
-            u[1:-1, 1:-1] = u0[1:-1, 1:-1] + k[1:-1, 1:-1] * dt * (
-                (u0[2:, 1:-1] - 2 * u0[1:-1, 1:-1] + u0[:-2, 1:-1]) / dx2
-                + (u0[1:-1, 2:] - 2 * u0[1:-1, 1:-1] + u0[1:-1, :-2]) / dy2)
+            # compiled with numba when available, see pysic.tools.kernels
+            u = kernels.diffusion_step(u0, u, k, dt, dx2, dy2)
 
-            u0 = u.copy()
+            np.copyto(u0, u)
             return u0, u
 
 
@@ -166,7 +175,7 @@ for month in MONTH:
                 T_plot = np.concatenate([np.fliplr(T0_field.copy()), T0_field.copy()], axis=1)
 
                 # brine volume fraction along the center
-                Vbf_c = pysic.property.si.brine_volume_fraction(S_field[:, 0], T0_field[:, 0])
+                Vbf_c = pysic.property.si.brine_volume_fraction(S_field[:, 0], T0_field[:, 0], work=work)
 
                 t_time.append(t)
                 if mt == 1:
@@ -292,11 +301,11 @@ for month in MONTH:
 
             T0_field, T_field = do_timestep_only(u0=T0_field, u=T_field, k=D0_field, dt=dt)
 
-            D0_field = pysic.property.si.thermal_diffusivity(S_field.copy(), T0_field)
-            dt = dx2 * dy2 / (2 * np.nanmax(D0_field) * (dx2 + dy2))
+            pysic.property.si.thermal_diffusivity(S_field, T0_field, out=D0_field, work=work)
+            dt = float(dx2 * dy2 / (2 * np.nanmax(D0_field) * (dx2 + dy2)))
 
             # fixed T at all interface:
-            T0_field[~np.isnan(t0_field)] = t0_field[~np.isnan(t0_field)]
+            np.copyto(T0_field, t0_field, where=t0_mask)
 
             # neumann condition on the core center
             T0_field[:, 0] = T0_field[:, 1]
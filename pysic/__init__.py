@@ -16,24 +16,18 @@ __name__ = "pysic"
 
 from .__version__ import __version__
 
+import importlib
 import logging
 import numpy as np
-import pysic.core.corestack
-import pysic.core.plot
-import pysic.core.profile
-import pysic.property
 
-import pysic.property.brine
-import pysic.property.ice
-import pysic.property.si
-import pysic.property.sw
-import pysic.property.nacl_ice
+# submodules are imported on first attribute access (see __getattr__), so that importing pysic.property.si does not
+# pay for pandas, openpyxl, matplotlib or scipy
+_submodules = ['core', 'property', 'tools']
 
 TOL = 1e-6
 subvariable_dict = {'conductivity': ['conductivity measurement temperature']}
 
 # TODO: add test function
-# TODO: add function Core.check() to check the integrity of the ice core and profiles
 
 class Core():
     """
@@ -41,14 +35,21 @@ class Core():
     """
 
     def __getstate__(self):
+        # pending profiles are imported, the loader is not pickled
+        self.load_profile()
         d = self.__dict__.copy()
         if 'logger' in d.keys():
             d['logger'] = d['logger'].name
+        d['_lazy_loader'] = None
         return d
 
     def __setstate__(self, d):
         if 'logger' in d.keys():
             d['logger'] = logging.getLogger(d['logger'])
+        if 'profile' in d.keys():
+            d['_profile'] = d.pop('profile')
+        d.setdefault('_lazy_loader', None)
+        d.setdefault('_lazy_sheets', {})
         self.__dict__.update(d)
 
     def __init__(self, name, date, origin=np.nan, lat=np.nan, lon=np.nan, ice_thickness=np.nan, freeboard=np.nan,
@@ -85,7 +86,9 @@ class Core():
         self.ice_thickness = ice_thickness
         self.collection = [name]
         self.comment = None
-        self.profile = pysic.core.profile.Profile()
+        self._lazy_loader = None
+        self._lazy_sheets = {}
+        self.profile = importlib.import_module('pysic.core.profile').Profile()
         self.t_air = np.nan
         self.t_snow_surface = np.nan
         self.t_ice_surface = np.nan
@@ -93,6 +96,75 @@ class Core():
         self.protocol = None
         self.unit = {}
 
+    @property
+    def profile(self):
+        """
+        Core profiles, pysic.core.profile.Profile. Profiles deferred by import_ic_path(..., lazy=True) are imported on
+        first access.
+        """
+        self.load_profile()
+        return self._profile
+
+    @profile.setter
+    def profile(self, profile):
+        self._profile = profile
+
+    def set_lazy_profile(self, loader, sheets):
+        """
+        Defer the import of the profiles until they are accessed
+
+        :param loader: function, loader(core, sheets) reads the profile sheets and adds the profiles to core
+        :param sheets: dict, {sheet: list of variables the sheet may hold, None if unknown}
+        """
+        self._lazy_loader = loader
+        self._lazy_sheets = dict(sheets)
+
+    def lazy_sheets(self):
+        """
+        :return: list of string, profile sheets not imported yet
+        """
+        return list(self._lazy_sheets.keys())
+
+    def load_profile(self, variable=None):
+        """
+        Import deferred profiles
+
+        :param variable: string, optional. If defined, only the sheets that may hold the variable are imported
+        """
+        if not self._lazy_sheets:
+            return
+        if variable is None:
+            sheets = list(self._lazy_sheets.keys())
+        else:
+            variable = inverse_dict(subvariable_dict).get(variable, variable)
+            sheets = [sheet for sheet, variables in self._lazy_sheets.items()
+                      if variables is None or variable in variables]
+        if not sheets:
+            return
+        # sheets are removed before loading, the loader accesses core.profile
+        pending = dict(self._lazy_sheets)
+        loader = self._lazy_loader
+        for sheet in sheets:
+            del self._lazy_sheets[sheet]
+        if not self._lazy_sheets:
+            self._lazy_loader = None
+        try:
+            loader(self, sheets)
+        except Exception:
+            # sheets are kept pending, to be imported on next access
+            self._lazy_sheets = pending
+            self._lazy_loader = loader
+            raise
+
+    def check(self, tol=TOL):
+        """
+        Check the integrity of the profiles of the core
+
+        :param tol: float, tolerance on the depths [m]
+        :return: pd.DataFrame, issue table (see pysic.core.integrity.check)
+        """
+        return importlib.import_module('pysic.core.integrity').check(self.profile, tol=tol)
+
     def add_to_collection(self, core_list):
         """
         :param core_list:
@@ -149,15 +221,7 @@ class Core():
             return np.array([]).astype(str)
 
     def variables(self):
-        variables = []
-        if 'variable' in self.profile:
-            for group in self.profile.variable.unique():
-                for variable in group.split(', '):
-                    if variable not in variables:
-                        variables += [variable]
-            return variables
-        else:
-            return []
+        return _profile_variables(self.profile)
 
     def del_variable(self, variable):
         """
@@ -182,16 +246,20 @@ class Core():
         :param variable:
         :return:
         """
+        # only the sheets that may hold the variable are imported
+        self.load_profile(variable)
+        profile = self._profile
+
         if variable in inverse_dict(subvariable_dict):
             sup_variable = inverse_dict(subvariable_dict)[variable]
-            group = [group for group in self.profile.variable.unique() if sup_variable in group][0]
-            data = self.profile[self.profile.variable == group].copy()
+            group = [group for group in profile.variable.unique() if sup_variable in group][0]
+            data = profile[profile.variable == group].copy()
             del_variable = [var for var in group.split(', ') if not var == variable]
             del_variable += [subvar for var in del_variable if var in subvariable_dict
                              for subvar in subvariable_dict[var] if not subvar == variable]
-        elif variable in self.variables():
-            group = [group for group in self.profile.variable.unique() if variable in group][0]
-            data = self.profile[self.profile.variable == group].copy()
+        elif variable in _profile_variables(profile):
+            group = [group for group in profile.variable.unique() if variable in group][0]
+            data = profile[profile.variable == group].copy()
             del_variable = [var for var in group.split(', ') if not var == variable]
             del_variable += [subvar for var in del_variable if var in subvariable_dict for subvar in subvariable_dict[var]]
 
@@ -253,10 +321,10 @@ class Core():
         :param unit:
             dict, profile units
         """
-        if self.profile.empty:
-            self.profile = profile
+        if self._profile.empty:
+            self._profile = profile
         else:
-            self.profile = self.profile.add_profile(profile)
+            self._profile = self._profile.add_profile(profile)
 
     def get_property(self):
         return self.profile.get_property()
@@ -321,6 +389,20 @@ class Core():
 #                     select_data = select_data.append(data)
 
 
+def _profile_variables(profile):
+    """
+    :param profile: pysic.core.profile.Profile
+    :return: list of string, variables in the profile
+    """
+    variables = []
+    if 'variable' in profile:
+        for group in profile.variable.unique():
+            for variable in group.split(', '):
+                if variable not in variables:
+                    variables += [variable]
+    return variables
+
+
 def inverse_dict(map):
     """
     return the inverse of a dictionnary with non-unique values
@@ -338,4 +420,19 @@ def inverse_dict(map):
         else:
             revdict.setdefault(v, k)
 
-    return revdict
\ No newline at end of file
+    return revdict
+
+
+def __getattr__(name):
+    """
+    Import pysic submodules lazily on first access (PEP 562)
+    :param name: string, attribute name
+    :return: module
+    """
+    if name in _submodules:
+        return importlib.import_module('pysic.' + name)
+    raise AttributeError("module 'pysic' has no attribute '%s'" % name)
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + _submodules)
@@ -16,9 +16,14 @@ __date__ = "2017/09/13"
 __comment__ = "loadxl.py contained function to import ice core data from xlsx spreadsheet"
 __CoreVersion__ = 1.1
 
+import contextlib
 import datetime
+import functools
+import importlib
+import io
 import logging
 import os
+import re
 
 import dateutil
 import numpy as np
@@ -27,9 +32,13 @@ import pandas as pd
 
 import pysic
 import pysic.core.corestack as cs
+from pysic.tools import instrument, xlsx
 
 __all__ = ["import_ic_path", "import_ic_list", "import_ic_sourcefile", "list_ic", "list_ic_path", "make_ic_sourcefile"]
 
+# core submodules not needed for import are loaded on first attribute access (see __getattr__)
+_submodules = ['catalog', 'corestack', 'index', 'integrity', 'migrate', 'netcdf', 'plot', 'profile', 'query', 'tabular']
+
 TOL =1e-6
 subvariable_dict = {'conductivity': ['conductivity measurement temperature']}
 
@@ -50,26 +59,41 @@ variable_2_sheet = {'temperature': 'T_ice',
                     # 'Phae': 'algal_pigment'
                     }
 
+# spreadsheet version 1.0 profile layout, mapped onto version 1.1 when read (see update_spreadsheet):
+# {sheet: [(column, variable header), ...]}; header None keeps the header written in the spreadsheet
+sheet_layout_v1 = {'S_ice': [('D', 'salinity'), ('I', 'conductivity'), ('J', 'conductivity measurement temperature'),
+                             ('K', 'specific conductance'), ('F', None), ('G', None), ('H', None)]}
+
 ## Default values:
 variables = None
 v_ref = 'top'
 verbose = False
 drop_empty = False
+lazy = False
+prefetch = 0  # files read ahead by import_ic_list, 0 to disable
+
+# sheets holding the core metadata
+metadata_sheets = ['summary', 'metadata-coring', 'metadata-core']
 
 
-def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty):
+@instrument.timed('import_ic_path_MOSAiC')
+def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty, lazy=lazy, data=None):
     """
     :param wb:
     :param variables:
     :param v_ref:
     :param drop_empty:
+    :param lazy: boolean, default False. If True, only the metadata sheets are read; profiles are imported on first
+        access to the core profile (see import_ic_path)
+    :param data: bytes, optional. Content of the spreadsheet, already read (see import_ic_path)
     :return:
     """
 
     logger = logging.getLogger(__name__)
+    instrument.annotate(file=os.path.basename(ic_path))
+    instrument.count('files')
 
-    wb = openpyxl.load_workbook(filename=ic_path, keep_vba=False)  # load the xlsx spreadsheet
-    ws_name = wb.sheetnames
+    wb, ws_name = _load_workbook(ic_path, data, sheets=metadata_sheets if lazy else None)
 
     ws_summary = wb['metadata-coring']
     ws_metadata_core = wb['metadata-core']
@@ -78,10 +102,10 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
     if ws_summary['C1'].value:
         version = ws_summary['C1'].value
     else:
-        logger.error("(%s) ice core spreadsheet version not unavailable" % name)
+        logger.error("(%s) ice core spreadsheet version not unavailable", name)
         wb.close()
 
-    logger.info("importing data for %s" % name)
+    logger.info("importing data for %s", name)
 
     # DateTime
     if isinstance(ws_metadata_core['C2'].value, datetime.datetime):
@@ -91,16 +115,16 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
                 tz = dateutil.tz.gettz(ws_metadata_core['D2'].value)
                 date = date.replace(tzinfo=tz)
             else:
-                logger.info("\t(%s) timezone unavailable." % name)
+                logger.info("\t(%s) timezone unavailable.", name)
         else:
             date = ws_metadata_core['C2'].value
             if ws_metadata_core['D2'].value is not None and dateutil.tz.gettz(ws_metadata_core['D2'].value):
                 tz = dateutil.tz.gettz(ws_metadata_core['D2'].value)
                 date = date.replace(tzinfo=tz)
             else:
-                logger.info("\t(%s) timezone unavailable." % name)
+                logger.info("\t(%s) timezone unavailable.", name)
     else:
-        logger.warning("\t(%s) date unavailable" % name)
+        logger.warning("\t(%s) date unavailable", name)
         date = None
 
     # project
@@ -203,15 +227,15 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
     try:
         h_i = ws_metadata_core['C7'].value
     except:
-        logger.info('(%s) no ice thickness information ' % name)
+        logger.info('(%s) no ice thickness information ', name)
         h_i = np.nan
     else:
         if h_i == 'n/a':
             comments.append('ice thickness not available')
-            logger.info('(%s) ice thickness is not available (n/a)' % name)
+            logger.info('(%s) ice thickness is not available (n/a)', name)
             h_i = np.nan
         elif not isinstance(h_i, (int, float)):
-            logger.info('%s ice thickness is not a number' % name)
+            logger.info('%s ice thickness is not a number', name)
             comments.append('ice thickness not available')
             h_i = np.nan
 
@@ -219,15 +243,15 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
     try:
         h_d = ws_metadata_core['C8'].value
     except:
-        logger.info('(%s) no ice draft information ' % name)
+        logger.info('(%s) no ice draft information ', name)
         h_d = np.nan
     else:
         if h_d == 'n/a':
             comments.append('ice draft not available')
-            logger.info('(%s) ice draft is not available (n/a)' % name)
+            logger.info('(%s) ice draft is not available (n/a)', name)
             h_d = np.nan
         elif not isinstance(h_d, (int, float)):
-            logger.info('%s ice draft is not a number' % name)
+            logger.info('%s ice draft is not a number', name)
             comments.append('ice draft not available')
             h_d = np.nan
 
@@ -238,15 +262,15 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
         try:
             h_f = ws_metadata_core['C9'].value
         except:
-            logger.info('(%s) no ice draft information ' % name)
+            logger.info('(%s) no ice draft information ', name)
             h_f = np.nan
         else:
             if h_f == 'n/a':
                 comments.append('ice draft not available')
-                logger.info('(%s) ice draft is not available (n/a)' % name)
+                logger.info('(%s) ice draft is not available (n/a)', name)
                 h_f = np.nan
             elif not isinstance(h_f, (int, float)):
-                logger.info('%s ice draft is not a number' % name)
+                logger.info('%s ice draft is not a number', name)
                 comments.append('ice draft not available')
                 h_f = np.nan
 
@@ -254,15 +278,15 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
     try:
         l_c = ws_metadata_core['C10'].value
     except:
-        logger.info('(%s) no ice core length' % name)
+        logger.info('(%s) no ice core length', name)
         l_c = np.nan
     else:
         if l_c == 'n/a':
             comments.append('ice core length not available')
-            logger.info('(%s) ice core length is not available (n/a)' % name)
+            logger.info('(%s) ice core length is not available (n/a)', name)
             l_c = np.nan
         elif not isinstance(l_c, (int, float)):
-            logger.info('%s ice core length is not a number' % name)
+            logger.info('%s ice core length is not a number', name)
             comments.append('ice core length not available')
             l_c = np.nan
 
@@ -312,58 +336,33 @@ def import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
     # TODO: read weather information
 
     # import all variables
-    if variables is None:
-        # TODO: special import for TEX, snow
-        sheets = [sheet for sheet in ws_name if (sheet not in ['TEX', 'snow', 'summary', 'abreviation', 'locations', 'lists',
-                                                               'Vf_oil_calculation', 'metadata-core', 'metadata-coring']) and
-                     (sheet.lower().find('fig') == -1)]
-        for sheet in sheets:
-            ws_variable = wb[sheet]
-            profile = read_profile_MOSAiC(ws_variable, variables=None, version=version, v_ref=v_ref)
-            profile['name'] = name
-            if drop_empty:
-                profile.drop_empty_property()
-
-            if not profile.empty:
-                core.add_profile(profile)
-                logger.info('(%s) data imported with success: %s' % (core.name, ", ".join(profile.get_property())))
-            else:
-                logger.info('(%s) no data to import from %s ' % (core.name, sheet))
+    if variables is not None and not isinstance(variables, list):
+        if variables.lower().find('state variable')+1:
+            variables = ['temperature', 'salinity']
+        else:
+            variables = [variables]
+
+    # MOSAiC sheet names do not follow variable_2_sheet, all sheets are read and variables selected in
+    # read_profile_MOSAiC
+    # TODO: special import for TEX, snow
+    sheets = [sheet for sheet in ws_name if (sheet not in ['TEX', 'snow', 'summary', 'abreviation', 'locations', 'lists',
+                                                           'Vf_oil_calculation', 'metadata-core', 'metadata-coring']) and
+                 (sheet.lower().find('fig') == -1)]
+    sheet_variables = {sheet: variables for sheet in sheets}
+
+    if lazy:
+        # variables held by each sheet are unknown until the sheet is read
+        loader = functools.partial(_load_profiles, ic_path=ic_path, sheet_variables=sheet_variables, version=version,
+                                   v_ref=v_ref, drop_empty=drop_empty, mosaic=True)
+        core.set_lazy_profile(loader, {sheet: None for sheet in sheets})
     else:
-        if not isinstance(variables, list):
-            if variables.lower().find('state variable')+1:
-                variables = ['temperature', 'salinity']
-            else:
-                variables = [variables]
-
-        _imported_variables = []
-        for variable in variables:
-            if variable_2_sheet[variable] in ws_name and variable not in _imported_variables:
-                sheet = variable_2_sheet[variable]
-                ws_variable = wb[sheet]
-
-                variable2import = [var for var in variables if var in inverse_dict(variable_2_sheet)[sheet]]
-
-                profile = read_profile(ws_variable, variables=variable2import, version=version, v_ref=v_ref)
-
-                if profile.get_name() is not core.name:
-                    logger.error('\t(%s) core name %s and profile name %s does not match'
-                                 % (ic_path, core.name, profile.name()))
-                elif not profile.empty:
-                    core.add_profile(profile)
-                    logger.info(' (%s) data imported with success: %s' % (profile.get_name(), profile.get_property()))
-                else:
-                    _temp = [variable for variable in profile.get_variable() if profile[variable].isnull().all()]
-                    if _temp.__len__() > 1:
-                        logger.info(' (%s) no data to import: %s ' % (profile.get_name(), ", ".join(_temp)))
-                    else:
-                        logger.info('(%s) no variable to import' % name)
-
-                _imported_variables +=variable2import
+        _add_profiles(core, wb, sheet_variables, version=version, v_ref=v_ref, drop_empty=drop_empty, ic_path=ic_path,
+                      mosaic=True)
     return core
 
 
-def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_empty):
+@instrument.timed('import_ic_path')
+def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_empty, lazy=lazy, data=None):
     """
     :param ic_path:
         string, path to the xlsx ice core spreadsheet
@@ -371,45 +370,47 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
         list of string, variables to import. If not defined, all variable will be imported.
     :param v_ref:
         'top' or 'bottom', vertical reference. top for ice/snow or ice/air surface, bottom for ice/water interface
+    :param lazy: boolean, default False
+        If True, only the summary sheet is read. The profile sheets are read when the core profile is first accessed
+        (core.profile, core.variables()), or only the sheet holding the variable for core.get_variables(variable)
+    :param data: bytes, optional. Content of the spreadsheet, already read (e.g. by pysic.tools.pipeline.Prefetcher).
+        The spreadsheet is parsed from memory; the lazy profile loader reads ic_path.
     :return:
     """
     logger = logging.getLogger(__name__)
 
-    if not os.path.exists(ic_path):
-        logger.error("%s does not exists in core directory" % ic_path.split('/')[-1])
+    if data is None and not os.path.exists(ic_path):
+        logger.error("%s does not exists in core directory", ic_path.split('/')[-1])
 
-    wb = openpyxl.load_workbook(filename=ic_path, keep_vba=False)  # load the xlsx spreadsheet
-    ws_name = wb.sheetnames
+    wb, ws_name = _load_workbook(ic_path, data, sheets=metadata_sheets if lazy else None)
 
     try:
-        print(ic_path)
         ws_summary = wb['summary']  # load the data from the summary sheet
     except KeyError:
-        core = import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty)
+        wb.close()
+        core = import_ic_path_MOSAiC(ic_path, variables = variables, drop_empty=drop_empty, lazy=lazy, data=data)
         return core
     else:
-        print('Not in MOSAiC format')
+        logger.debug('%s not in MOSAiC format', ic_path)
         name = ws_summary['C21'].value
-        pass
+    instrument.annotate(file=os.path.basename(ic_path))
+    instrument.count('files')
 
     if isinstance(ws_summary['C3'].value, (float, int)):
         version = ws_summary['C3'].value
     else:
-        logger.error("(%s) ice core spreadsheet version not unavailable" % name)
+        logger.error("(%s) ice core spreadsheet version not unavailable", name)
     wb.close()
 
-    # convert ice core spreadsheet to last version
+    # older spreadsheet versions are read as the last version, the file is not updated (see update_spreadsheet)
     if version < __CoreVersion__:
-        wb.close()
-        update_spreadsheet(ic_path, v_ref=v_ref)
-        logger.info("Updating ice core spreadsheet %s to last version (%s)" % (name, str(__CoreVersion__)))
-        wb = openpyxl.load_workbook(filename=ic_path, keep_vba=True)  # load the xlsx spreadsheet
-        ws_name = wb.sheetnames
-        ws_summary = wb['summary']  # load the data from the summary sheet
-        version = ws_summary['C3'].value
-
-    n_row_collection = 22
-    logger.info("importing data for %s" % name)
+        logger.info("Reading ice core spreadsheet %s version %s as version %s", name, str(version),
+                    str(__CoreVersion__))
+        # version 1.0 summary has an extra row 'core number in series' before core collection
+        n_row_collection = 23
+    else:
+        n_row_collection = 22
+    logger.info("importing data for %s", name)
 
     if isinstance(ws_summary['C2'].value, datetime.datetime):
         if isinstance(ws_summary['D2'].value, datetime.time):
@@ -418,16 +419,16 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
                 tz = dateutil.tz.gettz(ws_summary['E2'].value)
                 date = date.replace(tzinfo=tz)
             else:
-                logger.info("\t(%s) timezone unavailable." % name)
+                logger.info("\t(%s) timezone unavailable.", name)
         else:
             date = ws_summary['C2'].value
             if ws_summary['D2'].value is not None and dateutil.tz.gettz(ws_summary['D2'].value):
                 tz = dateutil.tz.gettz(ws_summary['D2'].value)
                 date = date.replace(tzinfo=tz)
             else:
-                logger.info("\t(%s) timezone unavailable." % name)
+                logger.info("\t(%s) timezone unavailable.", name)
     else:
-        logger.warning("\t(%s) date unavailable" % name)
+        logger.warning("\t(%s) date unavailable", name)
         date = None
 
     origin = ws_summary['C5'].value
@@ -436,11 +437,11 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
         lat = ws_summary['C6'].value
         lon = ws_summary['D6'].value
     elif ws_summary['C6'].value and ws_summary['D6'].value:
-        logger.info("\t(%s) lat/lon not defined in decimal degree" % name)
+        logger.info("\t(%s) lat/lon not defined in decimal degree", name)
         lat = np.nan
         lon = np.nan
     else:
-        logger.info("\t(%s) lat/lon unknown" % name)
+        logger.info("\t(%s) lat/lon unknown", name)
         lat = np.nan
         lon = np.nan
 
@@ -466,7 +467,7 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
         while ws_summary.cell(row=10, column=3+n_temp).value is not None:
             freeboard = np.concatenate((freeboard, np.array([ws_summary.cell(row=10, column=3 + n_temp).value])))
             if not isinstance(ws_summary.cell(row=10, column=3+n_temp).value, (float, int)):
-                logger.info("(%s)\tfreeboard cell %s not a float" % (name, openpyxl.utils.get_column_letter(3 + n_temp)+str(9)))
+                logger.info("(%s)\tfreeboard cell %s not a float", name, openpyxl.utils.get_column_letter(3 + n_temp)+str(9))
             n_temp += 1
 
         if isinstance(freeboard[-1], str):
@@ -485,7 +486,7 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
             ice_thickness = np.concatenate(
                 (ice_thickness, np.array([ws_summary.cell(row=11, column=3 + n_temp).value])))
             if not isinstance(ws_summary.cell(row=11, column=3+n_temp).value, (float, int)):
-                logger.info("\t(%s) ice_thickness cell %s not a float" % (name, openpyxl.utils.get_column_letter(3+n_temp)+str(9)))
+                logger.info("\t(%s) ice_thickness cell %s not a float", name, openpyxl.utils.get_column_letter(3+n_temp)+str(9))
             n_temp += 1
         if isinstance(freeboard[-1], str):
             comments.append(freeboard[-1])
@@ -521,35 +522,17 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
         m_col += 1
 
     # comment
-    if ws_summary['A33'].value is not None:
-        comments.append(ws_summary['A33'].value)
+    if ws_summary['A' + str(n_row_collection + 11)].value is not None:
+        comments.append(ws_summary['A' + str(n_row_collection + 11)].value)
     core.add_comment('; '.join(comments))
 
 
     # import all variables
+    # {sheet: variables to import from the sheet, None for all variables}
     if variables is None:
         sheets = [sheet for sheet in ws_name if (sheet not in ['summary', 'abreviation', 'locations', 'lists', 'Vf_oil_calculation']) and
                      (sheet.lower().find('fig') == -1)]
-        for sheet in sheets:
-            ws_variable = wb[sheet]
-            profile = read_profile(ws_variable, variables=None, version=version)
-            profile.name = name
-            if drop_empty:
-                profile.drop_empty_property()
-
-            # 20190615 - read_profile should return an empty profile if there is no variables
-            # if profile.variables() is None:
-            #     profile = pd.DataFrame()
-
-            if not profile.empty:
-                if profile.get_name() is not core.name:
-                    logger.error('\t(%s) core name %s and profile name %s does not match'
-                                 % (ic_path, core.name, profile.get_name()))
-                else:
-                    core.add_profile(profile)
-                    logger.info('(%s) data imported with success: %s' % (core.name, ", ".join(profile.get_property())))
-            else:
-                logger.info('(%s) no data to import from %s ' % (core.name, sheet))
+        sheet_variables = {sheet: None for sheet in sheets}
     else:
         if not isinstance(variables, list):
             if variables.lower().find('state variable')+1:
@@ -557,73 +540,207 @@ def import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_em
             else:
                 variables = [variables]
 
+        sheet_variables = {}
         _imported_variables = []
         for variable in variables:
             if variable_2_sheet[variable] in ws_name and variable not in _imported_variables:
                 sheet = variable_2_sheet[variable]
-                ws_variable = wb[sheet]
-
                 variable2import = [var for var in variables if var in inverse_dict(variable_2_sheet)[sheet]]
+                sheet_variables[sheet] = variable2import
+                _imported_variables +=variable2import
 
-                profile = read_profile(ws_variable, variables=variable2import, version=version, v_ref=v_ref)
+    if lazy:
+        loader = functools.partial(_load_profiles, ic_path=ic_path, sheet_variables=sheet_variables, version=version,
+                                   v_ref=v_ref, drop_empty=drop_empty, mosaic=False)
+        # variables each sheet may hold, from variable_2_sheet
+        sheet_candidates = {}
+        for sheet in sheet_variables:
+            if sheet_variables[sheet] is not None:
+                sheet_candidates[sheet] = sheet_variables[sheet]
+            elif sheet in inverse_dict(variable_2_sheet):
+                sheet_candidates[sheet] = [var for var in variable_2_sheet if variable_2_sheet[var] == sheet]
+            else:
+                sheet_candidates[sheet] = None
+        core.set_lazy_profile(loader, sheet_candidates)
+    else:
+        _add_profiles(core, wb, sheet_variables, version=version, v_ref=v_ref, drop_empty=drop_empty, ic_path=ic_path,
+                      mosaic=False)
 
-                if profile.get_name() is not core.name:
-                    logger.error('\t(%s) core name %s and profile name %s does not match'
-                                 % (ic_path, core.name, profile.name()))
-                elif not profile.empty:
-                    core.add_profile(profile)
-                    logger.info(' (%s) data imported with success: %s' % (profile.get_name(), profile.get_property()))
-                else:
-                    _temp = [variable for variable in profile.get_variable() if profile[variable].isnull().all()]
-                    if _temp.__len__() > 1:
-                        logger.info(' (%s) no data to import: %s ' % (profile.get_name(), ", ".join(_temp)))
-                    else:
-                        logger.info('(%s) no variable to import' % name)
+    return core
 
-                _imported_variables +=variable2import
 
-    return core
+def _add_profiles(core, wb, sheet_variables, version, v_ref, drop_empty, ic_path, mosaic=False):
+    """
+    Read the profile sheets and add the profiles to the core
+
+    :param core: pysic.Core
+    :param wb: openpyxl.Workbook
+    :param sheet_variables: dict, {sheet: variables to import, None for all variables}
+    :param mosaic: boolean, True for MOSAiC spreadsheet
+    """
+    logger = logging.getLogger(__name__)
+
+    for sheet, variable2import in sheet_variables.items():
+        ws_variable = wb[sheet]
+        if mosaic:
+            profile = read_profile_MOSAiC(ws_variable, variables=variable2import, version=version, v_ref=v_ref)
+            profile['name'] = core.name
+        else:
+            profile = read_profile(ws_variable, variables=variable2import, version=version, v_ref=v_ref)
+            if variable2import is None and not profile.empty:
+                profile['name'] = core.name
+        if drop_empty and not profile.empty:
+            profile.drop_empty_property()
+
+        # 20190615 - read_profile should return an empty profile if there is no variables
+        if profile.empty or not profile.get_property():
+            logger.info('(%s) no data to import from %s ', core.name, sheet)
+        elif profile.get_name() != core.name:
+            logger.error('\t(%s) core name %s and profile name %s does not match', ic_path, core.name,
+                         profile.get_name())
+        else:
+            core.add_profile(profile)
+            logger.info('(%s) data imported with success: %s', core.name, ", ".join(profile.get_property()))
+
+
+def _source(ic_path, data):
+    """
+    :return: file-like object holding data if data is defined, otherwise ic_path
+    """
+    if data is None:
+        return ic_path
+    return io.BytesIO(data)
+
+
+def _load_workbook(ic_path, data=None, sheets=None):
+    """
+    Open a spreadsheet with the fast reader (see pysic.tools.xlsx), or with openpyxl if the fast reader is disabled or
+    does not handle the layout of the spreadsheet
+
+    :param ic_path: string, path to the xlsx ice core spreadsheet
+    :param data: bytes, optional. Content of the spreadsheet, already read
+    :param sheets: list of string, optional. Sheets to read, default all the sheets
+    :return: (workbook, list of all the sheet names of the spreadsheet)
+    """
+    if xlsx.ENABLED:
+        try:
+            wb = xlsx.load_workbook(_source(ic_path, data), sheets=sheets)
+        except xlsx.LayoutError as e:
+            logging.getLogger(__name__).info('(%s) read with openpyxl: %s', ic_path, e)
+        else:
+            return wb, wb.sheetnames
+    if sheets is not None:
+        return _read_sheets(_source(ic_path, data), sheets)
+    wb = openpyxl.load_workbook(filename=_source(ic_path, data), keep_vba=False)  # load the xlsx spreadsheet
+    return wb, wb.sheetnames
+
+
+def _columns(ws, min_row, max_row, min_col, max_col):
+    """
+    Values of a block of cells, column by column. Values are taken from the fast reader worksheet without building
+    cells.
+
+    :param ws: openpyxl worksheet or pysic.tools.xlsx.Worksheet
+    :return: list of np.array of object, one per column
+    """
+    if isinstance(ws, xlsx.Worksheet):
+        return list(ws.block(min_row, max_row, min_col, max_col).T)
+    return [np.array([cell.value for cell in column], dtype=object)
+            for column in ws.iter_cols(min_col, max_col, min_row, max_row)]
+
+
+def _read_sheets(ic_path, sheets):
+    """
+    Read only the given sheets of a spreadsheet. The workbook is opened in read-only mode and the values of the sheets
+    are copied in an in-memory workbook, so that the other sheets are never parsed.
+
+    :param ic_path: string, path to the xlsx ice core spreadsheet, or file-like object
+    :param sheets: list of string, sheets to read
+    :return: (openpyxl.Workbook, list of all the sheet names of the spreadsheet)
+    """
+    wb_ro = openpyxl.load_workbook(filename=ic_path, read_only=True)
+    try:
+        ws_name = wb_ro.sheetnames
+        wb = openpyxl.Workbook()
+        wb.remove(wb.active)
+        for sheet in [sheet for sheet in ws_name if sheet in sheets]:
+            ws_ro = wb_ro[sheet]
+            ws = wb.create_sheet(sheet)
+            for row in ws_ro.iter_rows(values_only=True):
+                ws.append(row)
+    finally:
+        wb_ro.close()
+    return wb, ws_name
+
+
+@instrument.timed('load_profiles')
+def _load_profiles(core, sheets, ic_path, sheet_variables, version, v_ref, drop_empty, mosaic=False):
+    """
+    Lazy profile loader set by import_ic_path(..., lazy=True), called by pysic.Core on first access to the profile
+
+    :param core: pysic.Core
+    :param sheets: list of string, sheets to read
+    """
+    instrument.annotate(file=os.path.basename(ic_path))
+    wb, _ = _load_workbook(ic_path, sheets=sheets)
+    _add_profiles(core, wb, {sheet: sheet_variables[sheet] for sheet in sheets}, version=version, v_ref=v_ref,
+                  drop_empty=drop_empty, ic_path=ic_path, mosaic=mosaic)
 
 
-def import_ic_list(ic_list, variables=variables, v_ref=v_ref, verbose=verbose, drop_empty=drop_empty):
+@instrument.timed('import_ic_list')
+def import_ic_list(ic_list, variables=variables, v_ref=v_ref, verbose=verbose, drop_empty=drop_empty, lazy=lazy,
+                   prefetch=prefetch):
     """
     :param ic_list:
             array, array contains absolute filepath for the cores
     :param variables:
     :param v_ref:
         top, or bottom
+    :param lazy: boolean, default False
+        If True, profiles are imported on first access (see import_ic_path)
+    :param prefetch: int, default 0
+        Number of files read ahead on I/O threads while the current file is parsed (see pysic.tools.pipeline). 0 reads
+        each file when it is parsed.
     """
     logger = logging.getLogger(__name__)
 
+    if prefetch:
+        from pysic.tools import pipeline
+        files = pipeline.Prefetcher(ic_list, depth=prefetch)
+    else:
+        files = ((ic_path, None) for ic_path in ic_list)
+
     ic_dict = {}
     inexisting_ic_list = []
-    for ic_path in ic_list:
-        if verbose:
-            print('Importing data from %s' % ic_path)
-        if not os.path.exists(ic_path):
-            logger.warning("%s does not exists in core directory" % ic_path.split('/')[-1])
-            inexisting_ic_list.append(ic_path.split('/')[-1].split('.')[0])
-        else:
-            ic_data = import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_empty)
-            if not ic_data.variables():
+    with contextlib.closing(files):
+        for ic_path, data in files:
+            if verbose:
+                print('Importing data from %s' % ic_path)
+            if not os.path.exists(ic_path):
+                logger.warning("%s does not exists in core directory", ic_path.split('/')[-1])
                 inexisting_ic_list.append(ic_path.split('/')[-1].split('.')[0])
-                logger.warning("%s have no properties profile" % (ic_data.name))
             else:
-                ic_dict[ic_data.name] = ic_data
+                ic_data = import_ic_path(ic_path, variables=variables, v_ref=v_ref, drop_empty=drop_empty, lazy=lazy,
+                                         data=data)
+                if not ic_data.lazy_sheets() and not ic_data.variables():
+                    inexisting_ic_list.append(ic_path.split('/')[-1].split('.')[0])
+                    logger.warning("%s have no properties profile", ic_data.name)
+                else:
+                    ic_dict[ic_data.name] = ic_data
 
     logging.info("Import ice core lists completed")
     if inexisting_ic_list.__len__() > 0:
-        logger.info("%s core does not exits. Removing from collection" % ', '.join(inexisting_ic_list))
+        logger.info("%s core does not exits. Removing from collection", ', '.join(inexisting_ic_list))
 
     for ic in inexisting_ic_list:
         for ic2 in ic_dict.keys():
             if ic in ic_dict[ic2].collection:
                 ic_dict[ic2].del_from_collection(ic)
-                logger.info("remove %s from %s collection" % (ic, ic2))
+                logger.info("remove %s from %s collection", ic, ic2)
     return ic_dict
 
 
-def import_ic_sourcefile(f_path, variables=None, ic_dir=None, v_ref='top', drop_empty=False):
+def import_ic_sourcefile(f_path, variables=None, ic_dir=None, v_ref='top', drop_empty=False, prefetch=prefetch):
     """
     :param filepath:
             string, absolute path to the file containing either the absolute path of the cores (1 path by line) or the
@@ -633,9 +750,10 @@ def import_ic_sourcefile(f_path, variables=None, ic_dir=None, v_ref='top', drop_
 
     :param v_ref:
         top, or bottom
+    :param prefetch: int, number of files read ahead (see import_ic_list)
     """
     logger = logging.getLogger(__name__)
-    logger.info('Import ice core from source file: %s' % f_path)
+    logger.info('Import ice core from source file: %s', f_path)
 
     if ic_dir is not None:
         with open(f_path) as f:
@@ -644,13 +762,14 @@ def import_ic_sourcefile(f_path, variables=None, ic_dir=None, v_ref='top', drop_
         with open(f_path) as f:
             ics = sorted([line.strip() for line in f if not line.strip().startswith('#')])
 
-    print(ics)
+    logger.debug('ice core list: %s', ', '.join(ics))
 
-    return import_ic_list(ics, variables=variables, v_ref=v_ref, drop_empty=drop_empty)
+    return import_ic_list(ics, variables=variables, v_ref=v_ref, drop_empty=drop_empty, prefetch=prefetch)
 
 
 # read profile
 
+@instrument.timed('read_profile')
 def read_profile(ws_variable, variables=None, version=__CoreVersion__, v_ref='top'):
     """
     :param ws_variable:
@@ -661,6 +780,8 @@ def read_profile(ws_variable, variables=None, version=__CoreVersion__, v_ref='to
         top, or bottom
     """
     logger = logging.getLogger(__name__)
+    instrument.annotate(sheet=ws_variable.title)
+    instrument.count('sheets')
 
     if version == 1:
         row_data_start = 6
@@ -687,34 +808,29 @@ def read_profile(ws_variable, variables=None, version=__CoreVersion__, v_ref='to
         profile = pysic.core.profile.Profile()
     else:
         name = ws_variable['C1'].value
+        row_start = sheet_2_data[ws_variable.title][0]
+        y_cols = [openpyxl.utils.column_index_from_string(col) for col in sheet_2_data[ws_variable.title][1]]
         # Continuous profile
-        if sheet_2_data[ws_variable.title][1].__len__() == 1:
-            y_mid = np.array([ws_variable[sheet_2_data[ws_variable.title][1] + str(row)].value
-                              for row in range(sheet_2_data[ws_variable.title][0], ws_variable.max_row + 1)]).astype(float)
+        if y_cols.__len__() == 1:
+            y_mid = np.array(_columns(ws_variable, row_start, ws_variable.max_row, y_cols[0], y_cols[0])[0]).astype(float)
             y_low = np.nan * np.ones(y_mid.__len__())
             y_sup = np.nan * np.ones(y_mid.__len__())
 
         # Step profile
-        elif sheet_2_data[ws_variable.title][1].__len__() >= 2:
-            y_low = np.array([ws_variable[sheet_2_data[ws_variable.title][1][0] + str(row)].value
-                              for row in range(sheet_2_data[ws_variable.title][0], ws_variable.max_row+1)]).astype(float)
-            y_sup = np.array([ws_variable[sheet_2_data[ws_variable.title][1][1] + str(row)].value
-                              for row in range(sheet_2_data[ws_variable.title][0], ws_variable.max_row+1)]).astype(float)
-            y_mid = np.array([ws_variable[sheet_2_data[ws_variable.title][1][2] + str(row)].value
-                              for row in range(sheet_2_data[ws_variable.title][0], ws_variable.max_row+1)]).astype(float)
+        elif y_cols.__len__() >= 2:
+            max_row = ws_variable.max_row
+            y_low, y_sup, y_mid = [np.array(_columns(ws_variable, row_start, max_row, col, col)[0]).astype(float)
+                                   for col in y_cols[:3]]
 
             # check if y_mid are not nan:
             if np.isnan(y_mid).any():
                 y_mid = (y_low + y_sup) / 2
-                logger.info('(%s - %s ) not all y_mid exits, calculating y_mid = (y_low+y_sup)/2'
-                            % (name, ws_variable.title))
+                logger.info('(%s - %s ) not all y_mid exits, calculating y_mid = (y_low+y_sup)/2', name, ws_variable.title)
             elif np.any(np.abs(((y_low + y_sup)/ 2) - y_mid > 1e-12)):
                     logger.error('(%s - %s ) y_mid are not mid point between y_low and y_sup. \\'
-                                 'Replacing with y_mid = (y_low+y_sup)/2'
-                                 % (name, ws_variable.title))
+                                 'Replacing with y_mid = (y_low+y_sup)/2', name, ws_variable.title)
             else:
-                logger.info('(%s - %s ) y_low, y_mid and y_sup read with success'
-                            % (name, ws_variable.title))
+                logger.info('(%s - %s ) y_low, y_mid and y_sup read with success', name, ws_variable.title)
 
 
         # read data
@@ -728,14 +844,24 @@ def read_profile(ws_variable, variables=None, version=__CoreVersion__, v_ref='to
 
         # _data = [[cell.value if isinstance(cell.value, (float, int)) else np.nan for cell in row]
         #          for row in ws_variable.iter_cols(min_col, max_col, min_row, max_row)]
-        _data = [[cell.value if isinstance(cell.value, (float, int, str)) else np.nan for cell in row]
-                 for row in ws_variable.iter_cols(min_col, max_col, min_row, max_row)]
+        if version == 1 and ws_variable.title in sheet_layout_v1:
+            # map version 1.0 columns onto version 1.1 variables
+            cols = [openpyxl.utils.column_index_from_string(col) for col, _ in sheet_layout_v1[ws_variable.title]]
+            min_col, max_col = min(cols), max(cols)
+            _cols = _columns(ws_variable, min_row, max_row, min_col, max_col)
+            _data = [[v if isinstance(v, (float, int, str)) else np.nan for v in _cols[col - min_col]] for col in cols]
+            variable_headers = [header if header is not None else ws_variable.cell(row_header, col).value
+                                for col, (_, header) in zip(cols, sheet_layout_v1[ws_variable.title])]
+        else:
+            _data = [[v if isinstance(v, (float, int, str)) else np.nan for v in col]
+                     for col in _columns(ws_variable, min_row, max_row, min_col, max_col)]
+            variable_headers = [ws_variable.cell(row_header, col).value for col in range(min_col, max_col+1)]
+        instrument.count('rows', max_row - min_row + 1)
+        instrument.count('cells', (max_row - min_row + 1) * len(_data))
 
         data = np.array([y_low, y_mid, y_sup])
         data = np.vstack([data, np.array(_data)])
 
-        variable_headers = [ws_variable.cell(row_header, col).value for col in range(min_col, max_col+1)]
-
         # # fill missing section with np.nan
         # if fill_missing:
         #     idx = np.where(np.abs(y_low[1:-1]-y_sup[0:-2]) > TOL)[0]
@@ -784,15 +910,15 @@ def read_profile(ws_variable, variables=None, version=__CoreVersion__, v_ref='to
         try:
             length = float(ws_variable['C2'].value)
         except:
-            logger.info('(%s) no ice core length' % name)
+            logger.info('(%s) no ice core length', name)
             length = np.nan
         else:
             if length == 'n/a':
                 profile['comment'] = 'ice core length not available'
-                logger.info('(%s) ice core length is not available (n/a)' % name)
+                logger.info('(%s) ice core length is not available (n/a)', name)
                 length = np.nan
             elif not isinstance(length, (int, float)):
-                logger.info('%s ice core length is not a number' % name)
+                logger.info('%s ice core length is not a number', name)
                 profile['comment'] = 'ice core length not available'
                 length = np.nan
         profile['length'] = [length]*len(profile.index)
@@ -821,6 +947,7 @@ def read_profile(ws_variable, variables=None, version=__CoreVersion__, v_ref='to
     return profile
 
 
+@instrument.timed('read_profile')
 def read_profile_MOSAiC(ws_variable, variables=None, version=__CoreVersion__, v_ref='top'):
     """
     :param ws_variable:
@@ -831,6 +958,8 @@ def read_profile_MOSAiC(ws_variable, variables=None, version=__CoreVersion__, v_
         top, or bottom
     """
     logger = logging.getLogger(__name__)
+    instrument.annotate(sheet=ws_variable.title)
+    instrument.count('sheets')
 
     # read headers:
     n_row = 2
@@ -854,8 +983,7 @@ def read_profile_MOSAiC(ws_variable, variables=None, version=__CoreVersion__, v_
     if 'depth center' in headers:
         loc1 = [ii for ii, h in enumerate(headers) if h == 'depth center'][0] + 1
         headers[loc1-1] = 'y_mid'
-        y_mid = np.array(
-            [ws_variable.cell(row, loc1).value for row in range(5, ws_variable.max_row + 1)]).astype(float)
+        y_mid = np.array(_columns(ws_variable, 5, ws_variable.max_row, loc1, loc1)[0]).astype(float)
 
         # discard trailing nan value from the end up
         # find nan value in y_low and y_sup
@@ -877,8 +1005,8 @@ def read_profile_MOSAiC(ws_variable, variables=None, version=__CoreVersion__, v_
         loc2 = [ii for ii, h in enumerate(headers) if h == 'depth 2'][0]+1
         headers[loc2 - 1] = 'y_sup'
         # TODO: remove 'depth center'
-        y_low = np.array([ws_variable.cell(row, loc1).value for row in range(5, ws_variable.max_row + 1)]).astype(float)
-        y_sup = np.array([ws_variable.cell(row, loc2).value for row in range(5, ws_variable.max_row + 1)]).astype(float)
+        y_low = np.array(_columns(ws_variable, 5, ws_variable.max_row, loc1, loc1)[0]).astype(float)
+        y_sup = np.array(_columns(ws_variable, 5, ws_variable.max_row, loc2, loc2)[0]).astype(float)
 
         # discard trailing nan value from the end up
         # find nan value in y_low and y_sup
@@ -898,16 +1026,13 @@ def read_profile_MOSAiC(ws_variable, variables=None, version=__CoreVersion__, v_
         elif 'y_mid' in headers:
             if np.isnan(y_mid).any() or len(y_mid) == 0:
                 y_mid = (y_low + y_sup) / 2
-                logger.info('(%s ) not all y_mid exits, calculating y_mid = (y_low+y_sup)/2'
-                            % (ws_variable.title))
+                logger.info('(%s ) not all y_mid exits, calculating y_mid = (y_low+y_sup)/2', ws_variable.title)
             elif np.any(np.abs(((y_low + y_sup) / 2) - y_mid > 1e-12)):
                 logger.error('(%s ) y_mid are not mid point between y_low and y_sup. \\'
-                             'Replacing with y_mid = (y_low+y_sup)/2'
-                             % (ws_variable.title))
+                             'Replacing with y_mid = (y_low+y_sup)/2', ws_variable.title)
                 y_mid = (y_low + y_sup) / 2
             else:
-                logger.info('(%s ) y_low, y_mid and y_sup read with success'
-                            % (ws_variable.title))
+                logger.info('(%s ) y_low, y_mid and y_sup read with success', ws_variable.title)
         else:
             y_mid = (y_low + y_sup) / 2
     elif 'depth 1' in headers:
@@ -933,7 +1058,9 @@ def read_profile_MOSAiC(ws_variable, variables=None, version=__CoreVersion__, v_
     # Drop column with depth:
     # _data = [[cell.value if isinstance(cell.value, (float, int)) else np.nan for cell in row]
     #                   for row in ws_variable.iter_rows(n_row_min, n_row_max, n_col_min, n_col_max)]
-    _data = [[cell.value for cell in row] for row in ws_variable.iter_rows(n_row_min, n_row_max, n_col_min, n_col_max)]
+    _data = [list(row) for row in zip(*_columns(ws_variable, n_row_min, n_row_max, n_col_min, n_col_max))]
+    instrument.count('rows', len(_data))
+    instrument.count('cells', len(_data) * (n_col_max - n_col_min + 1))
 
     # TODO:  fill missing section with np.nan
     # if fill_missing:
@@ -1102,6 +1229,7 @@ def make_ic_sourcefile(dirpath, fileext, source_filepath=None):
 #     return ic_list
 
 # updater
+@instrument.timed('update_spreadsheet')
 def update_spreadsheet(ic_path, v_ref='top', backup=True):
     """
     update_spreadsheet update an ice core file to the latest ice core file version (__CoreVersion__).
@@ -1243,6 +1371,21 @@ def update_spreadsheet(ic_path, v_ref='top', backup=True):
 
 # TODO: cleaner function to (1) remove trailing and heading space in instrument
 
+def mosaic_version(value):
+    """
+    Parse the version of a MOSAiC spreadsheet: a number, or a number followed by a letter (e.g. '1.2a' is read as 1.2)
+
+    :param value: cell C1 of the metadata-coring sheet
+    :return: float, or value unchanged if it is not a version number (e.g. '1.3.1')
+    """
+    if isinstance(value, (float, int)):
+        return float(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)[a-zA-Z]?\s*', value) if isinstance(value, str) else None
+    if match is None:
+        return value
+    return float(match.group(1))
+
+
 def update_spreadsheet_MOSAiC(ic_path, backup = True):
     logger = logging.getLogger(__name__)
 
@@ -1261,10 +1404,10 @@ def update_spreadsheet_MOSAiC(ic_path, backup = True):
     # major Y
     # minor Z
 
-    try:
-        version = float(ws_summary['C1'].value[:-1])
-    except TypeError:
-        version = ws_summary['C1'].value
+    version = mosaic_version(ws_summary['C1'].value)
+    if not isinstance(version, float):
+        logger.error("\t%s ice core file version %s not handled" % (ic_path, version))
+        return 0
     #
     #
     # try:
@@ -1465,4 +1608,15 @@ def inverse_dict(map):
         else:
             revdict[v] = revdict.get(v, [])
             revdict[v].append(k)
-    return revdict
\ No newline at end of file
+    return revdict
+
+
+def __getattr__(name):
+    """
+    Import core submodules lazily on first access (PEP 562)
+    :param name: string, attribute name
+    :return: module
+    """
+    if name in _submodules:
+        return importlib.import_module('pysic.core.' + name)
+    raise AttributeError("module 'pysic.core' has no attribute '%s'" % name)
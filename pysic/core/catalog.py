@@ -0,0 +1,334 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.catalog.py : SQLite catalog of ice core spreadsheets
+
+The catalog stores, for each spreadsheet, the metadata read from the summary sheet (version 1.x) or from the
+metadata-coring and metadata-core sheets (MOSAiC): core name, date, origin, latitude, longitude, spreadsheet version,
+ice thickness, collection, sheet names and variables available in the profile sheets. Only these sheets and the header
+row of the profile sheets are read, with the workbook opened in read-only mode. The catalog is refreshed incrementally:
+only spreadsheets added or modified since the last scan (file modification time) are read again.
+
+USAGE:
+    pysic.core.catalog.build_catalog(ic_dir, 'ice_cores.sqlite')
+    ic_paths = pysic.core.catalog.query_catalog('ice_cores.sqlite', origin='BRW', variables='salinity',
+                                                date_start='2017-01-01', date_end='2017-06-30')
+    ics_dict = pysic.core.catalog.import_ic_catalog('ice_cores.sqlite', origin='BRW', variables='salinity')
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "catalog.py contains function to index ice core spreadsheets metadata in a SQLite database"
+
+__all__ = ["read_metadata", "build_catalog", "query_catalog", "import_ic_catalog"]
+
+import datetime
+import logging
+import os
+import sqlite3
+
+import openpyxl
+
+import pysic.core
+from pysic.tools import instrument
+
+## Default values:
+fileext = '.xlsx'
+level = 10  # directory recursion level
+columns = ['path', 'mtime', 'name', 'date', 'origin', 'lat', 'lon', 'version', 'format', 'ice_thickness',
+           'collection', 'sheets', 'variables']
+
+# metadata layout: {format: {sheet: last row read}}
+_metadata_rows = {'v1': {'summary': 34}, 'MOSAiC': {'metadata-coring': 31, 'metadata-core': 10}}
+# row of the profile headers
+_header_row = {1: 4, 1.1: 5, 'MOSAiC': 2}
+_ignored_sheets = ['summary', 'abreviation', 'locations', 'lists', 'Vf_oil_calculation', 'TEX', 'snow',
+                   'metadata-core', 'metadata-coring']
+
+_schema = """CREATE TABLE IF NOT EXISTS cores (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    name TEXT,
+    date TEXT,
+    origin TEXT,
+    lat REAL,
+    lon REAL,
+    version TEXT,
+    format TEXT,
+    ice_thickness REAL,
+    collection TEXT,
+    sheets TEXT,
+    variables TEXT)"""
+
+
+def _read_rows(ws, max_row):
+    """
+    Read the first max_row rows of a read-only worksheet in one pass
+
+    :return: function, value(cell) with cell in A1 notation, None if the cell does not exist
+    """
+    rows = list(ws.iter_rows(min_row=1, max_row=max_row, values_only=True))
+
+    def value(cell):
+        col, row = openpyxl.utils.cell.coordinate_from_string(cell)
+        col = openpyxl.utils.cell.column_index_from_string(col)
+        if row > len(rows) or col > len(rows[row - 1]):
+            return None
+        return rows[row - 1][col - 1]
+    return value, rows
+
+
+def _row_values(rows, row, col_start=3):
+    """
+    Values of a row, from col_start to the first empty cell
+    """
+    values = []
+    if row <= len(rows):
+        for value in rows[row - 1][col_start - 1:]:
+            if value is None:
+                break
+            values.append(str(value))
+    return values
+
+
+def _date(date, time=None):
+    """
+    :return: string, date in ISO format without timezone, or None
+    """
+    if isinstance(date, datetime.datetime):
+        if isinstance(time, datetime.time):
+            date = datetime.datetime.combine(date.date(), time)
+        return date.replace(tzinfo=None).isoformat()
+    return None
+
+
+def _number(value):
+    if isinstance(value, (float, int)):
+        return float(value)
+    return None
+
+
+def _variables(ws, row_header, version=None):
+    """
+    Variables named in the header row of a profile sheet
+    """
+    headers = next(ws.iter_rows(min_row=row_header, max_row=row_header, values_only=True), ())
+    if version == 1 and ws.title in pysic.core.sheet_layout_v1:
+        # version 1.0 columns mapped onto version 1.1 variables, see read_profile
+        _headers = []
+        for col, header in pysic.core.sheet_layout_v1[ws.title]:
+            col = openpyxl.utils.cell.column_index_from_string(col)
+            _headers.append(header if header is not None or col > len(headers) else headers[col - 1])
+        headers = _headers
+    return [h for h in headers if isinstance(h, str) and h in pysic.core.variable_2_sheet]
+
+
+def read_metadata(ic_path):
+    """
+    Read the metadata of an ice core spreadsheet without importing the profiles
+
+    :param ic_path: string, path to the xlsx ice core spreadsheet
+    :return: dict, with keys columns, None if the spreadsheet is not an ice core spreadsheet
+    """
+    wb = openpyxl.load_workbook(filename=ic_path, read_only=True)
+    try:
+        metadata = {'path': ic_path, 'mtime': os.path.getmtime(ic_path), 'sheets': ', '.join(wb.sheetnames)}
+        if 'summary' in wb.sheetnames:
+            value, rows = _read_rows(wb['summary'], _metadata_rows['v1']['summary'])
+            version = value('C3')
+            # version 1.0 summary has an extra row 'core number in series' before core collection
+            n_row_collection = 23 if isinstance(version, (float, int)) and version < 1.1 else 22
+            metadata.update({'name': value('C21'), 'format': 'v1', 'version': str(version),
+                             'date': _date(value('C2'), value('D2')), 'origin': value('C5'),
+                             'lat': _number(value('C6')), 'lon': _number(value('D6')),
+                             'ice_thickness': _number(value('C11')),
+                             'collection': ', '.join(_row_values(rows, n_row_collection))})
+            row_header = _header_row.get(version, _header_row[1.1])
+        elif 'metadata-coring' in wb.sheetnames and 'metadata-core' in wb.sheetnames:
+            value, rows = _read_rows(wb['metadata-coring'], _metadata_rows['MOSAiC']['metadata-coring'])
+            value_core, _ = _read_rows(wb['metadata-core'], _metadata_rows['MOSAiC']['metadata-core'])
+            version = value('C1')
+            metadata.update({'name': value_core('C1'), 'format': 'MOSAiC', 'version': str(version),
+                             'date': _date(value_core('C2'), value_core('C3')), 'origin': value('C3'),
+                             'lat': _number(value('C8')), 'lon': _number(value('C9')),
+                             'ice_thickness': _number(value_core('C7')),
+                             'collection': ', '.join(_row_values(rows, 31))})
+            row_header = _header_row['MOSAiC']
+        else:
+            return None
+
+        variables = []
+        for sheet in wb.sheetnames:
+            if sheet not in _ignored_sheets and sheet.lower().find('fig') == -1:
+                variables += [v for v in _variables(wb[sheet], row_header, version) if v not in variables]
+        metadata['variables'] = ', '.join(variables)
+    finally:
+        wb.close()
+    instrument.count('files')
+    return metadata
+
+
+def _connect(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.execute(_schema)
+    return connection
+
+
+def build_catalog(ic_paths, db_path, fileext=fileext):
+    """
+    Create or refresh the catalog. Spreadsheets already indexed are read again only if their modification time changed;
+    entries of spreadsheets that no longer exist are removed.
+
+    :param ic_paths: string, directory scanned for spreadsheet with extension fileext, or list of spreadsheet path
+    :param db_path: string, path to the SQLite database
+    :param fileext: string, default '.xlsx'
+    :return: dict, number of spreadsheets 'added', 'updated', 'unchanged', 'removed' and 'skipped'
+    """
+    logger = logging.getLogger(__name__)
+
+    if isinstance(ic_paths, str):
+        ic_paths = pysic.core.list_folder(ic_paths, fileext=fileext, level=level)
+    ic_paths = sorted(os.path.realpath(ic_path) for ic_path in ic_paths)
+
+    stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'skipped': 0}
+    connection = _connect(db_path)
+    try:
+        indexed = dict(connection.execute('SELECT path, mtime FROM cores').fetchall())
+        entries = []
+        for ic_path in ic_paths:
+            if indexed.get(ic_path) == os.path.getmtime(ic_path):
+                stats['unchanged'] += 1
+                continue
+            try:
+                metadata = read_metadata(ic_path)
+            except Exception as e:
+                logger.warning('(%s) metadata not readable: %s', ic_path, e)
+                metadata = None
+            if metadata is None:
+                stats['skipped'] += 1
+                continue
+            stats['updated' if ic_path in indexed else 'added'] += 1
+            entries.append(tuple(metadata[c] for c in columns))
+        removed = [(path,) for path in indexed if path not in ic_paths and not os.path.exists(path)]
+        stats['removed'] = len(removed)
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO cores (%s) VALUES (%s)' %
+                                   (', '.join(columns), ', '.join(['?'] * len(columns))), entries)
+            connection.executemany('DELETE FROM cores WHERE path = ?', removed)
+    finally:
+        connection.close()
+    logger.info('catalog %s: %s', db_path, ', '.join('%d %s' % (n, s) for s, n in stats.items()))
+    return stats
+
+
+def query_catalog(db_path, name=None, origin=None, collection=None, variables=None, date_start=None,
+                  date_end=None, lat=None, lon=None, where=None, params=(), output='path'):
+    """
+    Select spreadsheets from the catalog. All criteria are combined.
+
+    :param db_path: string, path to the SQLite database
+    :param name: string or list of string, core name
+    :param origin: string or list of string, core origin (site)
+    :param collection: string, core name in the core collection
+    :param variables: string or list of string, variables all available in the spreadsheet
+    :param date_start: datetime.datetime or ISO string, earliest core date (inclusive)
+    :param date_end: datetime.datetime or ISO string, latest core date (inclusive). A date without time includes the
+        whole day
+    :param lat: [lat_min, lat_max], latitude range in decimal degree
+    :param lon: [lon_min, lon_max], longitude range in decimal degree
+    :param where: string, extra SQL condition on the columns of the catalog, with '?' placeholders
+    :param params: tuple, values of the placeholders in where
+    :param output: 'path' or 'record'
+    :return: list of path, or list of dict with keys columns if output is 'record'
+    """
+    conditions = []
+    values = []
+
+    def _in(column, items):
+        if not isinstance(items, (list, tuple, set)):
+            items = [items]
+        conditions.append('%s IN (%s)' % (column, ', '.join(['?'] * len(items))))
+        values.extend(items)
+
+    if name is not None:
+        _in('name', name)
+    if origin is not None:
+        _in('origin', origin)
+    if collection is not None:
+        conditions.append("(', ' || collection || ', ') LIKE ?")
+        values.append('%%, %s, %%' % collection)
+    if variables is not None:
+        if not isinstance(variables, list):
+            variables = [variables]
+        for variable in variables:
+            conditions.append("(', ' || variables || ', ') LIKE ?")
+            values.append('%%, %s, %%' % variable)
+    if date_start is not None:
+        if isinstance(date_start, datetime.datetime):
+            date_start = date_start.replace(tzinfo=None).isoformat()
+        elif isinstance(date_start, datetime.date):
+            date_start = date_start.isoformat()
+        conditions.append('date >= ?')
+        values.append(date_start)
+    if date_end is not None:
+        if isinstance(date_end, datetime.datetime):
+            date_end = date_end.replace(tzinfo=None).isoformat()
+        elif isinstance(date_end, datetime.date):
+            date_end = date_end.isoformat()
+        if len(date_end) == 10:
+            date_end += 'T23:59:59.999999'
+        conditions.append('date <= ?')
+        values.append(date_end)
+    if lat is not None:
+        conditions.append('lat BETWEEN ? AND ?')
+        values.extend([min(lat), max(lat)])
+    if lon is not None:
+        conditions.append('lon BETWEEN ? AND ?')
+        values.extend([min(lon), max(lon)])
+    if where is not None:
+        conditions.append('(%s)' % where)
+        values.extend(params)
+
+    sql = 'SELECT %s FROM cores' % ', '.join(columns)
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    sql += ' ORDER BY path'
+
+    connection = _connect(db_path)
+    try:
+        records = [dict(zip(columns, row)) for row in connection.execute(sql, values).fetchall()]
+    finally:
+        connection.close()
+
+    if output == 'record':
+        return records
+    return [record['path'] for record in records]
+
+
+def import_ic_catalog(db_path, variables=None, v_ref='top', drop_empty=False, lazy=False, **query):
+    """
+    Import the ice cores selected in the catalog, see import_ic_list
+
+    :param db_path: string, path to the SQLite database
+    :param variables: variables to import. If defined, only spreadsheets containing all the variables are selected
+    :param v_ref: 'top' or 'bottom'
+    :param drop_empty: boolean
+    :param lazy: boolean, if True profiles are imported on first access (see import_ic_path)
+    :param query: selection criteria of query_catalog (name, origin, collection, date_start, date_end, lat, lon,
+        where, params)
+    :return: dict of pysic.Core
+    """
+    logger = logging.getLogger(__name__)
+
+    _variables = variables
+    if isinstance(variables, str) and variables.lower().find('state variable') + 1:
+        _variables = ['temperature', 'salinity']
+    ic_paths = query_catalog(db_path, variables=_variables, **query)
+    logger.info('%d ice cores selected in catalog %s', len(ic_paths), db_path)
+    return pysic.core.import_ic_list(ic_paths, variables=variables, v_ref=v_ref, drop_empty=drop_empty, lazy=lazy)
@@ -5,7 +5,9 @@ pysic.core.coreset.py : CoreStack class
 
 """
 import datetime as dt
+import importlib
 import logging
+import os
 import warnings
 
 import numpy as np
@@ -13,6 +15,7 @@ import pandas as pd
 
 import pysic
 from pysic.core.profile import *
+from pysic.tools import instrument
 
 __name__ = "corestack"
 __author__ = "Marc Oggier"
@@ -26,7 +29,7 @@ __date__ = "2017/09/13"
 __comment__ = "corestack.py contained classes to handle ice core data"
 __CoreVersion__ = 1.1
 
-__all__ = ["CoreStack", "stack_cores"]
+__all__ = ["CoreStack", "stack_cores", "normalize_depth", "to_grid", "from_grid"]
 
 TOL = 1e-6
 
@@ -44,6 +47,10 @@ fill_extremity = False
 variables = None
 verbose = False
 dropemptyrow=False
+normalized_depth = False
+n_worker = 1
+# core metadata stored as core coordinates in the gridded view
+grid_core_coords = ['date', 'origin', 'ice_thickness', 'length', 'v_ref', 'collection', 'lat', 'lon']
 
 class CoreStack(pd.DataFrame):
     """
@@ -81,13 +88,16 @@ class CoreStack(pd.DataFrame):
         """
         return CoreStack(delete_profile(self, variable_dict))
 
+    @instrument.timed('add_core')
     def add_core(self, ic_data, verbose=False):
         """
         :param ic_data:
         :return:
         """
+        instrument.annotate(core=ic_data.name)
         if len(ic_data.variables()):
-            self.logger.info("Adding %s profiles for core %s" % (", ".join(ic_data.variables()), ic_data.name))
+            instrument.count('cores')
+            self.logger.info("Adding %s profiles for core %s", ", ".join(ic_data.variables()), ic_data.name)
             profile = pysic.core.profile.Profile(ic_data.profile)
             # TODO: should not need those 3 if case
             if isinstance(ic_data.ice_thickness, (int, float)):
@@ -164,25 +174,35 @@ class CoreStack(pd.DataFrame):
                     _ic.loc[(_ic.variable == vg), 'variables'] = ', '.join(new_vg)
         return pd.concat([_ic_stack, _ic], sort=False)
 
-    def section_stat(self, groups=None, variables=None, stats=['min', 'mean', 'max', 'std'], dropemptyrow=dropemptyrow):
+    def section_stat(self, groups=None, variables=None, stats=['min', 'mean', 'max', 'std'], dropemptyrow=dropemptyrow,
+                     n_worker=n_worker):
         """
 
         :param variables:
         :param stats:
         :param groups:
+        :param n_worker: int, number of worker processes (default 1), see grouped_stat
         :return:
         """
 
-        return grouped_stat(self, groups=groups, variables=variables, stats=stats, dropemptyrow=dropemptyrow)
+        return grouped_stat(self, groups=groups, variables=variables, stats=stats, dropemptyrow=dropemptyrow,
+                            n_worker=n_worker)
 
+    @instrument.timed('discretize')
     def discretize(self, y_bins=y_bins, y_mid=y_mid, display_figure=display_figure, fill_gap=fill_gap,
-                   fill_extremity=fill_extremity, variables=variables, verbose=verbose, dropemptyrow=dropemptyrow):
+                   fill_extremity=fill_extremity, variables=variables, verbose=verbose, dropemptyrow=dropemptyrow,
+                   normalized_depth=normalized_depth, n_worker=n_worker):
         """
         :param y_bins:
         :param y_mid:
         :param display_figure:
         :param fill_extremity:
         :param fill_gap:
+        :param normalized_depth: False (default), 'relative' or float. If 'relative', depths are normalized to 0-1
+            before discretization, and y_bins are given in relative depth. If float, cores are scaled to this ice
+            thickness before discretization (see normalize_depth).
+        :param n_worker: int, number of worker processes (default 1). With more than 1, cores are split between the
+            workers; the stack is published once in shared memory (see pysic.tools.shared).
         :return:
         """
 
@@ -192,16 +212,25 @@ class CoreStack(pd.DataFrame):
             from pysic.core.profile import select_variables
             ics_stack = select_variables(ics_stack, variables)
 
-        data_binned = pd.DataFrame()
-        for core in ics_stack.names():
-            if verbose:
-                print(core)
-            profile = ics_stack[ics_stack.name == core]
-            profile_d = pysic.core.profile.discretize_profile(profile, y_bins=y_bins, y_mid=y_mid,
-                                                               display_figure=display_figure, fill_gap=fill_gap,
-                                                               fill_extremity=fill_extremity, dropemptyrow=dropemptyrow)
-
-            data_binned = data_binned.append(profile_d, sort=True)
+        if normalized_depth is not False and normalized_depth is not None:
+            h_target = None if normalized_depth == 'relative' else normalized_depth
+            ics_stack = normalize_depth(ics_stack, h_target=h_target)
+
+        kwargs = dict(y_bins=y_bins, y_mid=y_mid, display_figure=display_figure, fill_gap=fill_gap,
+                      fill_extremity=fill_extremity, verbose=verbose, dropemptyrow=dropemptyrow)
+        if n_worker is None or n_worker > 1:
+            from pysic.tools import shared
+
+            # partitions of whole cores, in the order of names()
+            names = ics_stack.names()
+            core_codes = pd.Categorical(ics_stack.name, categories=names).codes
+            n_partition = min(len(names), 4 * (n_worker or os.cpu_count() or 1))
+            partitions = [np.nonzero(np.isin(core_codes, codes))[0]
+                          for codes in np.array_split(np.arange(len(names)), max(n_partition, 1))]
+            data_binned = shared.map_partitions(_discretize_cores, ics_stack, partitions, n_worker=n_worker, **kwargs)
+            data_binned = pd.concat(data_binned, sort=True) if data_binned else pd.DataFrame()
+        else:
+            data_binned = _discretize_cores(ics_stack, **kwargs)
         data_binned = CoreStack(data_binned)
         data_binned = data_binned.reset_index(drop=True)
         data_binned = data_binned.clean_stack()
@@ -219,34 +248,51 @@ class CoreStack(pd.DataFrame):
             temp = temp.append(profile)
         return CoreStack(temp)
 
+    @instrument.timed('set_orientation')
     def set_orientation(self, v_ref, skipna=True):
         """
+        Set the vertical reference of all the cores of the stack in a single pass
 
-        :param v_ref:
-        :return:
+        :param v_ref: new reference 'top', 'bottom'
+        :param skipna: boolean, default True. If True, cores without ice thickness which need to be flipped are
+            discarded. If False, their ice core length is used instead.
+        :return: CoreStack
         """
+        unoriented = self.v_ref.values != v_ref
+        no_hi = unoriented & pd.to_numeric(self.ice_thickness, errors='coerce').isna().values
+        if no_hi.any():
+            if skipna:
+                self.logger.info('NO ICE THICKNESS, discarded: %s', ', '.join(pd.unique(self.name.values[no_hi])))
+            else:
+                self.logger.info('NO ICE THICKNESS %s', ', '.join(pd.unique(self.name.values[no_hi])))
+        stack = self[~no_hi] if skipna else self
+        instrument.count('rows', int(unoriented.sum()))
+        return CoreStack(pysic.core.profile.set_profile_orientation(stack.copy(), v_ref))
 
-        oriented_stack = self.loc[self.v_ref == v_ref]
-        unoriented_stack = self.loc[self.v_ref != v_ref]
-
-        if not unoriented_stack.empty:
-            for hi in unoriented_stack.ice_thickness.unique().astype(float):
-                if np.isnan(hi) and not skipna:
-                    print('nan')
-                    subset = unoriented_stack[unoriented_stack.ice_thickness.isna()]
-                    for hi_ in subset.length.unique():
-                        _subset = subset[subset.length == hi_]
-                        if not np.isnan(hi_):
-                            oriented_stack = oriented_stack.append(
-                                pysic.core.profile.set_profile_orientation(_subset, v_ref))
-                            self.logger.info('NO ICE THICKNESS ' + ', '.join(_subset.names()))
-                        else:
-                            _subset = subset[subset.length.isna()]
-                            self.logger.info('NO LENGTH, NO ICE THICKNESS ' + ', '.join(_subset.names()))
-                else:
-                    subset = unoriented_stack[unoriented_stack.ice_thickness == hi]
-                    oriented_stack = oriented_stack.append(pysic.core.profile.set_profile_orientation(subset, v_ref))
-        return CoreStack(oriented_stack)
+    def pair_cores(self, variables=['salinity', 'temperature']):
+        """
+        Pair salinity cores with temperature (and density) cores of their collection
+
+        :param variables: list of string, default ['salinity', 'temperature']
+        :return: pd.DataFrame, one row per pair (see pysic.property.pair_cores)
+        """
+        return importlib.import_module('pysic.property').pair_cores(self, variables=variables)
+
+    def compute_phys_prop(self, si_prop, ice_type='sw', density=False, pairs=None, inplace=True):
+        """
+        Compute physical properties for all the salinity cores of the stack at once
+
+        :param si_prop: string or list of string, properties in pysic.property.prop_list
+        :param ice_type: 'sw' (default) or 'nacl'
+        :param density: boolean, default False. If True, density cores are paired as well and passed to the property
+            functions
+        :param pairs: pd.DataFrame, optional, core pairs as returned by pair_cores
+        :param inplace: boolean, default True. If True, the stack with the property profiles is returned, otherwise
+            only the property profiles
+        :return: CoreStack (see pysic.property.compute_phys_prop_from_stack)
+        """
+        return importlib.import_module('pysic.property').compute_phys_prop_from_stack(
+            self, si_prop, ice_type=ice_type, density=density, pairs=pairs, inplace=inplace)
 
     def core_in_collection(self, core):
         temp = self.loc[self.name == core, 'collection'].values
@@ -357,7 +403,7 @@ class CoreStack(pd.DataFrame):
             col_float += ['w_' + v for v in self.variables()]
         col_float += [c for c in self.columns if c not in col_string and c not in col_date]
 
-        c_float = [c for c in col_float if c in self.columns]
+        c_float = list(set([c for c in col_float if c in self.columns]))
         self[c_float] = self[c_float].apply(pd.to_numeric)
         c_date = [c for c in col_date if c in self.columns]
         self[c_date] = self[c_date].apply(pd.to_datetime)
@@ -453,13 +499,237 @@ class CoreStack(pd.DataFrame):
         """
         return self.variable.unique()
 
+    def query(self, expr=None, **kwargs):
+        """
+        :param expr: string, optional. Query expression, evaluated by pandas.DataFrame.query
+        :return: pysic.core.query.StackQuery, lazy selection over the stack; with expr, result of
+            pandas.DataFrame.query
+        """
+        if expr is not None:
+            return super(CoreStack, self).query(expr, **kwargs)
+        from pysic.core.query import StackQuery
+        return StackQuery(self)
+
+    def check(self, tol=TOL):
+        """
+        Check the integrity of all the profiles of the stack
+
+        :param tol: float, tolerance on the depths [m]
+        :return: pd.DataFrame, issue table (see pysic.core.integrity.check)
+        """
+        return importlib.import_module('pysic.core.integrity').check(self, tol=tol)
+
+    def normalize_depth(self, h_target=None):
+        """
+        Scale the depth of all cores to a common ice thickness
+
+        :param h_target: float, optional, target ice thickness. Default None, depths are relative (0-1)
+        :return: CoreStack (see normalize_depth)
+        """
+        return normalize_depth(self, h_target=h_target)
+
+    def to_grid(self, variables=None):
+        """
+        Dense core x depth view of a discretized stack
+
+        :param variables: list of string, optional. Default all the variables of the stack
+        :return: xarray.Dataset (see to_grid)
+        """
+        return to_grid(self, variables=variables)
+
+    @staticmethod
+    def from_grid(ds):
+        """
+        :param ds: xarray.Dataset, as returned by to_grid
+        :return: CoreStack
+        """
+        return from_grid(ds)
+
+    def to_netcdf(self, path, chunk_core=100, engine=None):
+        """
+        Write the stack to a directory of NetCDF parts of chunk_core cores each
+
+        :param path: string, directory of the parts
+        :return: list of string, paths of the parts (see pysic.core.netcdf.to_netcdf)
+        """
+        return importlib.import_module('pysic.core.netcdf').to_netcdf(self, path, chunk_core=chunk_core, engine=engine)
+
     @property
     def _constructor(self):
         return CoreStack
 
     pass
 
+
+def _discretize_cores(ics_stack, y_bins=y_bins, y_mid=y_mid, display_figure=display_figure, fill_gap=fill_gap,
+                      fill_extremity=fill_extremity, verbose=verbose, dropemptyrow=dropemptyrow):
+    """
+    Discretize the cores of a stack one by one; run by CoreStack.discretize, in the current process or in a worker
+
+    :return: pd.DataFrame, discretized profiles appended in the order of the cores
+    """
+    ics_stack = CoreStack(ics_stack)
+    data_binned = pd.DataFrame()
+    for core in ics_stack.names():
+        if verbose:
+            print(core)
+        profile = ics_stack[ics_stack.name == core]
+        profile_d = pysic.core.profile.discretize_profile(profile, y_bins=y_bins, y_mid=y_mid,
+                                                           display_figure=display_figure, fill_gap=fill_gap,
+                                                           fill_extremity=fill_extremity, dropemptyrow=dropemptyrow)
+
+        data_binned = data_binned.append(profile_d, sort=True)
+    # plain DataFrame: Profile cannot be pickled back from a worker
+    return pd.DataFrame(data_binned)
+
+
+@instrument.timed('normalize_depth')
+def normalize_depth(ics_stack, h_target=None):
+    """
+    Scale the depth of all the profiles of a stack to a common ice thickness in a single pass. Each profile (core and
+    variable group) is scaled by its ice core length, or by the ice thickness if the length is not defined, as in
+    pysic.property.scale_profile. Ice thickness, freeboard and snow depth are scaled by the same factor, so that the
+    vertical reference of the profiles (see set_orientation) stays consistent. The scale factor of each row is stored in
+    the column scale_factor, multiplied by any previous scale factor, so that the original depth is y / scale_factor.
+
+    :param ics_stack: CoreStack
+    :param h_target: float, optional, target ice thickness. Default None, depths are relative: 0 at the vertical
+        reference, 1 at the opposite interface.
+    :return: CoreStack. Profiles without ice core length and ice thickness are discarded.
+    """
+    logger = logging.getLogger(__name__)
+
+    if ics_stack.empty:
+        return CoreStack(ics_stack)
+
+    codes = pysic.core.profile._profile_codes(ics_stack)
+    n_profile = codes.max() + 1
+
+    h_ref = pysic.core.profile._last_per_profile(ics_stack, 'length', codes, n_profile)
+    hi = pysic.core.profile._last_per_profile(ics_stack, 'ice_thickness', codes, n_profile)
+    h_ref = np.where(np.isnan(h_ref), hi, h_ref)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = (1. if h_target is None else h_target) / h_ref
+    missing = ~np.isfinite(scale)
+    if missing.any():
+        logger.warning('No ice core length or ice thickness, impossible to normalize depth. Discarding %s',
+                       ', '.join(pd.unique(ics_stack.name.values[missing]).astype(str)))
+
+    stack = ics_stack[~missing].copy()
+    scale = scale[~missing]
+    y = stack[['y_low', 'y_mid', 'y_sup']].apply(pd.to_numeric, errors='coerce').values
+    stack[['y_low', 'y_mid', 'y_sup']] = y * scale[:, None]
+    stack['length'] = 1. if h_target is None else h_target
+    for key in ['ice_thickness', 'freeboard', 'snow_depth']:
+        if key in stack.columns:
+            stack[key] = pd.to_numeric(stack[key], errors='coerce').values * scale
+    if 'scale_factor' in stack.columns:
+        scale = scale * pd.to_numeric(stack['scale_factor'], errors='coerce').fillna(1).values
+    stack['scale_factor'] = scale
+    instrument.count('rows', len(stack))
+    return CoreStack(stack)
+
+
+@instrument.timed('to_grid')
+def to_grid(ics_stack, variables=None):
+    """
+    Convert a discretized stack to an xarray.Dataset with dimensions core and y_mid. Each variable, and its weight
+    w_variable if present, is a dense (core, y_mid) array, nan where the core has no data. Section boundaries y_low and
+    y_sup are coordinates along y_mid; core metadata (date, origin, ice_thickness, ...) are coordinates along core.
+    The grid is given by the sections of the step profiles; linear profiles are placed on the grid by y_mid, and their
+    points not on the grid (e.g. original measurements kept by discretize) are discarded.
+
+    :param ics_stack: CoreStack, discretized with a common y_bins
+    :param variables: list of string, optional. Default all the variables of the stack
+    :return: xarray.Dataset
+    """
+    import xarray as xr
+
+    logger = logging.getLogger(__name__)
+
+    if variables is None:
+        variables = sorted(ics_stack.variables())
+    variables = [variable for variable in variables if variable in ics_stack.columns]
+
+    # grid from the sections of the step profiles
+    y_mid = ics_stack.y_mid.astype(float).values
+    step = ics_stack.y_low.notnull().values & ics_stack.y_sup.notnull().values & ~np.isnan(y_mid)
+    y_grid, first_y = np.unique(y_mid[step], return_index=True)
+    y_low = ics_stack.y_low.astype(float).values[step][first_y]
+    y_sup = ics_stack.y_sup.astype(float).values[step][first_y]
+
+    # rows on the grid
+    i_y = np.clip(np.searchsorted(y_grid, y_mid), 0, max(len(y_grid) - 1, 0))
+    if len(y_grid):
+        i_y_low = np.maximum(i_y - 1, 0)
+        i_y = np.where(np.abs(y_grid[i_y_low] - y_mid) < np.abs(y_grid[i_y] - y_mid), i_y_low, i_y)
+        on_grid = np.abs(y_grid[i_y] - y_mid) < TOL
+    else:
+        on_grid = np.zeros(len(y_mid), dtype=bool)
+    if (~on_grid).any():
+        logger.info('%d rows not on the grid are discarded', (~on_grid).sum())
+    data = ics_stack[on_grid]
+    i_y = i_y[on_grid]
+    i_core, names = pd.factorize(data.name.values)
+
+    data_vars = {}
+    for variable in variables + ['w_' + variable for variable in variables if 'w_' + variable in data.columns]:
+        values = pd.to_numeric(data[variable], errors='coerce').values
+        valid = ~np.isnan(values)
+        grid = np.full((len(names), len(y_grid)), np.nan)
+        grid[i_core[valid], i_y[valid]] = values[valid]
+        data_vars[variable] = (('core', 'y_mid'), grid)
+
+    # core metadata, first value of each core
+    first_core = np.unique(i_core, return_index=True)[1]
+    coords = {'core': np.array(names, dtype=object), 'y_mid': y_grid,
+              'y_low': ('y_mid', y_low), 'y_sup': ('y_mid', y_sup)}
+    for key in grid_core_coords:
+        if key in data.columns:
+            coords[key] = ('core', data[key].values[first_core])
+
+    instrument.count('cores', len(names))
+    instrument.count('bins', len(y_grid))
+    return xr.Dataset(data_vars, coords=coords)
+
+
+@instrument.timed('from_grid')
+def from_grid(ds):
+    """
+    Convert a core x depth xarray.Dataset back to a CoreStack. Each core gets one row per section with data, and a
+    single variable group made of the variables with data for this core.
+
+    :param ds: xarray.Dataset, as returned by to_grid
+    :return: CoreStack
+    """
+    names = np.asarray(ds['core'].values, dtype=object)
+    n_core, n_y = len(names), ds.sizes['y_mid']
+    variables = [variable for variable in ds.data_vars if not variable.startswith('w_')]
+
+    values = {variable: np.asarray(ds[variable].values, dtype=float) for variable in ds.data_vars}
+    has_data = {variable: ~np.isnan(values[variable]) for variable in variables}
+
+    # variable group of each core
+    core_groups = np.array([', '.join(variable for variable in variables if has_data[variable][ii].any())
+                            for ii in range(n_core)], dtype=object)
+    # weights w_variable are defined (0) where the variable has no data
+    keep = np.zeros((n_core, n_y), dtype=bool)
+    for variable in variables:
+        keep |= has_data[variable]
+    i_core, i_y = np.nonzero(keep)
+
+    data = {'y_low': ds['y_low'].values[i_y], 'y_mid': ds['y_mid'].values[i_y], 'y_sup': ds['y_sup'].values[i_y],
+            'name': names[i_core], 'variable': core_groups[i_core]}
+    for key in grid_core_coords:
+        if key in ds.coords:
+            data[key] = ds[key].values[i_core]
+    for variable in ds.data_vars:
+        data[variable] = values[variable][i_core, i_y]
+    return CoreStack(pd.DataFrame(data))
+
+
 # Ice core operation
+@instrument.timed('stack_cores')
 def stack_cores(ics_dict, verbose=False):
     """"
     :param ics_dict:
@@ -482,12 +752,225 @@ def stack_cores(ics_dict, verbose=False):
     return CoreStack(ics_stack)
 
 
-def grouped_stat(ic_stack, groups=['y_mid'], variables=None, stats=None, dropemptyrow=dropemptyrow):
+def _variable_stat(ic_stack, prop, groups, cuts, dim, cuts_dict, groups_order, stats):
+    """
+    Statistics of one variable over the groups; run by grouped_stat, in the current process or in a worker
+
+    :param cuts: list of the groupby keys: column name, pd.Series or, in a worker, (column, name) of a published cut
+    :return: pd.DataFrame, statistics of the variable; list of string, keys to merge with the other variables
+    """
+    logger = logging.getLogger(__name__)
+
+    ic_stack = CoreStack(ic_stack)
+    cuts = [ic_stack[cut[0]].rename(cut[1]) if isinstance(cut, tuple) else cut for cut in cuts]
+
+    logger.warning('Computing statistic for %s', prop)
+
+    gr = [element if isinstance(element, str) else list(element.keys())[0] for element in groups]
+
+    prop_data = ic_stack.select_property(prop, extra_keys=gr).copy()
+
+    prop_data['wtd_'+prop] = prop_data['w_' + prop] * prop_data[prop]
+
+    # if property weight is null, weighted property is np.nan
+    prop_data.loc[prop_data['w_'+prop] == 0, 'wtd_'+prop] = np.nan
+
+    # if property is nan, weighted property is np.nan
+
+    data_grouped = prop_data.groupby(cuts)
+
+    stat_var = {}
+    core_var = np.zeros(dim).astype(str)
+    for stat in list(stats):
+        # use np.FUNC(...) instead of .FUNC() as panda.groupby().FUNC() return np.nan rather than 0 if there
+        # is only notnull element in the group
+        if stat in ['sum', 'mean']:
+            func = "np." + stat + "(kgroups.loc[~kgroups['wtd_" + prop + "'].isna(), 'wtd_" + prop + "' ])"
+            w_func = "kgroups.loc[~kgroups['w_" + prop + "'].isna(), 'w_" + prop + "'].sum()"
+            n_func = "kgroups.loc[~kgroups['wtd_" + prop + "'].isna(), 'wtd_" + prop + "'].count()"
+        elif stat in ['min', 'max', 'std']:
+            func = "np." + stat + "(kgroups.loc[~kgroups['wtd_" + prop + "'].isna(), '" + prop + "'])"
+        else:
+            logger.error("%s operation not defined. Open a bug report", stat)
+        logger.info('\tcomputing %s', stat)
+
+        stat_var[stat] = np.nan * np.ones(dim)
+        core_var = np.zeros(dim).astype(object)
+        for k1, kgroups in data_grouped:
+            if isinstance(k1, (int, float)):
+                k1 = [k1]
+            try:
+                stat_var[stat][tuple(np.array(k1, dtype=int))] = eval(func)
+                new_k = k1
+            except Exception:
+                new_k = []
+                _k_n = 0
+                for k in k1:
+                    if isinstance(k, np.integer):
+                        new_k.append(k)
+                    elif isinstance(k, dt.datetime):
+                        new_k.append(cuts_dict[groups_order[_k_n]][np.datetime64(k, 'ns')])
+                    elif isinstance(k, float):
+                        new_k.append(int(k))
+                    else:
+                        new_k.append(cuts_dict[groups_order[_k_n]][k])
+                    _k_n += 1
+
+            if stat in ['sum', 'mean']:
+                # Take in account property measured only on a partial bins to computed weighted property
+                # e.g. S measure on 2 samples
+                # # 1 : 0-0.1, S = 10, w=1
+                # # 2 : 0-0.1, S = 8, w=0.5
+                # weighted mean : 0-0.1 = (10*1+8*0.5)/1.5*2
+                wtd_stat = eval(func)
+                w = eval(w_func)
+                n = eval(n_func)
+                stat_var[stat][tuple(np.array(new_k, dtype=int))] = wtd_stat * n / w
+            else:
+                stat_var[stat][tuple(np.array(new_k, dtype=int))] = eval(func)
+            # #
+            # print(k1, groups)
+            # print('\t %s' % ', '.join(list(kgroups.loc[~kgroups['wtd_' + prop].isna(), 'name'].unique())))
+            # print('\t %s %s' %(new_k, int(np.prod(np.array(new_k) + 1) - 1) ))
+
+            k1_int = []
+            k1_int = tuple([int(k) for k in k1])
+
+            core_var[k1_int] = ', '.join(sorted(list(kgroups.loc[~kgroups['wtd_' + prop].isna(), 'name'].unique())))
+
+    core_stat = CoreStack()
+
+    # run over ndim, minus the ice thickness
+    if len(dim) == 1:
+        headers = ['y_low', 'y_mid', 'y_sup']
+        stats_data = (np.array(cuts_dict['y_mid'][:-1]) + np.array(cuts_dict['y_mid'][1:])) / 2
+
+        # for continuous profile
+        if prop_data['y_low'].notna().all():
+            stats_data = np.vstack(
+                [np.array(cuts_dict['y_mid'][:-1]), stats_data, np.array(cuts_dict['y_mid'][1:])])
+        # for discontinous profile:
+        else:
+            stats_data = np.vstack([[np.nan] * stats_data.__len__(), stats_data, [np.nan] * stats_data.__len__()])
+
+        # stat data by prop
+        headers.extend([prop + '_' + stat for stat in stats + ['collection']])
+        stats_data = np.vstack([stats_data, [stat_var[stat] for stat in stats] + [core_var]])
+
+        # assemble dataframe
+        df = CoreStack(np.array(stats_data).transpose(), columns=headers)
+
+        # number of sample
+        df.loc[df[prop + '_collection'] == 0, prop + '_collection'] = None
+        df[prop + '_collection'] = df[prop + '_collection'].replace(0, None)
+        df[prop + '_count'] = df[prop + '_collection'].apply(
+            lambda x: x.split(', ').__len__() if x not in [None, ''] else 0)
+
+        # define bins
+        key_merge = ['y_low', 'y_mid', 'y_sup', 'v_ref', 'name']
+        name = []
+
+        n_index = 0
+        if not groups_order[n_index] in 'y_mid':
+            if groups_order[n_index] in cuts_dict:
+                df[groups_order[n_index]] = cuts_dict[groups_order[n_index]][index[n_index]]
+                # df[groups_order[n_index]] = inverse_dict(cuts_dict[groups_order[n_index]])[index[n_index]][0]
+                key_merge.append(groups_order[n_index])
+                _name = cuts_dict[groups_order[n_index]][index[n_index]]
+                # _name = inverse_dict(cuts_dict[groups_order[n_index]])[index[n_index]][0]
+                if isinstance(_name, str):
+                    name.append(_name)
+                elif isinstance(_name, np.datetime64):
+                    name.append(pd.to_datetime(np.datetime64(_name)).strftime('%Y%m%d'))
+                elif isinstance(_name, float):
+                    name.append(str(_name))
+            else:
+                df['bin_' + groups_order[n_index]] = index[n_index]
+                key_merge.append('bin_' + groups_order[n_index])
+
+        # v_ref, variable
+        df['v_ref'] = ic_stack.v_ref.unique()[0]
+        df['name'] = '-'.join(name)
+        df['variable'] = prop
+        # assemble with existing core stat:
+        if core_stat.empty:
+            core_stat = CoreStack(df)
+        else:
+            core_stat = core_stat.append(df)
+
+        core_stat = core_stat.apply(pd.to_numeric, errors='ignore')
+        if 'date' in core_stat.keys():
+            core_stat['date'] = pd.to_datetime(core_stat['date'])
+    else:
+        for index in indices(dim[:-1]):
+            headers = ['y_low', 'y_mid', 'y_sup']
+            stats_data = (np.array(cuts_dict['y_mid'][:-1]) + np.array(cuts_dict['y_mid'][1:])) / 2
+
+            # for continuous profile
+            if prop_data['y_low'].notna().all():
+                stats_data = np.vstack(
+                    [np.array(cuts_dict['y_mid'][:-1]), stats_data, np.array(cuts_dict['y_mid'][1:])])
+            # for discontinous profile:
+            else:
+                stats_data = np.vstack(
+                    [[np.nan] * stats_data.__len__(), stats_data, [np.nan] * stats_data.__len__()])
+
+            # stat data by prop
+            headers.extend([prop + '_' + stat for stat in stats + ['collection']])
+            core_name = [None if c in ['0.0', ''] or c == 0 else c for c in core_var[index].tolist()]
+
+            stats_data = np.vstack([stats_data, [stat_var[stat][index] for stat in stats] + [core_name]])
+            # assemble dataframe
+            df = CoreStack(np.array(stats_data).transpose(), columns=headers)
+
+            # number of sample
+            df[prop + '_count'] = df[prop + '_collection'].apply(lambda x: x.split(', ').__len__() if x not in [None, ''] else 0)
+
+            # define bins
+            key_merge = ['y_low', 'y_mid', 'y_sup', 'v_ref', 'name']
+            name = []
+            for n_index in range(0, index.__len__()):
+                if groups_order[n_index] in cuts_dict:
+                    df[groups_order[n_index]] = cuts_dict[groups_order[n_index]][index[n_index]]
+                    key_merge.append(groups_order[n_index])
+                    _name = cuts_dict[groups_order[n_index]][index[n_index]]
+                    if isinstance(_name, str):
+                        name.append(_name)
+                    elif isinstance(_name, np.datetime64):
+                        name.append(pd.to_datetime(np.datetime64(_name)).strftime('%Y%m%d'))
+                    elif isinstance(_name, (float, int)):
+                        name.append(str(_name))
+                else:
+                    df['bin_' + groups_order[n_index]] = index[n_index]
+                    key_merge.append('bin_' + groups_order[n_index])
+            # v_ref, variable
+            df['v_ref'] = ic_stack.v_ref.unique()[0]
+            df['name'] = '-'.join(name)
+            df['variable'] = prop
+
+            # assemble with existing core stat:
+            if core_stat.empty:
+                core_stat = CoreStack(df)
+            else:
+                core_stat = core_stat.append(df)
+
+            core_stat = core_stat.apply(pd.to_numeric, errors='ignore')
+            if 'date' in core_stat.keys():
+                core_stat['date'] = pd.to_datetime(core_stat['date'])
+
+    # plain DataFrame: CoreStack cannot be pickled back from a worker
+    return pd.DataFrame(core_stat), key_merge
+
+
+@instrument.timed('grouped_stat')
+def grouped_stat(ic_stack, groups=['y_mid'], variables=None, stats=None, dropemptyrow=dropemptyrow, n_worker=n_worker):
     """
     :param ics_stack:
     :param variables:
     :param groups list of string or dictionnary:
     :param stats:
+    :param n_worker: int, number of worker processes (default 1). With more than 1, variables are computed in
+        parallel; the stack is published once in shared memory (see pysic.tools.shared).
     :return:
     """
 
@@ -504,14 +987,14 @@ def grouped_stat(ic_stack, groups=['y_mid'], variables=None, stats=None, dropemp
     for variable in variables:
         if 'w_' + variable not in ic_stack:
             ic_stack['w_' + variable] = np.ones([1, len(ic_stack.index)]).transpose()
-            logger.warning('No weight value are defined for %s. Setting weight value to 1' % variable)
+            logger.warning('No weight value are defined for %s. Setting weight value to 1', variable)
         if ic_stack['w_' + variable].isna().any():
             # set w_variable to 0 if variable is nan
             ic_stack.loc[ic_stack[variable].isna(), 'w_' + variable] = 0
 
             # set w_variable to 1 if it exist
             ic_stack.loc[ic_stack['w_' + variable].isna(), 'w_' + variable] = 1
-            logger.warning('some weight value are not defined for % s. Setting weight value to 1 if temperature exists, 0 otherway' % variable)
+            logger.warning('some weight value are not defined for % s. Setting weight value to 1 if temperature exists, 0 otherway', variable)
         # # mod01: 20190917, replace
         if ic_stack[variable].isna().any():
             ic_stack.loc[ic_stack[variable].isna(), 'w_'+ variable ] = 0
@@ -598,202 +1081,30 @@ def grouped_stat(ic_stack, groups=['y_mid'], variables=None, stats=None, dropemp
     del _cut_y_mid, _dim_y_mid, _dict_y_mid
 
 
-    all_stat = CoreStack()
-    for prop in variables:
-        logger.warning('Computing statistic for %s' % prop)
-
-        gr = [element if isinstance(element, str) else list(element.keys())[0] for element in groups]
-
-        prop_data = ic_stack.select_property(prop, extra_keys=gr).copy()
-
-        prop_data['wtd_'+prop] = prop_data['w_' + prop] * prop_data[prop]
-
-        # if property weight is null, weighted property is np.nan
-        prop_data.loc[prop_data['w_'+prop] == 0, 'wtd_'+prop] = np.nan
+    if n_worker is None or n_worker > 1:
+        from pysic.tools import shared
 
-        # if property is nan, weighted property is np.nan
-
-        data_grouped = prop_data.groupby(cuts)
-
-        stat_var = {}
-        core_var = np.zeros(dim).astype(str)
-        for stat in list(stats):
-            # use np.FUNC(...) instead of .FUNC() as panda.groupby().FUNC() return np.nan rather than 0 if there
-            # is only notnull element in the group
-            if stat in ['sum', 'mean']:
-                func = "np." + stat + "(kgroups.loc[~kgroups['wtd_" + prop + "'].isna(), 'wtd_" + prop + "' ])"
-                w_func = "kgroups.loc[~kgroups['w_" + prop + "'].isna(), 'w_" + prop + "'].sum()"
-                n_func = "kgroups.loc[~kgroups['wtd_" + prop + "'].isna(), 'wtd_" + prop + "'].count()"
-            elif stat in ['min', 'max', 'std']:
-                func = "np." + stat + "(kgroups.loc[~kgroups['wtd_" + prop + "'].isna(), '" + prop + "'])"
+        # cuts are published with the stack, as columns
+        _stack = pd.DataFrame(ic_stack)
+        _cuts = []
+        for n_cut, cut in enumerate(cuts):
+            if isinstance(cut, str):
+                _cuts.append(cut)
             else:
-                logger.error("%s operation not defined. Open a bug report" % stat)
-            logger.info('\tcomputing %s' % stat)
-
-            stat_var[stat] = np.nan * np.ones(dim)
-            core_var = np.zeros(dim).astype(object)
-            for k1, kgroups in data_grouped:
-                if isinstance(k1, (int, float)):
-                    k1 = [k1]
-                try:
-                    stat_var[stat][tuple(np.array(k1, dtype=int))] = eval(func)
-                    new_k = k1
-                except Exception:
-                    new_k = []
-                    _k_n = 0
-                    for k in k1:
-                        if isinstance(k, np.integer):
-                            new_k.append(k)
-                        elif isinstance(k, dt.datetime):
-                            new_k.append(cuts_dict[groups_order[_k_n]][np.datetime64(k, 'ns')])
-                        elif isinstance(k, float):
-                            new_k.append(int(k))
-                        else:
-                            new_k.append(cuts_dict[groups_order[_k_n]][k])
-                        _k_n += 1
-
-                if stat in ['sum', 'mean']:
-                    # Take in account property measured only on a partial bins to computed weighted property
-                    # e.g. S measure on 2 samples
-                    # # 1 : 0-0.1, S = 10, w=1
-                    # # 2 : 0-0.1, S = 8, w=0.5
-                    # weighted mean : 0-0.1 = (10*1+8*0.5)/1.5*2
-                    wtd_stat = eval(func)
-                    w = eval(w_func)
-                    n = eval(n_func)
-                    stat_var[stat][tuple(np.array(new_k, dtype=int))] = wtd_stat * n / w
-                else:
-                    stat_var[stat][tuple(np.array(new_k, dtype=int))] = eval(func)
-                # #
-                # print(k1, groups)
-                # print('\t %s' % ', '.join(list(kgroups.loc[~kgroups['wtd_' + prop].isna(), 'name'].unique())))
-                # print('\t %s %s' %(new_k, int(np.prod(np.array(new_k) + 1) - 1) ))
-
-                k1_int = []
-                k1_int = tuple([int(k) for k in k1])
-
-                core_var[k1_int] = ', '.join(sorted(list(kgroups.loc[~kgroups['wtd_' + prop].isna(), 'name'].unique())))
-
-        core_stat = CoreStack()
-
-        # run over ndim, minus the ice thickness
-        if len(dim) == 1:
-            headers = ['y_low', 'y_mid', 'y_sup']
-            stats_data = (np.array(cuts_dict['y_mid'][:-1]) + np.array(cuts_dict['y_mid'][1:])) / 2
-
-            # for continuous profile
-            if prop_data['y_low'].notna().all():
-                stats_data = np.vstack(
-                    [np.array(cuts_dict['y_mid'][:-1]), stats_data, np.array(cuts_dict['y_mid'][1:])])
-            # for discontinous profile:
-            else:
-                stats_data = np.vstack([[np.nan] * stats_data.__len__(), stats_data, [np.nan] * stats_data.__len__()])
-
-            # stat data by prop
-            headers.extend([prop + '_' + stat for stat in stats + ['collection']])
-            stats_data = np.vstack([stats_data, [stat_var[stat] for stat in stats] + [core_var]])
-
-            # assemble dataframe
-            df = CoreStack(np.array(stats_data).transpose(), columns=headers)
-
-            # number of sample
-            df.loc[df[prop + '_collection'] == 0, prop + '_collection'] = None
-            df[prop + '_collection'] = df[prop + '_collection'].replace(0, None)
-            df[prop + '_count'] = df[prop + '_collection'].apply(
-                lambda x: x.split(', ').__len__() if x not in [None, ''] else 0)
-
-            # define bins
-            key_merge = ['y_low', 'y_mid', 'y_sup', 'v_ref', 'name']
-            name = []
-
-            n_index = 0
-            if not groups_order[n_index] in 'y_mid':
-                if groups_order[n_index] in cuts_dict:
-                    df[groups_order[n_index]] = cuts_dict[groups_order[n_index]][index[n_index]]
-                    # df[groups_order[n_index]] = inverse_dict(cuts_dict[groups_order[n_index]])[index[n_index]][0]
-                    key_merge.append(groups_order[n_index])
-                    _name = cuts_dict[groups_order[n_index]][index[n_index]]
-                    # _name = inverse_dict(cuts_dict[groups_order[n_index]])[index[n_index]][0]
-                    if isinstance(_name, str):
-                        name.append(_name)
-                    elif isinstance(_name, np.datetime64):
-                        name.append(pd.to_datetime(np.datetime64(_name)).strftime('%Y%m%d'))
-                    elif isinstance(_name, float):
-                        name.append(str(_name))
-                else:
-                    df['bin_' + groups_order[n_index]] = index[n_index]
-                    key_merge.append('bin_' + groups_order[n_index])
-
-            # v_ref, variable
-            df['v_ref'] = ic_stack.v_ref.unique()[0]
-            df['name'] = '-'.join(name)
-            df['variable'] = prop
-            # assemble with existing core stat:
-            if core_stat.empty:
-                core_stat = CoreStack(df)
-            else:
-                core_stat = core_stat.append(df)
-
-            core_stat = core_stat.apply(pd.to_numeric, errors='ignore')
-            if 'date' in core_stat.keys():
-                core_stat['date'] = pd.to_datetime(core_stat['date'])
-        else:
-            for index in indices(dim[:-1]):
-                headers = ['y_low', 'y_mid', 'y_sup']
-                stats_data = (np.array(cuts_dict['y_mid'][:-1]) + np.array(cuts_dict['y_mid'][1:])) / 2
-
-                # for continuous profile
-                if prop_data['y_low'].notna().all():
-                    stats_data = np.vstack(
-                        [np.array(cuts_dict['y_mid'][:-1]), stats_data, np.array(cuts_dict['y_mid'][1:])])
-                # for discontinous profile:
-                else:
-                    stats_data = np.vstack(
-                        [[np.nan] * stats_data.__len__(), stats_data, [np.nan] * stats_data.__len__()])
-
-                # stat data by prop
-                headers.extend([prop + '_' + stat for stat in stats + ['collection']])
-                core_name = [None if c in ['0.0', ''] or c == 0 else c for c in core_var[index].tolist()]
-
-                stats_data = np.vstack([stats_data, [stat_var[stat][index] for stat in stats] + [core_name]])
-                # assemble dataframe
-                df = CoreStack(np.array(stats_data).transpose(), columns=headers)
-
-                # number of sample
-                df[prop + '_count'] = df[prop + '_collection'].apply(lambda x: x.split(', ').__len__() if x not in [None, ''] else 0)
-
-                # define bins
-                key_merge = ['y_low', 'y_mid', 'y_sup', 'v_ref', 'name']
-                name = []
-                for n_index in range(0, index.__len__()):
-                    if groups_order[n_index] in cuts_dict:
-                        df[groups_order[n_index]] = cuts_dict[groups_order[n_index]][index[n_index]]
-                        key_merge.append(groups_order[n_index])
-                        _name = cuts_dict[groups_order[n_index]][index[n_index]]
-                        if isinstance(_name, str):
-                            name.append(_name)
-                        elif isinstance(_name, np.datetime64):
-                            name.append(pd.to_datetime(np.datetime64(_name)).strftime('%Y%m%d'))
-                        elif isinstance(_name, (float, int)):
-                            name.append(str(_name))
-                    else:
-                        df['bin_' + groups_order[n_index]] = index[n_index]
-                        key_merge.append('bin_' + groups_order[n_index])
-                # v_ref, variable
-                df['v_ref'] = ic_stack.v_ref.unique()[0]
-                df['name'] = '-'.join(name)
-                df['variable'] = prop
-
-                # assemble with existing core stat:
-                if core_stat.empty:
-                    core_stat = CoreStack(df)
-                else:
-                    core_stat = core_stat.append(df)
-
-                core_stat = core_stat.apply(pd.to_numeric, errors='ignore')
-                if 'date' in core_stat.keys():
-                    core_stat['date'] = pd.to_datetime(core_stat['date'])
+                _stack['_cut_%d' % n_cut] = cut.values
+                _cuts.append(('_cut_%d' % n_cut, cut.name))
+        # one partition of all the rows per variable
+        results = shared.map_partitions(_variable_stat, _stack, [np.arange(len(_stack))] * len(variables),
+                                        n_worker=n_worker, args=[(prop,) for prop in variables], groups=groups,
+                                        cuts=_cuts, dim=dim, cuts_dict=cuts_dict, groups_order=groups_order,
+                                        stats=stats)
+    else:
+        results = [_variable_stat(ic_stack, prop, groups, cuts, dim, cuts_dict, groups_order, stats)
+                   for prop in variables]
 
+    all_stat = CoreStack()
+    for prop, (core_stat, key_merge) in zip(variables, results):
+        core_stat = CoreStack(core_stat)
         if all_stat.empty:
             all_stat = core_stat
         else:
@@ -0,0 +1,238 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.index.py : spatio-temporal index over ice cores
+
+CoreIndex is built from the core metadata (dictionary or list of pysic.Core) or from a CoreStack (columns name, date and,
+when present, lat, lon and origin). Coring dates and latitudes are kept sorted, so that time-range and bounding-box
+queries are binary searches (O(log n + k)); coordinates are stored in a KD-tree on the unit sphere for radius queries.
+Queries return core names, in chronological order, usable to select cores before stacking or computing statistics.
+
+USAGE:
+    index = pysic.core.index.CoreIndex(ics_dict)
+    names = index.query(start='2017-01-01', end='2017-06-30', bbox=[70, 72, -158, -155])
+    names = index.radius(71.3, -156.5, 25)  # km
+    ic_stack = pysic.core.corestack.stack_cores(index.select(ics_dict, names))
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "index.py contains a spatio-temporal index to query ice cores by date and location"
+
+__all__ = ["CoreIndex"]
+
+import datetime
+import logging
+
+import numpy as np
+
+EARTH_RADIUS = 6371.0  # km
+
+
+def _datetime64(date):
+    """
+    Convert a date to numpy.datetime64 in UTC. Date without timezone are assumed to be in UTC.
+
+    :param date: datetime.datetime, datetime.date, numpy.datetime64, pandas.Timestamp, ISO string or None
+    :return: numpy.datetime64[ns], NaT if date is not defined
+    """
+    if date is None or (isinstance(date, float) and np.isnan(date)):
+        return np.datetime64('NaT', 'ns')
+    if isinstance(date, datetime.datetime) and date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    try:
+        return np.datetime64(date, 'ns')
+    except (TypeError, ValueError):
+        return np.datetime64('NaT', 'ns')
+
+
+def _xyz(lat, lon):
+    """
+    Cartesian coordinates on the unit sphere
+    """
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _float(value):
+    if isinstance(value, (list, tuple, np.ndarray)):
+        value = value[0] if len(value) else np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class CoreIndex():
+    """
+    Spatio-temporal index over ice cores
+    """
+
+    def __init__(self, cores):
+        """
+        :param cores: dict of pysic.Core (e.g. output of import_ic_list), list of pysic.Core, or CoreStack
+        """
+        self.logger = logging.getLogger(__name__)
+
+        if hasattr(cores, 'columns'):
+            # CoreStack: one entry per core, first row of each core
+            columns = [c for c in ['name', 'date', 'origin', 'lat', 'lon'] if c in cores.columns]
+            data = cores[columns].drop_duplicates(subset='name')
+            names = data['name'].tolist()
+            dates = data['date'].tolist() if 'date' in data else [None] * len(names)
+            origins = data['origin'].tolist() if 'origin' in data else [None] * len(names)
+            lat = data['lat'].tolist() if 'lat' in data else [np.nan] * len(names)
+            lon = data['lon'].tolist() if 'lon' in data else [np.nan] * len(names)
+        else:
+            if isinstance(cores, dict):
+                cores = list(cores.values())
+            names = [core.name for core in cores]
+            dates = [core.date for core in cores]
+            origins = [core.origin for core in cores]
+            lat = [core.lat for core in cores]
+            lon = [core.lon for core in cores]
+
+        self.names = np.array(names, dtype=object)
+        self.dates = np.array([_datetime64(date) for date in dates], dtype='datetime64[ns]')
+        self.origins = np.array(origins, dtype=object)
+        self.lat = np.array([_float(value) for value in lat])
+        self.lon = np.array([_float(value) for value in lon])
+
+        # dates, sorted; NaT are not indexed
+        has_date = ~np.isnat(self.dates)
+        self._date_order = np.where(has_date)[0][np.argsort(self.dates[has_date], kind='stable')]
+        self._dates_sorted = self.dates[self._date_order]
+
+        # latitudes, sorted; cores without coordinates are not indexed
+        has_coordinate = ~np.isnan(self.lat) & ~np.isnan(self.lon)
+        self._lat_order = np.where(has_coordinate)[0][np.argsort(self.lat[has_coordinate], kind='stable')]
+        self._lat_sorted = self.lat[self._lat_order]
+
+        self._tree = None
+        self._tree_idx = np.where(has_coordinate)[0]
+
+        if (~has_coordinate).any():
+            self.logger.info('%d cores without coordinate are not spatially indexed', (~has_coordinate).sum())
+
+    def __len__(self):
+        return len(self.names)
+
+    def _names(self, idx):
+        """
+        Core names of the indices, in chronological order
+        """
+        idx = np.unique(idx)
+        order = np.argsort(self.dates[idx], kind='stable')
+        return self.names[idx[order]].tolist()
+
+    def _time_idx(self, start=None, end=None):
+        i0 = 0
+        i1 = len(self._dates_sorted)
+        if start is not None:
+            i0 = np.searchsorted(self._dates_sorted, _datetime64(start), side='left')
+        if end is not None:
+            # a date without time includes the whole day
+            whole_day = (isinstance(end, str) and len(end) == 10) or \
+                        (isinstance(end, datetime.date) and not isinstance(end, datetime.datetime))
+            end = _datetime64(end)
+            if whole_day:
+                end = end + np.timedelta64(1, 'D') - np.timedelta64(1, 'ns')
+            i1 = np.searchsorted(self._dates_sorted, end, side='right')
+        return self._date_order[i0:i1]
+
+    def _bbox_idx(self, lat_min, lat_max, lon_min, lon_max):
+        i0 = np.searchsorted(self._lat_sorted, lat_min, side='left')
+        i1 = np.searchsorted(self._lat_sorted, lat_max, side='right')
+        idx = self._lat_order[i0:i1]
+        lon = self.lon[idx]
+        if lon_min <= lon_max:
+            return idx[(lon_min <= lon) & (lon <= lon_max)]
+        # bounding box across the antimeridian
+        return idx[(lon_min <= lon) | (lon <= lon_max)]
+
+    def _radius_idx(self, lat, lon, radius):
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(_xyz(self.lat[self._tree_idx], self.lon[self._tree_idx]))
+        # great circle distance to chord length
+        chord = 2 * np.sin(min(radius / EARTH_RADIUS, np.pi) / 2)
+        idx = self._tree.query_ball_point(_xyz(lat, lon)[0], chord)
+        return self._tree_idx[np.array(idx, dtype=int)]
+
+    def time_range(self, start=None, end=None):
+        """
+        :param start: datetime.datetime or ISO string, earliest coring date (inclusive)
+        :param end: datetime.datetime or ISO string, latest coring date (inclusive)
+        :return: list of core names
+        """
+        return self._names(self._time_idx(start, end))
+
+    def bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        :param lat_min, lat_max: float, latitude range in decimal degree
+        :param lon_min, lon_max: float, longitude range in decimal degree. If lon_min > lon_max, the box crosses the
+            antimeridian
+        :return: list of core names
+        """
+        return self._names(self._bbox_idx(lat_min, lat_max, lon_min, lon_max))
+
+    def radius(self, lat, lon, radius):
+        """
+        :param lat, lon: float, center in decimal degree
+        :param radius: float, great circle distance in km
+        :return: list of core names
+        """
+        return self._names(self._radius_idx(lat, lon, radius))
+
+    def query(self, start=None, end=None, bbox=None, center=None, radius=None, origin=None):
+        """
+        Combine time range, bounding box, radius and origin criteria
+
+        :param start, end: coring date range, see time_range
+        :param bbox: [lat_min, lat_max, lon_min, lon_max], see bbox
+        :param center: [lat, lon], center for radius
+        :param radius: float, great circle distance in km, requires center
+        :param origin: string or list of string, core origin
+        :return: list of core names, in chronological order
+        """
+        if radius is not None and center is None:
+            raise ValueError('center is required for a radius query')
+
+        idx = None
+
+        def _intersect(idx, new_idx):
+            return new_idx if idx is None else np.intersect1d(idx, new_idx)
+
+        if start is not None or end is not None:
+            idx = _intersect(idx, self._time_idx(start, end))
+        if bbox is not None:
+            idx = _intersect(idx, self._bbox_idx(*bbox))
+        if radius is not None:
+            idx = _intersect(idx, self._radius_idx(center[0], center[1], radius))
+        if origin is not None:
+            if not isinstance(origin, (list, tuple, set)):
+                origin = [origin]
+            idx = _intersect(idx, np.where(np.isin(self.origins, list(origin)))[0])
+        if idx is None:
+            idx = np.arange(len(self.names))
+        return self._names(idx)
+
+    @staticmethod
+    def select(cores, names):
+        """
+        Select cores by name
+
+        :param cores: dict of pysic.Core or CoreStack
+        :param names: list of string, core names
+        :return: dict of pysic.Core or CoreStack
+        """
+        if hasattr(cores, 'columns'):
+            return cores[cores.name.isin(names)]
+        return {name: cores[name] for name in names if name in cores}
@@ -0,0 +1,136 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.integrity.py : integrity checks of ice core profiles
+
+All checks run at once over a whole CoreStack (or a Profile) with grouped array operations on the profiles (core and
+variable group), rather than core by core, and return an issue table with one row per profile and check:
+    'y_mid': y_mid is not at the middle of the section [y_low, y_sup]
+    'section': y_low > y_sup
+    'overlap': section overlapping the previous section of the profile
+    'v_ref': vertical reference undefined
+    'v_ref_consistency': vertical reference not consistent within the profile
+    'length': ice core length undefined
+    'ice_thickness': ice thickness undefined
+
+USAGE:
+    issues = ics_stack.check()
+    issues[issues.check == 'overlap']
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "integrity.py contains vectorized integrity checks of ice core profiles"
+
+__all__ = ["check", "checks"]
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pysic.core.profile import _profile_codes
+from pysic.tools import instrument
+
+TOL = 1e-6
+
+checks = {'y_mid': 'y_mid is not the mid point between y_low and y_sup',
+          'section': 'y_low is greater than y_sup',
+          'overlap': 'section overlaps the previous section',
+          'v_ref': 'vertical reference is not defined',
+          'v_ref_consistency': 'vertical reference is not consistent within the profile',
+          'length': 'ice core length is not defined',
+          'ice_thickness': 'ice thickness is not defined'}
+
+issue_columns = ['name', 'variable', 'check', 'n_row', 'message']
+
+
+def _numeric(stack, key):
+    """
+    :return: np.array of float, nan if the column does not exist
+    """
+    if key not in stack.keys():
+        return np.full(len(stack), np.nan)
+    return pd.to_numeric(stack[key], errors='coerce').values.astype(float)
+
+
+@instrument.timed('check')
+def check(ics_stack, tol=TOL):
+    """
+    Check the integrity of all the profiles of a stack
+
+    :param ics_stack: CoreStack or Profile
+    :param tol: float, tolerance on the depths [m]
+    :return: pd.DataFrame, columns name, variable, check, n_row (number of rows concerned) and message. Empty if no
+        issue is found.
+    """
+    logger = logging.getLogger(__name__)
+
+    if ics_stack.empty:
+        return pd.DataFrame(columns=issue_columns)
+
+    codes = _profile_codes(ics_stack)
+    n_profile = codes.max() + 1
+    n_row = np.bincount(codes, minlength=n_profile)
+    instrument.count('rows', len(codes))
+
+    # row-level checks: number of rows failing each check, per profile
+    counts = {}
+    y_low = _numeric(ics_stack, 'y_low')
+    y_mid = _numeric(ics_stack, 'y_mid')
+    y_sup = _numeric(ics_stack, 'y_sup')
+    step = ~np.isnan(y_low) & ~np.isnan(y_sup)
+
+    with np.errstate(invalid='ignore'):
+        bad = step & (np.abs((y_low + y_sup) / 2 - y_mid) > tol)
+    counts['y_mid'] = np.bincount(codes[bad], minlength=n_profile)
+    counts['section'] = np.bincount(codes[step & (y_low > y_sup + tol)], minlength=n_profile)
+
+    # sections sorted by profile and y_low: a section overlaps if it starts before the end of the previous one
+    i_step = np.nonzero(step)[0]
+    i_step = i_step[np.lexsort((y_low[i_step], codes[i_step]))]
+    overlap = (codes[i_step[1:]] == codes[i_step[:-1]]) & (y_low[i_step[1:]] < y_sup[i_step[:-1]] - tol)
+    counts['overlap'] = np.bincount(codes[i_step[1:]][overlap], minlength=n_profile)
+
+    if 'v_ref' in ics_stack.keys():
+        v_ref = ics_stack['v_ref'].values
+        counts['v_ref'] = np.bincount(codes[~np.isin(v_ref, ['top', 'bottom'])], minlength=n_profile)
+        n_v_ref = pd.Series(v_ref).groupby(codes).nunique().reindex(range(n_profile), fill_value=0).values
+        counts['v_ref_consistency'] = np.where(n_v_ref > 1, n_row, 0)
+    else:
+        counts['v_ref'] = n_row
+        counts['v_ref_consistency'] = np.zeros(n_profile, dtype=np.int64)
+
+    # profile-level checks: all rows of the profile are concerned
+    for key in ['length', 'ice_thickness']:
+        defined = np.bincount(codes[~np.isnan(_numeric(ics_stack, key))], minlength=n_profile)
+        counts[key] = np.where(defined == 0, n_row, 0)
+
+    # issue table
+    first_row = np.unique(codes, return_index=True)[1]
+    labels = {}
+    for key in ['name', 'variable']:
+        labels[key] = ics_stack[key].values[first_row] if key in ics_stack.keys() else np.full(n_profile, np.nan)
+    issues = []
+    for key, count in counts.items():
+        i_profile = np.nonzero(count)[0]
+        if len(i_profile):
+            issues.append(pd.DataFrame({'name': labels['name'][i_profile],
+                                        'variable': labels['variable'][i_profile],
+                                        'check': key,
+                                        'n_row': count[i_profile],
+                                        'message': checks[key]}))
+    if not issues:
+        logger.info('no integrity issue found in %d profiles', n_profile)
+        return pd.DataFrame(columns=issue_columns)
+    issues = pd.concat(issues, ignore_index=True)
+    issues = issues.sort_values(['name', 'variable', 'check'], kind='stable').reset_index(drop=True)
+    logger.info('%d integrity issues found in %d of %d profiles', len(issues),
+                len(issues[['name', 'variable']].drop_duplicates()), n_profile)
+    return issues
@@ -0,0 +1,217 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.migrate.py : batch update of ice core spreadsheets to the latest version
+
+The version of each spreadsheet is read from the summary sheet alone (workbook opened in read-only mode), so spreadsheets
+already at the latest version are skipped without being loaded. Older spreadsheets are updated on a temporary copy in
+the same directory with update_spreadsheet or update_spreadsheet_MOSAiC, then renamed over the original, so that an
+interrupted migration never leaves a partially written spreadsheet. Spreadsheets are processed in a pool of worker
+processes.
+
+USAGE:
+    ic_paths = pysic.core.list_ic_path(ic_dir, '.xlsx')
+    report = pysic.core.migrate.migrate_spreadsheets(ic_paths, report_path='migration.csv')
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "migrate.py contains function to update ice core spreadsheets in batch"
+
+__all__ = ["read_version", "is_current", "needs_update", "migrate_spreadsheet", "migrate_spreadsheets"]
+
+import csv
+import logging
+import os
+import shutil
+import time
+
+import openpyxl
+
+import pysic.core
+
+# latest spreadsheet version handled by update_spreadsheet_MOSAiC
+__MOSAiCVersion__ = 1.3
+# versions with an update step in update_spreadsheet and update_spreadsheet_MOSAiC
+update_versions = {'v1': [1.0], 'MOSAiC': [1.2]}
+
+## Default values:
+v_ref = 'top'
+backup = True
+n_worker = None  # os.cpu_count()
+chunksize = 4
+report_header = ['path', 'status', 'format', 'version', 'new_version', 'time', 'error']
+
+
+def read_version(ic_path):
+    """
+    Read the spreadsheet format and version from the summary sheet only
+
+    :param ic_path: string, path to the xlsx ice core spreadsheet
+    :return: (format, version)
+        format is 'v1' for spreadsheet with a summary sheet, 'MOSAiC' for spreadsheet with a metadata-coring sheet or
+        None if the spreadsheet is not an ice core spreadsheet
+    """
+    wb = openpyxl.load_workbook(filename=ic_path, read_only=True)
+    try:
+        if 'summary' in wb.sheetnames:
+            return 'v1', wb['summary']['C3'].value
+        elif 'metadata-coring' in wb.sheetnames:
+            return 'MOSAiC', pysic.core.mosaic_version(wb['metadata-coring']['C1'].value)
+        else:
+            return None, None
+    finally:
+        wb.close()
+
+
+def is_current(ic_format, version):
+    """
+    :param ic_format: 'v1' or 'MOSAiC'
+    :param version: spreadsheet version, as returned by read_version
+    :return: boolean, True if the spreadsheet is at the latest version
+    """
+    if isinstance(version, bool) or not isinstance(version, (float, int)):
+        return False
+    if ic_format == 'v1':
+        return version == pysic.core.__CoreVersion__
+    elif ic_format == 'MOSAiC':
+        return version == __MOSAiCVersion__
+    return False
+
+
+def needs_update(ic_format, version):
+    """
+    :param ic_format: 'v1' or 'MOSAiC'
+    :param version: spreadsheet version, as returned by read_version
+    :return: boolean, True if update_spreadsheet or update_spreadsheet_MOSAiC has an update step for the version.
+        Other versions are not handled by the updaters.
+    """
+    if isinstance(version, bool) or not isinstance(version, (float, int)):
+        return False
+    return version in update_versions.get(ic_format, [])
+
+
+def _backup_path(ic_path, ic_format, version):
+    """
+    Backup location used by update_spreadsheet and update_spreadsheet_MOSAiC
+    """
+    if ic_format == 'MOSAiC':
+        backup_dir = os.path.join(os.path.dirname(ic_path), 'bkp-ic_version_' + str(version))
+    else:
+        backup_dir = os.path.join(os.path.dirname(ic_path), 'version-' + str(version))
+    return os.path.join(backup_dir, os.path.basename(ic_path))
+
+
+def migrate_spreadsheet(ic_path, v_ref=v_ref, backup=backup):
+    """
+    Update a single spreadsheet to the latest version, atomically
+
+    :param ic_path: string, path to the xlsx ice core spreadsheet
+    :param v_ref: 'top' or 'bottom', vertical reference written in version 1.0 spreadsheet
+    :param backup: boolean, default True. If True, the original spreadsheet is copied in the backup directory used
+        by update_spreadsheet
+    :return: dict, report entry with keys report_header. status is 'updated', 'current', 'skipped' or 'error'
+    """
+    logger = logging.getLogger(__name__)
+
+    t_start = time.perf_counter()
+    entry = {'path': ic_path, 'status': None, 'format': None, 'version': None, 'new_version': None, 'time': None,
+             'error': None}
+    tmp_path = None
+    try:
+        ic_format, version = read_version(ic_path)
+        entry['format'], entry['version'] = ic_format, version
+        if ic_format is None:
+            entry['status'] = 'skipped'
+            entry['error'] = 'not an ice core spreadsheet'
+        elif is_current(ic_format, version):
+            entry['status'] = 'current'
+            entry['new_version'] = version
+        elif not needs_update(ic_format, version):
+            entry['status'] = 'skipped'
+            entry['error'] = 'version %s not supported by the updater' % version
+        else:
+            # update a temporary copy in the same directory, so that the rename is atomic
+            base, ext = os.path.splitext(os.path.basename(ic_path))
+            tmp_path = os.path.join(os.path.dirname(ic_path), '.%s.tmp-%d%s' % (base, os.getpid(), ext))
+            shutil.copy2(ic_path, tmp_path)
+            if ic_format == 'MOSAiC':
+                pysic.core.update_spreadsheet_MOSAiC(tmp_path, backup=False)
+            else:
+                pysic.core.update_spreadsheet(tmp_path, v_ref=v_ref, backup=False)
+            if backup:
+                ic_bkp = _backup_path(ic_path, ic_format, version)
+                os.makedirs(os.path.dirname(ic_bkp), exist_ok=True)
+                shutil.copy2(ic_path, ic_bkp)
+            os.replace(tmp_path, ic_path)
+            tmp_path = None
+            entry['status'] = 'updated'
+            entry['new_version'] = read_version(ic_path)[1]
+    except Exception as e:
+        logger.error('(%s) spreadsheet update failed: %s', ic_path, e)
+        entry['status'] = 'error'
+        entry['error'] = '%s: %s' % (type(e).__name__, e)
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    entry['time'] = time.perf_counter() - t_start
+    return entry
+
+
+def _migrate_spreadsheet(args):
+    return migrate_spreadsheet(*args)
+
+
+def migrate_spreadsheets(ic_paths, v_ref=v_ref, backup=backup, n_worker=n_worker, chunksize=chunksize,
+                         report_path=None):
+    """
+    Update spreadsheets to the latest version in a pool of worker processes
+
+    :param ic_paths: list of string, path to the xlsx ice core spreadsheets (e.g. output of list_ic_path), or string,
+        directory scanned with list_ic_path
+    :param v_ref: 'top' or 'bottom', vertical reference written in version 1.0 spreadsheet
+    :param backup: boolean, default True. If True, original spreadsheets are copied in a backup directory
+    :param n_worker: int, number of worker processes. Default os.cpu_count(); with 1 spreadsheets are updated in the
+        current process
+    :param chunksize: int, number of spreadsheet sent at once to a worker
+    :param report_path: string, optional. If defined, the report is written as csv
+    :return: list of dict, one report entry per spreadsheet (see migrate_spreadsheet)
+    """
+    logger = logging.getLogger(__name__)
+
+    if isinstance(ic_paths, str):
+        ic_paths = pysic.core.list_ic_path(ic_paths, '.xlsx')
+    ic_paths = sorted(ic_paths)
+
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    n_worker = max(1, min(n_worker, len(ic_paths)))
+
+    t_start = time.perf_counter()
+    args = [(ic_path, v_ref, backup) for ic_path in ic_paths]
+    if n_worker == 1:
+        report = [_migrate_spreadsheet(arg) for arg in args]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=n_worker) as executor:
+            report = list(executor.map(_migrate_spreadsheet, args, chunksize=chunksize))
+
+    status = {}
+    for entry in report:
+        status[entry['status']] = status.get(entry['status'], 0) + 1
+    logger.info('%d spreadsheets processed in %.1f s: %s', len(report), time.perf_counter() - t_start,
+                ', '.join('%d %s' % (n, s) for s, n in sorted(status.items())))
+
+    if report_path is not None:
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=report_header)
+            writer.writeheader()
+            writer.writerows(report)
+
+    return report
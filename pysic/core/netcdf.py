@@ -0,0 +1,423 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.netcdf.py : chunked NetCDF export of stacks and lazy reader
+
+A stack, e.g. a discretized CoreStack or the output of grouped_stat, is written to a directory of NetCDF files (parts),
+each holding chunk_core cores. The stack is consumed part by part: given as an iterable of stacks (e.g. a generator
+discretizing the cores one by one), it is never held in memory as a whole.
+
+Each part is a CF discrete sampling geometry (featureType profile, contiguous ragged array): one profile per core along
+the dimension profile, the rows of the cores along the dimension obs, row_size holding the number of rows of each core.
+Columns constant within each core of the part are stored along profile. Units follow pysic.property.prop_unit. With the
+netcdf4 or h5netcdf engine, numeric variables are compressed (zlib) and chunked along obs. Dates are stored as CF time;
+time zone aware dates are stored in UTC and their time zone in the attribute pysic_tz, so that they are read back time
+zone aware (columns mixing naive and aware dates are read back in UTC). Missing strings are stored as empty strings.
+
+NetCDFArchive reads the core names and row counts of the parts when opened; rows are read on request, for a selection
+of cores and columns, or part by part.
+
+USAGE:
+    pysic.core.netcdf.to_netcdf(ics_stack, 'ice_cores.nc.d', chunk_core=100)
+    archive = pysic.core.netcdf.open_netcdf('ice_cores.nc.d')
+    ic_stack = archive.read(names=['BRW_CS-20130331'], columns=['salinity'])
+    for ic_stack in archive:
+        ...
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "netcdf.py contains a chunked NetCDF exporter and a lazy reader for ice core stacks"
+
+__all__ = ["to_netcdf", "open_netcdf", "read_netcdf", "NetCDFArchive"]
+
+import datetime
+import glob
+import importlib.util
+import json
+import logging
+import numbers
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import pysic
+from pysic.tools import instrument
+
+## Default values:
+chunk_core = 100  # cores per part
+chunk_obs = 4096  # NetCDF chunk size along obs
+complevel = 4
+engine = None  # netcdf4, h5netcdf if installed, scipy (NetCDF3, uncompressed) otherwise
+
+part_pattern = 'part-%06d.nc'
+
+# CF units of pysic.property.prop_unit
+_cf_units = {'‰': '1e-3', '°C': 'degree_Celsius', '-': '1'}
+_depth_columns = ['y_low', 'y_mid', 'y_sup', 'length', 'ice_thickness', 'snow_depth', 'freeboard']
+_standard_names = {'salinity': 'sea_ice_salinity', 'temperature': 'sea_ice_temperature',
+                   'lat': 'latitude', 'lon': 'longitude'}
+_stats = ['min', 'mean', 'max', 'std', 'sum', 'median']
+
+
+def _engine(engine):
+    """
+    :return: string, engine, the first one installed of netcdf4, h5netcdf and scipy if engine is None
+    """
+    if engine is not None:
+        return engine
+    for name, module in [('netcdf4', 'netCDF4'), ('h5netcdf', 'h5netcdf')]:
+        if importlib.util.find_spec(module) is not None:
+            return name
+    return 'scipy'
+
+
+def _unit(column):
+    """
+    :return: string, CF unit of a column, None if unknown
+    """
+    from pysic.property import prop_unit
+
+    if column in _depth_columns:
+        return 'm'
+    if column.startswith('w_'):
+        return '1'
+    if column in ['lat']:
+        return 'degrees_north'
+    if column in ['lon']:
+        return 'degrees_east'
+    if column not in prop_unit and '_' in column:
+        # statistics from grouped_stat
+        variable, stat = column.rsplit('_', 1)
+        if stat == 'count':
+            return '1'
+        if stat in _stats:
+            column = variable
+    if column in prop_unit:
+        unit = prop_unit[column]
+        return _cf_units.get(unit, unit.replace('$', '').replace('^{', '').replace('}', ''))
+    return None
+
+
+def _attributes(column):
+    attrs = {'long_name': column}
+    unit = _unit(column)
+    if unit is not None:
+        attrs['units'] = unit
+    if column in _standard_names:
+        attrs['standard_name'] = _standard_names[column]
+    return attrs
+
+
+def _variable_name(column, used):
+    """
+    :return: string, NetCDF variable name of a column, made of letters, digits and underscores
+    """
+    name = re.sub(r'\W', '_', column, flags=re.ASCII)
+    if not name or name[0].isdigit():
+        name = 'v_' + name
+    _name, n = name, 1
+    while name in used:
+        name = '%s_%d' % (_name, n)
+        n += 1
+    used.add(name)
+    return name
+
+
+def _tz(tz):
+    """
+    :return: string, name of the time zone; 'UTC' if the name cannot be read back by pandas (e.g. fixed offsets)
+    """
+    try:
+        pd.Timestamp(0, tz='UTC').tz_convert(str(tz))
+    except (ValueError, TypeError, KeyError):
+        return 'UTC'
+    return str(tz)
+
+
+def _values(series):
+    """
+    :return: np.array, values of a column in a type supported by NetCDF: numeric, boolean, datetime64 or string;
+        string, time zone of time zone aware dates, stored in UTC, None otherwise
+    """
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        return series.dt.tz_convert('UTC').dt.tz_localize(None).values, _tz(series.dt.tz)
+    values = series.values
+    if isinstance(series.dtype, np.dtype) and values.dtype.kind in 'biufM':
+        return values, None
+    values = np.asarray(values, dtype=object)
+    isnull = pd.isnull(values)
+    if all(isinstance(v, numbers.Number) and not isinstance(v, bool) for v in values[~isnull]):
+        return pd.to_numeric(series, errors='coerce').values.astype(float), None
+    if (~isnull).any() and all(isinstance(v, (datetime.datetime, np.datetime64)) for v in values[~isnull]):
+        try:
+            dates = pd.to_datetime(series)
+        except (ValueError, TypeError):
+            dates = series
+        if dates.dtype == object:
+            # dates of different time zones, or naive and time zone aware dates: naive dates are taken as UTC
+            dates = pd.to_datetime(series, utc=True)
+        return _values(dates)
+    strings = np.full(len(values), '', dtype=object)
+    strings[~isnull] = [v if isinstance(v, str) else str(v) for v in values[~isnull]]
+    return strings, None
+
+
+def _names(stack):
+    """
+    :return: np.array of object, core name of each row, '' if undefined
+    """
+    if 'name' not in stack.columns:
+        return np.full(len(stack), '', dtype=object)
+    return stack['name'].astype(object).where(stack['name'].notnull(), '').values
+
+
+def _chunks(stacks, chunk_core):
+    """
+    Regroup stacks in chunks of chunk_core cores, rows grouped by core in the order of appearance of the cores
+
+    :param stacks: iterable of CoreStack or pd.DataFrame
+    :return: generator of pd.DataFrame
+    """
+    pending, n_pending = [], 0
+    for stack in stacks:
+        if stack.empty:
+            continue
+        stack = pd.DataFrame(stack)
+        codes, names = pd.factorize(_names(stack))
+        order = np.argsort(codes, kind='stable')
+        stack = stack.iloc[order]
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        i_core = 0
+        while i_core < len(names):
+            n = min(chunk_core - n_pending, len(names) - i_core)
+            pending.append(stack.iloc[bounds[i_core]:bounds[i_core + n]])
+            n_pending += n
+            i_core += n
+            if n_pending == chunk_core:
+                yield pd.concat(pending, sort=False)
+                pending, n_pending = [], 0
+    if pending:
+        yield pd.concat(pending, sort=False)
+
+
+def _dataset(chunk, compress=True, complevel=complevel, chunk_obs=chunk_obs):
+    """
+    :param chunk: pd.DataFrame, rows grouped by core
+    :return: xarray.Dataset, encoding
+    """
+    import xarray as xr
+
+    codes, names = pd.factorize(_names(chunk))
+    row_size = np.bincount(codes, minlength=len(names))
+    first = np.cumsum(row_size) - row_size
+
+    used = {'name', 'row_size'}
+    columns = []
+    data_vars = {'row_size': ('profile', row_size, {'long_name': 'number of rows of the core',
+                                                    'sample_dimension': 'obs'})}
+    coords = {'name': ('profile', np.asarray(names, dtype=object), {'long_name': 'core name',
+                                                                    'cf_role': 'profile_id'})}
+    encoding = {}
+    for column in chunk.columns:
+        if column == 'name':
+            columns.append([column, 'name'])
+            continue
+        values, tz = _values(chunk[column])
+        variable = _variable_name(str(column), used)
+        columns.append([column, variable])
+        # column constant within each core: stored along profile
+        if (pd.Series(values).groupby(codes).nunique(dropna=False) <= 1).all():
+            values, dim = values[first], 'profile'
+        else:
+            dim = 'obs'
+        attrs = _attributes(str(column))
+        if tz is not None:
+            attrs['pysic_tz'] = tz
+        data_vars[variable] = (dim, values, attrs)
+        if compress and values.dtype.kind in 'biufM' and len(values):
+            encoding[variable] = {'zlib': True, 'complevel': complevel, 'chunksizes': (min(chunk_obs, len(values)),)}
+
+    attrs = {'Conventions': 'CF-1.8',
+             'featureType': 'profile',
+             'source': 'pysic %s' % pysic.__version__,
+             'history': '%s created by pysic.core.netcdf.to_netcdf' % datetime.datetime.utcnow().isoformat(),
+             'pysic_columns': json.dumps(columns)}
+    return xr.Dataset(data_vars, coords=coords, attrs=attrs), encoding
+
+
+@instrument.timed('to_netcdf')
+def to_netcdf(ics_stack, path, chunk_core=chunk_core, engine=engine, complevel=complevel, chunk_obs=chunk_obs):
+    """
+    Write a stack to a directory of NetCDF parts of chunk_core cores each. Parts of a previous export in the directory
+    are removed.
+
+    :param ics_stack: CoreStack, Profile or pd.DataFrame, or iterable of them, e.g. a generator of discretized cores.
+        A stack without name column is written as a single core with an empty name.
+    :param path: string, directory of the parts
+    :param chunk_core: int, number of cores per part
+    :param engine: string, optional. xarray NetCDF engine, default netcdf4, h5netcdf if installed, scipy otherwise
+    :param complevel: int, zlib compression level of the numeric variables (netcdf4 and h5netcdf engines)
+    :param chunk_obs: int, NetCDF chunk size along obs (netcdf4 and h5netcdf engines)
+    :return: list of string, paths of the parts
+    """
+    logger = logging.getLogger(__name__)
+
+    engine = _engine(engine)
+    compress = engine in ['netcdf4', 'h5netcdf']
+    if not compress:
+        logger.info('%s engine: NetCDF3 parts, not compressed', engine)
+    if isinstance(ics_stack, pd.DataFrame):
+        ics_stack = [ics_stack]
+
+    os.makedirs(path, exist_ok=True)
+    for part_path in glob.glob(os.path.join(path, 'part-*.nc')):
+        os.remove(part_path)
+
+    part_paths = []
+    for chunk in _chunks(ics_stack, max(int(chunk_core), 1)):
+        ds, encoding = _dataset(chunk, compress=compress, complevel=complevel, chunk_obs=chunk_obs)
+        part_path = os.path.join(path, part_pattern % len(part_paths))
+        ds.to_netcdf(part_path, engine=engine, encoding=encoding)
+        part_paths.append(part_path)
+        instrument.count('cores', ds.sizes['profile'])
+        instrument.count('rows', ds.sizes['obs'] if 'obs' in ds.sizes else 0)
+    logger.info('%d parts written in %s', len(part_paths), path)
+    return part_paths
+
+
+class NetCDFArchive():
+    """
+    Lazy reader of the parts written by to_netcdf. Only the core names and row counts are read when the archive is
+    opened.
+    """
+
+    def __init__(self, path, engine=None):
+        """
+        :param path: string, directory of the parts, or path to a single part
+        :param engine: string, optional. xarray NetCDF engine, default chosen by xarray
+        """
+        import xarray as xr
+
+        if os.path.isdir(path):
+            self.parts = sorted(glob.glob(os.path.join(path, 'part-*.nc')))
+        else:
+            self.parts = [path]
+        self.engine = engine
+        self._index = []
+        self.columns = []
+        for part in self.parts:
+            with xr.open_dataset(part, engine=engine) as ds:
+                names = np.asarray(ds['name'].values, dtype=object)
+                row_size = ds['row_size'].values.astype(int)
+                columns = [tuple(column) for column in json.loads(ds.attrs['pysic_columns'])]
+            self._index.append((names, row_size, columns))
+            self.columns += [column for column, _ in columns if column not in self.columns]
+
+    @property
+    def names(self):
+        """
+        :return: list of string, names of the cores
+        """
+        return list(pd.unique(np.concatenate([names for names, _, _ in self._index]))) if self._index else []
+
+    def __len__(self):
+        return len(self.parts)
+
+    @instrument.timed('read_netcdf')
+    def read_part(self, i_part, names=None, columns=None):
+        """
+        :param i_part: int, index of the part
+        :param names: list of string, optional. Cores to read, default all the cores of the part
+        :param columns: list of string, optional. Columns to read, default all; name, y_low, y_mid and y_sup are always
+            read
+        :return: CoreStack
+        """
+        import xarray as xr
+        from pysic.core.corestack import CoreStack
+
+        part_names, row_size, part_columns = self._index[i_part]
+        if columns is not None:
+            columns = ['name', 'y_low', 'y_mid', 'y_sup'] + [column for column in columns
+                                                             if column not in ['name', 'y_low', 'y_mid', 'y_sup']]
+            part_columns = [(column, variable) for column, variable in part_columns if column in columns]
+        i_profile = np.arange(len(part_names)) if names is None else np.nonzero(np.isin(part_names, names))[0]
+        if not len(i_profile):
+            return CoreStack()
+
+        # rows of the selected cores
+        size = row_size[i_profile]
+        i_obs_profile = np.repeat(i_profile, size)
+        if len(i_profile) == len(part_names):
+            i_obs = slice(None)
+        else:
+            first = np.cumsum(row_size) - row_size
+            i_obs = np.repeat(first[i_profile] - (np.cumsum(size) - size), size) + np.arange(size.sum())
+
+        data = {}
+        with xr.open_dataset(self.parts[i_part], engine=self.engine) as ds:
+            for column, variable in part_columns:
+                if ds[variable].dims == ('profile',):
+                    values = ds[variable].values[i_obs_profile]
+                else:
+                    values = ds[variable].isel(obs=i_obs).values
+                if values.dtype.kind in 'OSU':
+                    values = np.asarray(values, dtype=object)
+                    values[values == ''] = None
+                elif values.dtype.kind == 'i':
+                    values = values.astype(np.int64)
+                elif values.dtype.kind == 'M' and 'pysic_tz' in ds[variable].attrs:
+                    values = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(ds[variable].attrs['pysic_tz'])
+                data[column] = values
+        instrument.count('rows', len(i_obs_profile))
+        return CoreStack(pd.DataFrame(data, columns=[column for column, _ in part_columns]))
+
+    def read(self, names=None, columns=None):
+        """
+        :param names: list of string, optional. Cores to read, default all the cores
+        :param columns: list of string, optional. Columns to read, default all; name, y_low, y_mid and y_sup are always
+            read
+        :return: CoreStack
+        """
+        from pysic.core.corestack import CoreStack
+
+        if isinstance(names, str):
+            names = [names]
+        stacks = [self.read_part(i_part, names=names, columns=columns) for i_part, (part_names, _, _)
+                  in enumerate(self._index) if names is None or np.isin(part_names, names).any()]
+        if not stacks:
+            return CoreStack()
+        return CoreStack(pd.concat(stacks, ignore_index=True, sort=False))
+
+    def __iter__(self):
+        """
+        :return: generator of CoreStack, one per part
+        """
+        for i_part in range(len(self.parts)):
+            yield self.read_part(i_part)
+
+
+def open_netcdf(path, engine=None):
+    """
+    :param path: string, directory of the parts written by to_netcdf, or path to a single part
+    :return: NetCDFArchive
+    """
+    return NetCDFArchive(path, engine=engine)
+
+
+def read_netcdf(path, names=None, columns=None, engine=None):
+    """
+    :param path: string, directory of the parts written by to_netcdf, or path to a single part
+    :param names: list of string, optional. Cores to read, default all the cores
+    :param columns: list of string, optional. Columns to read, default all
+    :return: CoreStack
+    """
+    return open_netcdf(path, engine=engine).read(names=names, columns=columns)
@@ -4,13 +4,14 @@
 pysic.core.profile.py : toolbox to work on property profile
 
 """
+import collections
 import logging
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
 import pysic
+from pysic.tools import instrument, kernels
 
 __name__ = "profile"
 __author__ = "Marc Oggier"
@@ -30,6 +31,9 @@ TOL = 1e-6
 subvariable_dict = {'conductivity': ['conductivity measurement temperature']}
 continuous_variable_list = ['temperature']
 DEBUG = False
+# number of remap matrices kept in cache
+remap_cache_size = 256
+_remap_cache = collections.OrderedDict()
 
 
 fill_gap = False
@@ -239,6 +243,17 @@ class Profile(pd.DataFrame):
             new_profile.update(new_df)
         return new_profile
 
+    def query(self, expr=None, **kwargs):
+        """
+        :param expr: string, optional. Query expression, evaluated by pandas.DataFrame.query
+        :return: pysic.core.query.StackQuery, lazy selection over the profile; with expr, result of
+            pandas.DataFrame.query
+        """
+        if expr is not None:
+            return super(Profile, self).query(expr, **kwargs)
+        from pysic.core.query import StackQuery
+        return StackQuery(self)
+
     def drop_empty_property(self):
         empty = [prop for prop in self.get_property() if self[prop].isnull().all()]
         self.variable = ', '.join([prop for prop in self.get_property() if prop not in empty])
@@ -359,6 +374,7 @@ class Profile(pd.DataFrame):
         return self.get_property()
 
 
+@instrument.timed('discretize_profile')
 def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False, fill_gap=fill_gap,
                        fill_extremity=fill_extremity, save_fig=save_fig, dropemptyrow=dropemptyrow):
     """
@@ -383,7 +399,8 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
         logger.warning("Discretization impossible, empty profile")
     else:
         if 'name' in profile.keys():
-            logger.info("Processing %s" % profile.name.unique()[0])
+            instrument.annotate(core=profile.name.unique()[0])
+            logger.info("Processing %s", profile.name.unique()[0])
         else:
             logger.info("Processing core")
 
@@ -414,6 +431,7 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
     #TODO : discretization for temperature by interpolation
     # 2019-03-08: loop over the variable not the variable groups
     for _variable in profile.variables():
+        instrument.count('bins', len(y_mid))
         var0 = [_variable]
         # select variable
         _profile = Profile(profile.loc[profile.variable.str.contains(_variable)])
@@ -434,62 +452,27 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
             temp = pd.DataFrame()
 
         elif is_continuous(_profile):
-            yx = _profile[['y_mid'] + _variable].set_index('y_mid').sort_index()
-            y2 = y_mid
-
-            if fill_extremity:
-                if 0 not in yx.index:
-                    from scipy.interpolate import InterpolatedUnivariateSpline
-                    if len(yx.index) >= 2:
-                        _x = np.array(yx.index[0:2].to_list())
-                        _y = np.array(yx.loc[yx.index[0:2]].values.flatten())
-                        f = InterpolatedUnivariateSpline(_x, _y, k=1)
-                        _new = pd.Series([f(0)], index=['temperature'], name=0)
-                        yx = yx.append(_new).astype(float)
-                        yx.sort_index(inplace=True)
-                    logger.info("\t fill_extremity is True: setting temperature at y=0, T= " + str("%.2f" %f(0)))
-
-            # drop all np.nan columns
-            # yx = yx.dropna(axis=1, how='all').astype(float)
-            # _variables_notna = yx.keys().tolist()
-            # yx = yx.dropna(axis=0, subset=['y_low', 'y_sup'], thresh=2).values
-
-            x2 = np.array([np.interp(y2, yx.index, yx[_var], left=np.nan, right=np.nan) for _var in _variable])
-
-            y2x = pd.DataFrame(x2.transpose(), columns=_variable, index=y2)
-            yx = yx.drop_duplicates()
-
-            # 'BRW_CS-20030224A' : if aligned at the bottom, double value for 0 : np.nan, -1.86
-            yx = yx.dropna(axis=0)
-            for index in yx.index.unique():
-                y2x.loc[abs(y2x.index - index) < 1e-6, _variable] = yx.loc[yx.index == index, _variable].values
-
-            # compute weight, if y_mid is in min(yx) < y_mid < max(yx)
-            w = [1 if yx.index[0] - TOL <= y <= yx.index[-1] + TOL else 0 for y in y_mid ]
-
-            # add the temperature profile extremum value
-            if not any(abs(yx.index[0]-y2) < TOL):
-                y2x.loc[yx.index[0], _variable] = yx.loc[yx.index == yx.index[0], _variable[0]].values
-                w = w + [0]
-            if not any(abs(yx.index[-1]-y2) < TOL):
-                y2x.loc[yx.index[-1], _variable] = yx.loc[yx.index == yx.index[-1], _variable[0]].values
-                w = w + [0]
-
-            temp = pd.DataFrame(columns=profile.columns.tolist(), index=range(y2x.__len__()))
-            temp.update(y2x.reset_index().rename(columns={'index': 'y_mid'}))
-            temp['w_'+_variable[0]] = pd.Series(w, index=temp.index)
-            temp = temp.sort_values('y_mid').reset_index(drop=True)
-            profile_prop = _profile.loc[_profile.variable == _variable[0]].head(1)
-            profile_prop = profile_prop.drop(_variable, 1)
-            profile_prop['variable'] = ', '.join(_variable)
-            if 'y_low' in profile_prop:
-                profile_prop = profile_prop.drop('y_low', 1)
-            profile_prop = profile_prop.drop('y_mid', 1)
-            if 'y_sup' in profile_prop:
-                profile_prop = profile_prop.drop('y_sup', 1)
+            # 'BRW_CS-20030224A' : if aligned at the bottom, double value for 0 : np.nan, -1.86; nan are discarded
+            yx = _profile[['y_mid'] + _variable].apply(pd.to_numeric, errors='coerce').values
+            _, y2, x2, w = interp_continuous(np.zeros(len(yx), dtype=int), yx[:, 0], yx[:, 1:], y_mid,
+                                             fill_extremity=fill_extremity)
+            if fill_extremity and not (np.abs(yx[:, 0]) < TOL).any() and (np.abs(y2) < TOL).any():
+                logger.info("\t fill_extremity is True: setting temperature at y=0, T= %.2f",
+                            x2[np.abs(y2) < TOL, 0][0])
 
-            temp.update(pd.DataFrame([profile_prop.iloc[0].tolist()], columns=profile_prop.columns.tolist(),
-                                     index=temp.index.tolist()))
+            profile_prop = _profile.loc[_profile.variable == _variable[0]].head(1)
+            if profile_prop.empty:
+                profile_prop = _profile.head(1)
+
+            temp = pd.DataFrame(columns=profile.columns.tolist(), index=range(len(y2)))
+            for key in profile_prop.columns:
+                if key not in _variable + ['y_low', 'y_mid', 'y_sup']:
+                    temp[key] = profile_prop[key].values[0]
+            temp['variable'] = ', '.join(_variable)
+            temp['y_mid'] = y2
+            for ii_var, _var in enumerate(_variable):
+                temp[_var] = x2[:, ii_var]
+            temp['w_'+_variable[0]] = w
 
         # elif 'mass' in _variable: TODO: add step profile type mass
         else:  # step profile (salinity-like)
@@ -519,32 +502,16 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
 
             # if missing section, add an emtpy section with np.nan as property value
             if len(yx) > 1:
-                yx_new = []
-                for row in range(yx[:, 0].__len__()-1):
-                    yx_new.append(yx[row])
-                    if abs(yx[row, 1]-yx[row+1, 0]) > TOL:
-                        yx_new.append([yx[row, 1], yx[row + 1, 0]] + [np.nan] * _variable.__len__())
-                yx_new.append(yx[row+1, :])
-                yx = np.array(yx_new)
-                del yx_new
+                i_gap = np.flatnonzero(np.abs(yx[:-1, 1] - yx[1:, 0]) > TOL)
+                if i_gap.size:
+                    gap = np.full((i_gap.size, yx.shape[1]), np.nan)
+                    gap[:, 0] = yx[i_gap, 1]
+                    gap[:, 1] = yx[i_gap + 1, 0]
+                    yx = np.insert(yx.astype(float), i_gap + 1, gap, axis=0)
 
             if fill_gap:
-                value = pd.Series(yx[:, 2])
-                value_low = value.fillna(method='ffill')
-                value_sup = value.fillna(method='bfill')
-
-                ymid = pd.Series(yx[:, 0]+(yx[:, 1]-yx[:, 0])/2)
-                ymid2 = pd.Series(None, index=value.index)
-                ymid2[np.isnan(value)] = ymid[np.isnan(value)]
-
-                dy = pd.DataFrame(yx[:, 0:2], columns=['y_low', 'y_sup'])
-                dy2 = pd.DataFrame([[None, None]], index=value.index, columns=['y_low', 'y_sup'])
-                dy2[~np.isnan(value)] = dy[~np.isnan(value)]
-                dy2w = dy2['y_low'].fillna(method='bfill') - dy2['y_sup'].fillna(method='ffill')
-                new_value = value_low + (ymid2 - dy2['y_sup'].fillna(method='ffill'))*(value_sup-value_low)/dy2w
-                value.update(new_value)
-
-                yx[:, 2] = value
+                yx = yx.astype(float)
+                yx[:, 2] = kernels.fill_gap(yx[:, 0], yx[:, 1], yx[:, 2])
 
             # yx and y_bins should be ascendent suit
             if (np.diff(y_bins) < 0).all():
@@ -566,212 +533,15 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
             yx_mass = yx[:, [0, 1] + [np.where(_mvar == col)[0][0] for _mvar in mass_variable]].copy()
             yx_cont = yx[:, [0, 1] + [np.where(_cvar == col)[0][0] for _cvar in cont_variable]].copy()
 
-            x_step = []
-            y_step = []
-            w_step = []  # weight of the bin, defined as the portion on which the property is define
-
-            for ii_bin in range(y_bins.__len__()-1):
-                a = np.flatnonzero((yx[:, 0] - y_bins[ii_bin] < -TOL) & ( y_bins[ii_bin] - yx[:, 1] < -TOL))
-                a = np.concatenate((a, np.flatnonzero((y_bins[ii_bin] - yx[:, 0] <= TOL) & (yx[:, 1] - y_bins[ii_bin+1] <= TOL))))
-                a = np.concatenate((a, np.flatnonzero((yx[:, 0] - y_bins[ii_bin+1] < -TOL) & ( y_bins[ii_bin+1] - yx[:, 1] < -TOL))))
-                a = np.unique(a)
-
-                if DEBUG:
-                    print('target section %.4f - %.4f' % (y_bins[ii_bin], y_bins[ii_bin + 1]))
-                    print('- original section %s' % ', '.join(a.astype(str)))
-
-                if a.size != 0:
-                    S = [np.nan]*n_var
-                    L = np.zeros_like(S)
-                    L_nan = np.zeros_like(S)
-                    a_ii = 0
-
-                    if yx[a[a_ii], 0] - y_bins[ii_bin] < -TOL:
-                        S_temp = yx[a[a_ii], n_s0:n_s1]*(yx[a[a_ii], 1] - y_bins[ii_bin])
-                        S = np.nansum([S, S_temp], axis=0)
-                        l = yx[a[a_ii], 1] - y_bins[ii_bin]
-                        L = np.nansum([L, l * ~np.isnan(S_temp)], axis=0)
-                        L_nan = np.nansum([L, l * np.isnan(S_temp)], axis=0)
-                        if DEBUG:
-                            print('\t\t %.3f - %.3f : %.4f - %.4f :S_bin = %.3f (%.1f)' % (
-                            y_bins[ii_bin], y_bins[ii_bin + 1], yx[a[a_ii], 0], yx[a[a_ii], 1], S_temp,
-                            100 * l / (y_bins[ii_bin + 1] - y_bins[ii_bin])))
-                        a_ii += 1
-                    while ii_bin+1 <= y_bins.shape[0]-1 and a_ii < a.shape[0]-1 and yx[a[a_ii], 1] - y_bins[ii_bin+1] < -TOL:
-                        S_temp = yx[a[a_ii], n_s0:n_s1] * (yx[a[a_ii], 1]-yx[a[a_ii], 0])
-                        S = np.nansum([S, S_temp], axis=0)
-                        l = yx[a[a_ii], 1]-yx[a[a_ii], 0]
-                        L = np.nansum([L, l * ~np.isnan(S_temp)], axis=0)
-                        L_nan = np.nansum([L_nan, l * np.isnan(S_temp)], axis=0)
-                        if DEBUG:
-                            print('\t\t %.3f - %.3f : %.4f - %.4f :S_bin = %.3f (%.3f)' % (
-                            y_bins[ii_bin], y_bins[ii_bin + 1], yx[a[a_ii], 0], yx[a[a_ii], 1], S_temp,
-                            100 * l / (y_bins[ii_bin + 1] - y_bins[ii_bin])))
-                            # print('\t\t %.3f - %.3f : S_bin = %.3f' % (yx[a[a_ii], 0], yx[a[a_ii], 1], S_temp))
-                        a_ii += 1
-
-                    # check if a_ii-1 was not the last element of a
-                    if a_ii < a.size:
-                        if yx[a[a_ii], 1] - y_bins[ii_bin+1] > -TOL:
-                            l = y_bins[ii_bin+1] - yx[a[a_ii], 0]  # length of the suction
-                            S_temp = yx[a[a_ii], n_s0:n_s1] * l
-                            S = np.nansum([S, S_temp], axis=0)
-                            L = np.nansum([L, l * ~np.isnan(S_temp)], axis=0)
-                            L_nan = np.nansum([L_nan, l * np.isnan(S_temp)], axis=0)
-                            if DEBUG:
-                                print('\t\t %.3f - %.3f : %.4f - %.4f :S_bin = %.3f (%.1f)' % (
-                                y_bins[ii_bin], y_bins[ii_bin + 1], yx[a[a_ii], 0], yx[a[a_ii], 1], S_temp,
-                                100 * l / (y_bins[ii_bin + 1] - y_bins[ii_bin])))
-                        elif yx[a[a_ii], 1] - y_bins[ii_bin + 1] < -TOL:
-                            S_temp = yx[a[a_ii], n_s0:n_s1] * (yx[a[a_ii], 1] -yx[a[a_ii], 0])
-                            S = np.nansum([S, S_temp], axis=0)
-                            l = yx[a[a_ii], 1] -yx[a[a_ii], 0]
-                            L = np.nansum([L, l * ~np.isnan(S_temp)], axis=0)
-                            L_nan = np.nansum([L_nan, l * np.isnan(S_temp)], axis=0)
-                            if DEBUG:
-                                print('\t\t %.3f - %.3f : %.4f - %.4f :S_bin = %.3f (%.3f)' % (
-                                y_bins[ii_bin], y_bins[ii_bin + 1], yx[a[a_ii], 0], yx[a[a_ii], 1], S_temp,
-                                100 * l / (y_bins[ii_bin + 1] - y_bins[ii_bin])))
-
-                    w = L / (y_bins[ii_bin + 1]-y_bins[ii_bin])
-                    L[L == 0] = np.nan
-                    S = S / L
-                    if yx[a[0], 0] - y_bins[ii_bin] > TOL and not fill_extremity:
-                        y_step.append(yx[a[0], 0])
-                        y_step.append(y_bins[ii_bin + 1])
-                    elif yx[a[-1], 1] - y_bins[ii_bin + 1] < -TOL and not fill_extremity:
-                        y_step.append(y_bins[ii_bin])
-                        y_step.append(yx[a[-1], 1])
-                    else:
-                        y_step.append(y_bins[ii_bin])
-                        y_step.append(y_bins[ii_bin + 1])
-                else:
-                    S = np.array([np.nan] * n_var)
-                    w = np.array([0] * n_var)
-                    y_step.append(y_bins[ii_bin])
-                    y_step.append(y_bins[ii_bin + 1])
-                x_step.append(S)
-                w_step.append(w)
-
-                if DEBUG:
-                    x_plot = []
-                    for x in x_step:
-                        x_plot.extend(x)
-                        x_plot.extend(x)
-                    x_xy_plot = []
-                    y_xy_plot = []
-                    for ii in range(0, len(yx[:, 0])):
-                        x_xy_plot.extend([yx[ii, 2]])
-                        x_xy_plot.extend([yx[ii, 2]])
-                        y_xy_plot.extend([yx[ii, 0]])
-                        y_xy_plot.extend([yx[ii, 1]])
-                    plt.figure()
-                    plt.step(x_xy_plot, y_xy_plot)
-                    plt.step(x_plot, y_step, 'x')
-                    if profile.get_name() != None:
-                        plt.title(profile.get_name())
-                    plt.show()
-            # for end
-
-            W = np.array(w_step)
-            X = np.array(x_step)
+            # overlap of the sections with the bins, cached for repeated section boundaries and y_bins
+            X, W = remap_profile(yx[:, 0], yx[:, 1], yx[:, n_s0:n_s1], y_bins)
+            y_step = _remap_y_step(yx[:, 0], yx[:, 1], y_bins, fill_extremity=fill_extremity)
 
             if mass_variable.__len__() > 0:
-                x_step = []
-                y_step = []
-                w_step = []  # weight of the bin, defined as the portion on which the property is define
-                yx_bkp = yx.copy()
-                yx = yx_mass
-
-                n_s0 = 2
-                n_var = mass_variable.__len__()
-                n_s1 = n_s0 + n_var
-                for ii_bin in range(y_bins.__len__() - 1):
-                    a = np.flatnonzero((yx[:, 0] - y_bins[ii_bin] < -TOL) & (y_bins[ii_bin] - yx[:, 1] < -TOL))
-                    a = np.concatenate((a, np.flatnonzero(
-                        (y_bins[ii_bin] - yx[:, 0] <= TOL) & (yx[:, 1] - y_bins[ii_bin + 1] <= TOL))))
-                    a = np.concatenate((a, np.flatnonzero(
-                        (yx[:, 0] - y_bins[ii_bin + 1] < -TOL) & (y_bins[ii_bin + 1] - yx[:, 1] < -TOL))))
-                    a = np.unique(a)
-
-                    if DEBUG:
-                        print('target section %.4f - %.4f' % (y_bins[ii_bin], y_bins[ii_bin + 1]))
-                        print('- original section %s' % ', '.join(a.astype(str)))
-
-                    if a.size != 0:
-                        M = [np.nan] * (n_var)
-                        L = np.zeros_like(M)
-                        L_nan = np.zeros_like(M)
-                        a_ii = 0
-
-                        # section yx_0 < y_bins_0 < yx_1 < y_bins_1
-                        if yx[a[a_ii], 0] - y_bins[ii_bin] < -TOL:
-                            l = yx[a[a_ii], 1] - y_bins[ii_bin]
-                            M_temp = yx[a[a_ii], n_s0:n_s1] * l / (yx[a[a_ii], 1] - yx[a[a_ii], 0])
-                            M = np.nansum([M, M_temp], axis=0)
-                            L = np.nansum([L, l * ~np.isnan(M_temp)], axis=0)
-                            L_nan = np.nansum([L, l * np.isnan(M_temp)], axis=0)
-                            if DEBUG:
-                                print('\t\t %.3f - %.3f : %.4f - %.4f :S_bin = %.3f (%.1f)' % (
-                                    y_bins[ii_bin], y_bins[ii_bin + 1],
-                                    yx[a[a_ii], 0], yx[a[a_ii], 1],
-                                    M_temp, 100 * l / (y_bins[ii_bin + 1] - y_bins[ii_bin])))
-                            a_ii += 1
-
-                        while ii_bin + 1 <= y_bins.shape[0] - 1 and a_ii < a.shape[0] - 1 and yx[a[a_ii], 1] - y_bins[
-                            ii_bin + 1] < -TOL:
-                            M_temp = yx[a[a_ii], n_s0:n_s1]
-                            M = np.nansum([M, M_temp], axis=0)
-                            l = yx[a[a_ii], 1] - yx[a[a_ii], 0]
-                            L = np.nansum([L, l * ~np.isnan(M_temp)], axis=0)
-                            L_nan = np.nansum([L_nan, l * np.isnan(M_temp)], axis=0)
-                            if DEBUG:
-                                print('\t\t %.3f - %.3f : %.4f - %.4f :S_bin = %.3f (%.3f)' % (
-                                    y_bins[ii_bin], y_bins[ii_bin + 1], yx[a[a_ii], 0], yx[a[a_ii], 1], M_temp,
-                                    100 * l / (y_bins[ii_bin + 1] - y_bins[ii_bin])))
-                            a_ii += 1
-
-                        # check if a_ii-1 was not the last element of a
-                        if a_ii < a.size:
-                            # section of the next y_bins_0 < bin yx_0 < y_bins_1 < yx_1
-                            if yx[a[a_ii], 1] - y_bins[ii_bin + 1] > -TOL:
-                                l = y_bins[ii_bin + 1] - yx[a[a_ii], 0]
-                                M_temp = yx[a[a_ii], n_s0:n_s1] * l / (yx[a[a_ii], 1] - yx[a[a_ii], 0])
-                                M = np.nansum([M, M_temp], axis=0)
-                                L = np.nansum([L, l * ~np.isnan(M_temp)], axis=0)
-                                L_nan = np.nansum([L_nan, l * np.isnan(M_temp)], axis=0)
-                                # print(yx[a[a_ii], 0], y_bins[ii_bin+1], M_temp)
-                            # section of the next y_bins_0 = bin yx_0 < y_bins_1 < yx_1
-                            elif yx[a[a_ii], 1] - y_bins[ii_bin + 1] < -TOL:
-                                l = yx[a[a_ii], 1] - yx[a[a_ii], 0]
-                                M_temp = yx[a[a_ii], n_s0:n_s1]
-                                M = np.nansum([M, M_temp], axis=0)
-                                L = np.nansum([L, l * ~np.isnan(M_temp)], axis=0)
-                                L_nan = np.nansum([L_nan, l * np.isnan(M_temp)], axis=0)
-                                # print(yx[a[a_ii], 0], yx[a[a_ii], 1], M_temp)
-
-                        w = L / (y_bins[ii_bin + 1] - y_bins[ii_bin])
-                        L[L == 0] = np.nan
-
-                        if yx[a[0], 0] - y_bins[ii_bin] > TOL and not fill_extremity:
-                            y_step.append(yx[a[0], 0])
-                            y_step.append(y_bins[ii_bin + 1])
-                        elif yx[a[-1], 1] - y_bins[ii_bin + 1] < -TOL and not fill_extremity:
-                            y_step.append(y_bins[ii_bin])
-                            y_step.append(yx[a[-1], 1])
-                        else:
-                            y_step.append(y_bins[ii_bin])
-                            y_step.append(y_bins[ii_bin + 1])
-                    else:
-                        M = np.array([np.nan] * n_var)
-                        w = np.array([0] * n_var)
-                        y_step.append(y_bins[ii_bin])
-                        y_step.append(y_bins[ii_bin + 1])
-                    x_step.append(M)
-                    w_step.append(w)
-
-                X[:, [_variable_dict[_mvar] for _mvar in mass_variable]] = np.array(x_step)
-                W[:, [_variable_dict[_mvar] for _mvar in mass_variable]] = np.array(w_step)
+                # mass-conserving remap
+                i_mass = [_variable_dict[_mvar] for _mvar in mass_variable]
+                X[:, i_mass], W[:, i_mass] = remap_profile(yx_mass[:, 0], yx_mass[:, 1], yx_mass[:, 2:], y_bins,
+                                                           mass=True)
 
             if cont_variable.__len__() > 0:
                 y = (yx_cont[:, 0]+yx_cont[:, 1]) / 2
@@ -908,15 +678,19 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
                     discretized_profile = pd.merge(discretized_profile, temp, on=col, sort=False, how='outer')
                     discretized_profile['variable'] = discretized_profile['variable'].astype(str).replace('nan', None)
                     for vg in discretized_profile.variable.unique():
+                        # rows only defined in temp (e.g. extremity of a continuous profile) have no variable yet
+                        if vg is None:
+                            discretized_profile.loc[discretized_profile.variable.isna(), 'variable'] = ', '.join(var0)
+                            continue
                         new_vg = vg.split(', ')
                         new_vg += var0
                         discretized_profile.loc[discretized_profile.variable == vg, 'variable'] = ', '.join(new_vg)
                 else:
                     #TODO: check if not matching 'y_mid' is extrmum point for continuous profile
                     if not_matching_col == ['length']:
-                        logger.warning('%s - (%s) %s length not matching between profile' % (__package__ + '.' + __name__,
-                                                                                      profile.name.unique()[0],
-                                                                                      ', '.join(not_matching_col)))
+                        logger.warning('%s - (%s) %s length not matching between profile',
+                                       __package__ + '.' + __name__, profile.name.unique()[0],
+                                       ', '.join(not_matching_col))
                         l_c_p = discretized_profile.length.unique()[0]
                         # merge profile up to maximum common depth
                         if l_c < l_c_p:
@@ -967,68 +741,96 @@ def discretize_profile(profile, y_bins=None, y_mid=y_mid, display_figure=False,
     return Profile(discretized_profile)
 
 
+def _profile_codes(profile):
+    """
+    :param profile: Profile or CoreStack
+    :return: np.array of int, index of the profile (core and variable group) of each row
+    """
+    codes = np.zeros(len(profile), dtype=np.int64)
+    for key in ['name', 'variable']:
+        if key in profile.keys():
+            key_codes, key_uniques = pd.factorize(profile[key].values)
+            codes = codes * (len(key_uniques) + 1) + key_codes + 1
+    return pd.factorize(codes)[0]
+
+
+def _last_per_profile(frame, key, codes, n_profile):
+    """
+    :param frame: Profile or CoreStack
+    :param key: string, numeric column
+    :param codes: np.array of int, profile index of each row (see _profile_codes)
+    :param n_profile: int, number of profiles
+    :return: np.array, last value defined in the profile of each row; nan if the column does not exist or the profile
+        has no value
+    """
+    last = np.full(n_profile, np.nan)
+    if key in frame.keys():
+        values = pd.to_numeric(frame[key], errors='coerce').values.astype(float)
+        valid = np.nonzero(~np.isnan(values))[0][::-1]
+        group, first = np.unique(codes[valid], return_index=True)
+        last[group] = values[valid[first]]
+    return last[codes]
+
+
+def reference_height(profile, codes=None):
+    """
+    Reference height used to flip the vertical reference of each row. For each profile (core and variable group), the
+    ice core length is used if it is within 10% of the ice thickness, otherwise the ice thickness, or the ice core length
+    in absence of ice thickness.
+
+    :param profile: Profile or CoreStack
+    :param codes: np.array of int, optional, profile index of each row (see _profile_codes)
+    :return: np.array, reference height of each row; nan if neither ice thickness nor ice core length is known
+    """
+    if codes is None:
+        codes = _profile_codes(profile)
+    n_profile = codes.max() + 1 if len(codes) else 0
+
+    hi = _last_per_profile(profile, 'ice_thickness', codes, n_profile)
+    lc = _last_per_profile(profile, 'length', codes, n_profile)
+    with np.errstate(invalid='ignore'):
+        href = np.where(np.abs(lc - hi) < 0.1 * hi, lc, hi)
+    return np.where(np.isnan(href), lc, href)
+
+
 def set_profile_orientation(profile, v_ref):
     """
+    Set the vertical reference of all the rows of a profile, or of a stack, at once. Depths of the rows with another
+    vertical reference are flipped around the reference height of their profile (see reference_height).
 
-    :param profile:
+    :param profile: Profile or CoreStack
     :param v_ref: new reference 'top', 'bottom'
-    :return:
+    :return: Profile or CoreStack. Profiles without ice thickness and ice core length are deleted.
     """
     logger = logging.getLogger(__name__)
 
-    for vg in profile.variable.unique():
-        # look for ice thickness:
-        if profile[profile.variable == vg].v_ref.unique().__len__() > 1:
+    if profile.empty:
+        return profile
+
+    flip = profile.v_ref.values != v_ref
+    if not flip.any():
+        logger.info('profile orientiation already set')
+    else:
+        codes = _profile_codes(profile)
+        if (pd.Series(flip).groupby(codes).nunique() > 1).any():
             logger.error("vertical reference for profile are not consistent")
-        if not profile[profile.variable == vg].v_ref.unique().tolist()[0] == v_ref:
-            # search ice core length, and ice thickness
-            if 'ice_thickness' in profile.keys() and \
-                    not np.isnan(profile[profile.variable == vg].ice_thickness.astype(float)).all():
-                    hi = profile[profile.variable == vg].ice_thickness.astype(float).unique()[-1]
-            else:
-                hi = np.nan
 
-            if 'length' in profile.keys() and \
-                    not np.isnan(profile[profile.variable == vg].length.astype(float)).all():
-                    lc = profile[profile.variable == vg].length.astype(float).unique()[-1]
-            else:
-                lc = np.nan
+        href = reference_height(profile, codes)
+        missing = flip & np.isnan(href)
+        if missing.any():
+            names = profile.name.values[missing] if 'name' in profile.keys() else []
+            logger.warning("Mising core length or ice thickness, impossible to set profile orientation to %s. "
+                           "Deleting profile (%s)", v_ref, ', '.join(pd.unique(names).astype(str)))
+            profile = profile[~missing]
+            flip = flip[~missing]
+            href = href[~missing]
 
-            if lc is np.nan and hi is np.nan:
-                if 'name' in profile.keys():
-                    logger.warning("Mising core length or ice thickness, impossible to set profile orientation to %s.\
-                    Deleting profile (%s)" %(v_ref, profile.name.unique()[0]))
-                else:
-                    logger.warning("Mising core length or ice thickness, impossible to set profile orientation to %s.\
-                    Deleting profile" % v_ref)
-                profile = delete_profile(profile, {'variable': vg})
-            else:
-                print(profile.name.unique()[0])
-                if np.abs(lc - hi) < 0.1*hi:
-                    href = lc
-                    logger.info("Bottom reference set to ice core length:\
-                    as ice core length is within 10% of the ice thickness")
-                elif not ( hi is None or np.isnan(hi)):
-                    href = hi
-                    logger.info("Bottom reference set to ice thickness")
-                elif not ( lc is None or np.isnan(lc)):
-                    href = lc
-                    logger.info("Bottom reference set to ice core length in absence of ice thickness")
-
-                new_df = profile.loc[profile.variable == vg, 'y_low'].apply(lambda x: href - x)
-                new_df = pd.concat([new_df, profile.loc[profile.variable == vg, 'y_mid'].apply(lambda x: href - x)],
-                                   axis=1, sort=False)
-                new_df = pd.concat([new_df, profile.loc[profile.variable == vg, 'y_sup'].apply(lambda x: href - x)],
-                                   axis=1, sort=False)
-                new_df['v_ref'] = 'bottom'
-                profile.update(new_df)
-        else:
-            logger.info('profile orientiation already set')
+        y = profile[['y_low', 'y_mid', 'y_sup']].apply(pd.to_numeric, errors='coerce').values
+        profile[['y_low', 'y_mid', 'y_sup']] = np.where(flip[:, None], href[:, None] - y, y)
+        profile['v_ref'] = np.where(flip, v_ref, profile.v_ref.values)
 
-    if v_ref == ' bottom':
-        profile.length = np.abs(profile.length)
-    else:
-        profile.length = np.abs(profile.length)
+    if 'length' in profile.keys():
+        profile['length'] = np.abs(profile.length)
 
     return profile
 
@@ -1224,6 +1026,214 @@ def s_nan(yx, ii_yx, fill_gap=True):
     return s
 
 
+def remap_matrix(y_low, y_sup, y_bins):
+    """
+    Sparse overlap matrix between source sections and target bins. Element (i, j) is the length of section j within
+    bin i; overlaps shorter than TOL are discarded. Matrices are cached by section boundaries and target bins, so that
+    cores cut with the same sections and discretized on the same y_bins share the same matrix.
+
+    :param y_low, y_sup: array, section boundaries, sorted
+    :param y_bins: array, target bin boundaries, sorted
+    :return: scipy.sparse.csr_matrix, shape (len(y_bins) - 1, len(y_low))
+    """
+    y_low = np.ascontiguousarray(y_low, dtype=float)
+    y_sup = np.ascontiguousarray(y_sup, dtype=float)
+    y_bins = np.ascontiguousarray(y_bins, dtype=float)
+    key = (y_low.tobytes(), y_sup.tobytes(), y_bins.tobytes())
+    if key in _remap_cache:
+        _remap_cache.move_to_end(key)
+        instrument.count('remap_cache_hit')
+        return _remap_cache[key]['length']
+
+    from scipy.sparse import csr_matrix
+
+    n_bin = max(len(y_bins) - 1, 0)
+    n_section = len(y_low)
+    # range of bins overlapped by each section
+    i_first = np.clip(np.searchsorted(y_bins, y_low, side='right') - 1, 0, max(n_bin - 1, 0))
+    i_last = np.clip(np.searchsorted(y_bins, y_sup, side='left') - 1, 0, max(n_bin - 1, 0))
+    n = np.where(np.isnan(y_low) | np.isnan(y_sup) | (n_bin == 0), 0, np.maximum(i_last - i_first + 1, 0))
+    col = np.repeat(np.arange(n_section), n)
+    row = np.repeat(i_first, n) + np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+    overlap = np.minimum(y_sup[col], y_bins[row + 1]) - np.maximum(y_low[col], y_bins[row])
+    keep = overlap > TOL
+    matrix = csr_matrix((overlap[keep], (row[keep], col[keep])), shape=(n_bin, n_section))
+    matrix.sort_indices()
+
+    _remap_cache[key] = {'length': matrix}
+    if len(_remap_cache) > remap_cache_size:
+        _remap_cache.popitem(last=False)
+    instrument.count('remap_cache_miss')
+    return matrix
+
+
+def remap_profile(y_low, y_sup, x, y_bins, mass=False):
+    """
+    Remap step profiles from source sections to target bins with a sparse matrix product
+
+    :param y_low, y_sup: array, section boundaries, sorted
+    :param x: array (n,) or (n, m), section values
+    :param y_bins: array, target bin boundaries, sorted
+    :param mass: boolean, default False. If False, bin values are the mean of the section values weighted by the
+        overlap length. If True, section values are distributed to the bins proportionally to the overlap length
+        (mass-conserving).
+    :return: X, W, arrays (len(y_bins) - 1, m). X is nan for bins without data; W is the fraction of each bin covered
+        by sections with data.
+    """
+    if kernels.ENABLED:
+        return kernels.remap_sweep(y_low, y_sup, x, y_bins, mass=mass)
+
+    x = np.asarray(x, dtype=float)
+    x = x.reshape(len(x), -1)
+    matrix = remap_matrix(y_low, y_sup, y_bins)
+    valid = ~np.isnan(x)
+    x = np.where(valid, x, 0)
+
+    L = matrix @ valid.astype(float)
+    if mass:
+        entry = _remap_cache.get((np.ascontiguousarray(y_low, dtype=float).tobytes(),
+                                  np.ascontiguousarray(y_sup, dtype=float).tobytes(),
+                                  np.ascontiguousarray(y_bins, dtype=float).tobytes()), {})
+        if 'mass' not in entry:
+            length = np.asarray(y_sup, dtype=float) - np.asarray(y_low, dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                entry['mass'] = matrix.multiply(np.where(length > 0, 1 / length, 0)[None, :]).tocsr()
+        X = entry['mass'] @ x
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            X = (matrix @ x) / L
+    X[L == 0] = np.nan
+    W = L / np.diff(np.asarray(y_bins, dtype=float))[:, None]
+    return X, W
+
+
+def _remap_y_step(y_low, y_sup, y_bins, fill_extremity=False):
+    """
+    Section boundaries of the discretized profile: bins partially covered at the profile extremities are limited to the
+    profile, unless fill_extremity is True
+
+    :return: array, [y_low_0, y_sup_0, y_low_1, y_sup_1, ...]
+    """
+    y_bins = np.asarray(y_bins, dtype=float)
+    y_low_step = y_bins[:-1].copy()
+    y_sup_step = y_bins[1:].copy()
+    if not fill_extremity:
+        if kernels.ENABLED:
+            j_first, j_last = kernels.bin_sections(y_low, y_sup, y_bins)
+            has_section = j_first >= 0
+            j_first = j_first[has_section]
+            j_last = j_last[has_section]
+        else:
+            matrix = remap_matrix(y_low, y_sup, y_bins)
+            has_section = np.diff(matrix.indptr) > 0
+            j_first = matrix.indices[matrix.indptr[:-1][has_section]]
+            j_last = matrix.indices[matrix.indptr[1:][has_section] - 1]
+        i_bin = np.flatnonzero(has_section)
+        starts_in_bin = np.asarray(y_low)[j_first] - y_bins[i_bin] > TOL
+        ends_in_bin = ~starts_in_bin & (np.asarray(y_sup)[j_last] - y_bins[i_bin + 1] < -TOL)
+        y_low_step[i_bin[starts_in_bin]] = np.asarray(y_low)[j_first[starts_in_bin]]
+        y_sup_step[i_bin[ends_in_bin]] = np.asarray(y_sup)[j_last[ends_in_bin]]
+    return np.column_stack([y_low_step, y_sup_step]).ravel()
+
+
+def interp_continuous(g, y, x, y_target, fill_extremity=False, n_profile=None):
+    """
+    Interpolate continuous profiles (e.g. temperature) at target depths, for several profiles at once. Measurements are
+    sorted by profile and depth with a single lexsort, and the interval of each target depth is found with a single
+    searchsorted over all profiles, whose depths are offset by the profile index.
+
+    :param g: array of int, profile index of each measurement
+    :param y: array, depth of each measurement
+    :param x: array (n,) or (n, m), measured values
+    :param y_target: array, target depths, common to all profiles
+    :param fill_extremity: boolean, default False. If True, profiles without measurement at y=0 are extrapolated
+        linearly to y=0 from their first two measurements.
+    :param n_profile: int, optional, number of profiles. Default max(g) + 1
+    :return: g_out, y_out, x_out, w_out, sorted by profile and depth. For each profile, the target depths, then the
+        first and last measurements if they do not match a target depth. x_out is nan outside of the measured range;
+        target depths within TOL of a measurement take its value. w_out is 1 for target depths within the measured
+        range, 0 otherwise.
+    """
+    g = np.asarray(g, dtype=int)
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    x = x.reshape(len(x), -1)
+    y_target = np.asarray(y_target, dtype=float)
+    n_target = len(y_target)
+    if n_profile is None:
+        n_profile = g.max() + 1 if len(g) else 0
+
+    def _sort(g, y, x):
+        order = np.lexsort((y, g))
+        g, y, x = g[order], y[order], x[order]
+        # duplicated depths: the first measurement is kept
+        keep = np.concatenate([[True], (np.diff(g) != 0) | (np.diff(y) >= TOL)])
+        return g[keep], y[keep], x[keep]
+
+    valid = ~np.isnan(y) & ~np.isnan(x).any(axis=1)
+    g, y, x = _sort(g[valid], y[valid], x[valid])
+    start = np.searchsorted(g, np.arange(n_profile), side='left')
+    end = np.searchsorted(g, np.arange(n_profile), side='right')
+
+    if fill_extremity:
+        at_zero = np.bincount(g[np.abs(y) < TOL], minlength=n_profile) > 0
+        fill = (end - start >= 2) & ~at_zero
+        i0 = start[fill]
+        x0 = x[i0] - (y[i0] / (y[i0 + 1] - y[i0]))[:, None] * (x[i0 + 1] - x[i0])
+        g, y, x = _sort(np.concatenate([g, np.nonzero(fill)[0]]), np.concatenate([y, np.zeros(fill.sum())]),
+                        np.concatenate([x, x0]))
+        start = np.searchsorted(g, np.arange(n_profile), side='left')
+        end = np.searchsorted(g, np.arange(n_profile), side='right')
+
+    has_data = end > start
+    first = np.where(has_data, start, 0)
+    last = np.where(has_data, end - 1, 0)
+
+    # target depths of all profiles
+    g_t = np.repeat(np.arange(n_profile), n_target)
+    y_t = np.tile(y_target, n_profile)
+    x_t = np.full((len(y_t), x.shape[1]), np.nan)
+    w_t = np.zeros(len(y_t))
+    if len(y):
+        y0 = min(y.min(), y_target.min() if n_target else y.min())
+        span = max(y.max(), y_target.max() if n_target else y.max()) - y0 + 1
+        ii = np.searchsorted(g * span + (y - y0), g_t * span + (y_t - y0), side='right')
+        ii_l = np.clip(ii - 1, first[g_t], last[g_t])
+        ii_r = np.clip(ii, first[g_t], last[g_t])
+        y_l, y_r = y[ii_l], y[ii_r]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(y_r > y_l, (y_t - y_l) / (y_r - y_l), 0)
+        x_t = x[ii_l] + frac[:, None] * (x[ii_r] - x[ii_l])
+
+        inside = has_data[g_t] & (y[first[g_t]] <= y_t) & (y_t <= y[last[g_t]])
+        snap_l = has_data[g_t] & (np.abs(y_t - y_l) < TOL)
+        snap_r = has_data[g_t] & (np.abs(y_t - y_r) < TOL)
+        x_t = np.where(snap_r[:, None], x[ii_r], x_t)
+        x_t = np.where(snap_l[:, None], x[ii_l], x_t)
+        x_t[~(inside | snap_l | snap_r)] = np.nan
+        w_t = (has_data[g_t] & (y[first[g_t]] - TOL <= y_t) & (y_t <= y[last[g_t]] + TOL)).astype(float)
+
+    # first and last measurements not matching a target depth
+    y_sorted = np.sort(y_target)
+
+    def _matched(y_node):
+        jj = np.searchsorted(y_sorted, y_node - TOL, side='right')
+        return (jj < n_target) & (y_sorted[np.minimum(jj, max(n_target - 1, 0))] < y_node + TOL) if n_target else \
+            np.zeros(len(y_node), dtype=bool)
+
+    profiles = np.nonzero(has_data)[0]
+    add_first = profiles[~_matched(y[first[profiles]])]
+    add_last = profiles[~_matched(y[last[profiles]]) & (last[profiles] > first[profiles])]
+    i_add = np.concatenate([first[add_first], last[add_last]])
+
+    g_out = np.concatenate([g_t, g[i_add]])
+    y_out = np.concatenate([y_t, y[i_add]])
+    x_out = np.concatenate([x_t, x[i_add]])
+    w_out = np.concatenate([w_t, np.zeros(len(i_add))])
+    order = np.lexsort((y_out, g_out))
+    return g_out[order], y_out[order], x_out[order], w_out[order]
+
+
 def is_continuous(profile):
     if ('y_low' in profile and profile.y_low.isnull().all() and not profile.y_low.empty):
         return 1
@@ -0,0 +1,245 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.query.py : lazy selection over Profile and CoreStack
+
+A StackQuery records variable, core and row criteria and column projections without touching the data. Criteria are
+combined in a single boolean row mask and the selection is materialized once, by execute(), with a single indexing
+operation; if no row or column is removed the result shares the data of the source stack.
+
+USAGE:
+    q = ics_stack.query().variables(['salinity', 'temperature']).cores(names).where(date=slice('2017-01-01', None))
+    n_rows = q.count()
+    ic_stack = q.execute()
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "query.py contains a lazy query builder to select data in Profile and CoreStack"
+
+__all__ = ["StackQuery"]
+
+import copy
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pysic.core.profile import essential_property, subvariable_dict
+
+
+def _variable_columns(variable):
+    """
+    :return: list of string, columns holding the data of the variable
+    """
+    return [variable, 'w_' + variable] + subvariable_dict.get(variable, [])
+
+
+class StackQuery():
+    """
+    Lazy query over a Profile or a CoreStack. Each method returns a new query, the source query is not modified.
+    """
+
+    def __init__(self, stack):
+        """
+        :param stack: Profile or CoreStack
+        """
+        self.logger = logging.getLogger(__name__)
+        self._stack = stack
+        self._variables = None
+        self._cores = None
+        self._criteria = []
+        self._columns = None
+        self._sort = None
+
+    def _copy(self):
+        query = copy.copy(self)
+        query._criteria = list(self._criteria)
+        return query
+
+    def variables(self, variables):
+        """
+        Select the profiles of the variables. Columns of other variables are dropped and variable groups are restricted
+        to the selected variables. A subvariable (e.g. 'conductivity measurement temperature') selects its variable
+        (e.g. 'conductivity'), as subvariables are not part of the variable groups.
+
+        :param variables: string or list of string
+        :return: StackQuery
+        """
+        from pysic import inverse_dict
+
+        if not isinstance(variables, (list, tuple, set)):
+            variables = [variables]
+        parents = inverse_dict(subvariable_dict)
+        variables = list(pd.unique([parents.get(variable, variable) for variable in variables]))
+        query = self._copy()
+        if query._variables is None:
+            query._variables = list(variables)
+        else:
+            query._variables = [variable for variable in query._variables if variable in variables]
+        return query
+
+    def cores(self, names):
+        """
+        :param names: string or list of string, core names
+        :return: StackQuery
+        """
+        if isinstance(names, str):
+            names = [names]
+        query = self._copy()
+        if query._cores is None:
+            query._cores = set(names)
+        else:
+            query._cores = query._cores & set(names)
+        return query
+
+    def where(self, **criteria):
+        """
+        Select rows by column value. For each column:
+            - a scalar selects the rows equal to the value,
+            - a list, tuple or set selects the rows with value in the list,
+            - a slice selects the rows within [start, stop], start or stop may be None,
+            - a function f(column) returning a boolean array selects the rows where it is True.
+
+        :return: StackQuery
+        """
+        query = self._copy()
+        query._criteria.extend(criteria.items())
+        return query
+
+    def columns(self, columns):
+        """
+        Restrict the columns to the essential properties and the given columns
+
+        :param columns: list of string
+        :return: StackQuery
+        """
+        query = self._copy()
+        query._columns = list(columns)
+        return query
+
+    def sort(self, by='y_mid'):
+        """
+        :param by: string or list of string, sorting columns
+        :return: StackQuery
+        """
+        query = self._copy()
+        query._sort = by
+        return query
+
+    def _mask(self):
+        """
+        :return: boolean array, rows selected by all criteria, or None if all rows are selected
+        """
+        stack = self._stack
+        mask = None
+
+        def _and(mask, new_mask):
+            new_mask = np.asarray(new_mask, dtype=bool)
+            return new_mask if mask is None else mask & new_mask
+
+        if self._cores is not None:
+            mask = _and(mask, stack['name'].isin(self._cores).values)
+        if self._variables is not None:
+            groups = [group for group in stack['variable'].dropna().unique()
+                      if any(variable in group.split(', ') for variable in self._variables)]
+            mask = _and(mask, stack['variable'].isin(groups).values)
+        for key, value in self._criteria:
+            if key not in stack.columns:
+                self.logger.warning('%s not in stack, criterion ignored', key)
+                continue
+            column = stack[key]
+            if callable(value):
+                mask = _and(mask, value(column))
+            elif isinstance(value, slice):
+                new_mask = np.ones(len(stack), dtype=bool)
+                if value.start is not None:
+                    new_mask &= (column >= value.start).values
+                if value.stop is not None:
+                    new_mask &= (column <= value.stop).values
+                mask = _and(mask, new_mask)
+            elif isinstance(value, (list, tuple, set, np.ndarray)):
+                mask = _and(mask, column.isin(list(value)).values)
+            else:
+                mask = _and(mask, (column == value).values)
+        return mask
+
+    def _projection(self):
+        """
+        :return: list of string, selected columns, or None if all columns are selected
+        """
+        stack = self._stack
+        if self._variables is None and self._columns is None:
+            return None
+
+        columns = list(stack.columns)
+        if self._variables is not None:
+            stack_variables = set(variable for group in stack['variable'].dropna().unique()
+                                  for variable in group.split(', '))
+            keep = set(column for variable in self._variables for column in _variable_columns(variable))
+            drop = set(column for variable in stack_variables if variable not in self._variables
+                       for column in _variable_columns(variable)) - keep
+            columns = [column for column in columns if column not in drop]
+        if self._columns is not None:
+            columns = [column for column in columns if column in essential_property or column in self._columns]
+        return columns
+
+    def count(self):
+        """
+        :return: int, number of rows selected, without materializing the selection
+        """
+        mask = self._mask()
+        return len(self._stack) if mask is None else int(mask.sum())
+
+    def names(self):
+        """
+        :return: list of string, names of the cores selected, without materializing the selection
+        """
+        mask = self._mask()
+        names = self._stack['name'].values if mask is None else self._stack['name'].values[mask]
+        return pd.unique(names).tolist()
+
+    def execute(self):
+        """
+        Materialize the selection
+
+        :return: Profile or CoreStack, same class as the source stack
+        """
+        stack = self._stack
+        mask = self._mask()
+        columns = self._projection()
+
+        if mask is None and columns is None:
+            # no copy
+            data = stack
+        elif mask is None:
+            data = stack[columns]
+        elif columns is None:
+            data = stack[mask]
+        else:
+            data = stack.loc[mask, columns]
+
+        if self._variables is not None and not data.empty:
+            # restrict variable groups to the selected variables
+            groups = {group: ', '.join(variable for variable in group.split(', ') if variable in self._variables)
+                      for group in data['variable'].dropna().unique()}
+            if any(group != new_group for group, new_group in groups.items()):
+                if data is stack:
+                    data = data.copy()
+                data['variable'] = data['variable'].map(groups)
+
+        if self._sort is not None:
+            data = data.sort_values(by=self._sort)
+        return type(stack)(data)
+
+    def __repr__(self):
+        return 'StackQuery(variables=%s, cores=%s, where=%s, columns=%s, sort=%s)' % \
+               (self._variables, None if self._cores is None else sorted(self._cores),
+                [key for key, _ in self._criteria], self._columns, self._sort)
+
@@ -0,0 +1,257 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.core.tabular.py : import of ice core data from CSV/TSV tables
+
+A table holds the sections of many cores, one row per section (or measurement point) and one column per variable, in
+the layout of a CoreStack: core name, y_low, y_mid, y_sup, the variables (salinity, temperature, ...), and optionally
+comment, variable, length, v_ref and the core metadata (date, origin, lat, lon, ice_thickness, freeboard, snow_depth,
+collection, ...). Headers are matched without case; the MOSAiC headers 'depth 1', 'depth 2' and 'depth center' are
+recognized, other headers are renamed with columns.
+
+The table is parsed in a single pass by the pandas C parser (or pyarrow), typed column by column and split by core, so
+that cores are built in bulk. Profiles follow the schema of read_profile: numeric variables, comment, variable, length,
+v_ref and name. Without a variable column, the variable group of a row is made of the variables measured in the core on
+the same kind of profile (step profiles with y_low and y_sup, continuous profiles otherwise), as for the spreadsheet
+sheets.
+
+USAGE:
+    ics_stack = pysic.core.tabular.read_table('ice_cores.csv', columns={'Core ID': 'name'})
+    ic_dict = pysic.core.tabular.import_ic_table('ice_cores.tsv', variables=['salinity', 'temperature'])
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "tabular.py contains function to import ice core data from CSV/TSV tables"
+
+__all__ = ["read_table", "import_ic_table"]
+
+import datetime
+import importlib.util
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import pysic
+from pysic.core.profile import subvariable_dict
+from pysic.tools import instrument
+
+## Default values:
+sep = None  # from the file extension: tab for .tsv, .tab and .txt, comma otherwise
+engine = 'c'  # pandas parser, 'pyarrow' if installed
+v_ref = 'top'
+drop_empty = False
+
+# header: column
+column_aliases = {'core': 'name', 'core name': 'name', 'core_name': 'name', 'core id': 'name',
+                  'depth 1': 'y_low', 'depth 2': 'y_sup', 'depth center': 'y_mid',
+                  'comments': 'comment', 'latitude': 'lat', 'longitude': 'lon'}
+depth_columns = ['y_low', 'y_mid', 'y_sup']
+profile_columns = ['comment', 'variable', 'length', 'v_ref', 'name']
+# core attributes (see pysic.Core), one value per core
+core_columns = ['date', 'origin', 'lat', 'lon', 'ice_thickness', 'freeboard', 'snow_depth', 'collection', 'protocol',
+                't_air', 't_snow_surface', 't_ice_surface', 't_water']
+_string_columns = ['comment', 'variable', 'v_ref', 'name', 'origin', 'collection', 'protocol']
+
+
+def _sep(path, sep):
+    if sep is not None:
+        return sep
+    if os.path.splitext(path)[1].lower() in ['.tsv', '.tab', '.txt']:
+        return '\t'
+    return ','
+
+
+def _strings(series):
+    """
+    :return: pd.Series of object, string values, None if missing
+    """
+    return series.astype(str).where(series.notnull(), None)
+
+
+def _variable_groups(table, properties, codes):
+    """
+    Variable group of each row: the variables measured in the core on the same kind of profile (step or continuous)
+
+    :return: np.array of object
+    """
+    from pysic.core import inverse_dict
+
+    group_properties = [prop for prop in properties if prop not in inverse_dict(subvariable_dict)]
+    step = (table['y_low'].notnull() & table['y_sup'].notnull()).values
+    keys = codes * 2 + step
+    measured = table[group_properties].notnull().groupby(keys).any()
+    groups = {key: ', '.join(prop for prop, flag in zip(group_properties, row) if flag)
+              for key, row in zip(measured.index, measured.values)}
+    return np.array([groups[key] for key in keys], dtype=object)
+
+
+@instrument.timed('read_table')
+def read_table(path, sep=sep, columns=None, variables=None, v_ref=v_ref, engine=engine, **kwargs):
+    """
+    Read a CSV/TSV table of ice core sections
+
+    :param path: string, path to the table
+    :param sep: string, optional. Column separator, default from the file extension
+    :param columns: dict, optional. {header: column}, headers to rename, e.g. {'Core ID': 'name', 'S': 'salinity'}
+    :param variables: list of string, optional. Variables to import, default all the variables
+    :param v_ref: 'top' or 'bottom', vertical reference of the rows without v_ref
+    :param engine: string, pandas parser, 'c' or 'pyarrow'
+    :param kwargs: keyword arguments of pandas.read_csv
+    :return: CoreStack, one row per section, rows grouped by core in the order of the table
+    """
+    from pysic.core.corestack import CoreStack
+
+    logger = logging.getLogger(__name__)
+
+    if engine == 'pyarrow' and importlib.util.find_spec('pyarrow') is None:
+        logger.info('pyarrow is not installed, %s read with the C parser', path)
+        engine = 'c'
+    table = pd.read_csv(path, sep=_sep(path, sep), engine=engine, **kwargs)
+
+    # headers
+    table.columns = [str(header).strip() for header in table.columns]
+    renames = {header: column_aliases[header.lower()] for header in table.columns if header.lower() in column_aliases}
+    if columns is not None:
+        renames.update(columns)
+    table = table.rename(columns=renames)
+    table = table.loc[:, ~table.columns.duplicated()]
+    if 'name' not in table.columns:
+        raise ValueError('%s has no core name column, rename it to name with columns' % path)
+
+    # rows without core name or depth are discarded
+    keep = table['name'].notnull().values
+    for key in depth_columns:
+        if key in table.columns:
+            table[key] = pd.to_numeric(table[key], errors='coerce')
+        else:
+            table[key] = np.nan
+    keep &= table[depth_columns].notnull().any(axis=1).values
+    if not keep.all():
+        logger.info('(%s) %d rows without core name or depth discarded', path, (~keep).sum())
+        table = table[keep]
+    y_mid = (table['y_low'] + table['y_sup']) / 2
+    table['y_mid'] = table['y_mid'].where(table['y_mid'].notnull(), y_mid)
+
+    # rows grouped by core
+    table['name'] = _strings(table['name'])
+    codes, names = pd.factorize(table['name'])
+    order = np.argsort(codes, kind='stable')
+    table = table.iloc[order].reset_index(drop=True)
+    codes = codes[order]
+
+    # variables
+    properties = [header for header in table.columns if header not in depth_columns + profile_columns + core_columns]
+    if variables is not None:
+        if not isinstance(variables, list):
+            variables = [variables]
+        keep = variables + [subvariable for variable in variables for subvariable in subvariable_dict.get(variable, [])]
+        table = table.drop(columns=[prop for prop in properties if prop not in keep])
+        properties = [prop for prop in properties if prop in keep]
+        if 'variable' in table.columns:
+            table['variable'] = table['variable'].map(
+                lambda group: ', '.join(v for v in str(group).split(', ') if v in keep), na_action='ignore')
+    if properties:
+        table[properties] = table[properties].apply(pd.to_numeric, errors='coerce')
+
+    if 'variable' not in table.columns:
+        table['variable'] = _variable_groups(table, properties, codes)
+    # rows of variable groups without variable to import
+    table = table[(table['variable'] != '').values].reset_index(drop=True)
+    if 'comment' not in table.columns:
+        table['comment'] = None
+    table['length'] = pd.to_numeric(table['length'], errors='coerce') if 'length' in table.columns else np.nan
+    if 'v_ref' in table.columns:
+        table['v_ref'] = table['v_ref'].where(table['v_ref'].notnull(), v_ref)
+    else:
+        table['v_ref'] = v_ref
+    for key in _string_columns:
+        if key in table.columns:
+            table[key] = _strings(table[key])
+    if 'date' in table.columns:
+        try:
+            date = pd.to_datetime(table['date'], errors='coerce')
+        except (ValueError, TypeError):
+            date = table['date']
+        if date.dtype == object:
+            # naive and time zone aware dates, or different time zones: naive dates are taken as UTC
+            date = pd.to_datetime(table['date'], errors='coerce', utc=True)
+        table['date'] = date
+    for key in ['lat', 'lon', 'ice_thickness', 'freeboard', 'snow_depth', 't_air', 't_snow_surface', 't_ice_surface',
+                't_water']:
+        if key in table.columns:
+            table[key] = pd.to_numeric(table[key], errors='coerce')
+
+    instrument.count('rows', len(table))
+    instrument.count('cores', len(names))
+    header = depth_columns + properties + profile_columns
+    return CoreStack(table[header + [key for key in core_columns if key in table.columns]])
+
+
+@instrument.timed('import_ic_table')
+def import_ic_table(path, variables=None, v_ref=v_ref, drop_empty=drop_empty, sep=sep, columns=None, engine=engine,
+                    **kwargs):
+    """
+    Import the cores of a CSV/TSV table
+
+    :param path: string, path to the table
+    :param variables: list of string, optional. Variables to import, default all the variables
+    :param v_ref: 'top' or 'bottom', vertical reference of the rows without v_ref
+    :param drop_empty: boolean, drop the variables without data from the core profiles
+    :param sep: string, optional. Column separator, default from the file extension
+    :param columns: dict, optional. {header: column}, headers to rename
+    :param engine: string, pandas parser, 'c' or 'pyarrow'
+    :return: dict, {core name: pysic.Core}
+    """
+    from pysic.core.profile import Profile
+
+    logger = logging.getLogger(__name__)
+
+    table = read_table(path, sep=sep, columns=columns, variables=variables, v_ref=v_ref, engine=engine, **kwargs)
+    codes, names = pd.factorize(table['name'])
+    bounds = np.searchsorted(codes, np.arange(len(names) + 1))
+
+    properties = [header for header in table.columns
+                  if header not in depth_columns + profile_columns + core_columns]
+    # core metadata and variables measured, per core
+    metadata = table[[key for key in core_columns if key in table.columns]].groupby(codes).first()
+    metadata = metadata.reindex(range(len(names)))
+    measured = table[properties].notnull().groupby(codes).any().reindex(range(len(names)), fill_value=False)
+
+    ic_dict = {}
+    for i_core, name in enumerate(names):
+        meta = metadata.iloc[i_core]
+        date = meta.get('date')
+        date = pd.Timestamp(date).to_pydatetime() if isinstance(date, datetime.datetime) and not pd.isnull(date) \
+            else None
+        core = pysic.Core(name, date, meta.get('origin', np.nan), meta.get('lat', np.nan), meta.get('lon', np.nan),
+                          np.array([meta.get('ice_thickness', np.nan)], dtype=float),
+                          np.array([meta.get('freeboard', np.nan)], dtype=float),
+                          np.array([meta.get('snow_depth', np.nan)], dtype=float))
+        if isinstance(meta.get('collection'), str):
+            core.add_to_collection(meta['collection'].split(', '))
+        core.protocol = meta['protocol'] if isinstance(meta.get('protocol'), str) else 'N/A'
+        for key in ['t_air', 't_snow_surface', 't_ice_surface', 't_water']:
+            if key in meta.index and not np.isnan(meta[key]):
+                setattr(core, key, meta[key])
+
+        header = depth_columns + [prop for prop, flag in zip(properties, measured.values[i_core]) if flag] + \
+            profile_columns
+        profile = Profile(table.iloc[bounds[i_core]:bounds[i_core + 1]][header].reset_index(drop=True))
+        if drop_empty:
+            profile.drop_empty_property()
+        if not profile.get_property():
+            logger.warning("%s have no properties profile", name)
+            continue
+        core.add_profile(profile)
+        ic_dict[name] = core
+    logger.info('%d cores imported from %s', len(ic_dict), path)
+    return ic_dict
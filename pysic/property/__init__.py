@@ -4,13 +4,13 @@
     TODO: fill up
 """
 
+import importlib
 import logging
 
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
-import pysic.core.plot
+import pysic
+from pysic.tools import instrument
 
 __author__ = "Marc Oggier"
 __license__ = "GPL"
@@ -23,7 +23,10 @@ __date__ = "2017/09/13"
 __credits__ = ["Hajo Eicken", "Andy Mahoney", "Josh Jones"]
 __name__ = "property"
 
-__all__ = ["compute_phys_prop_from_core", "scale_profile"]
+__all__ = ["compute_phys_prop_from_core", "compute_phys_prop_from_stack", "pair_cores", "scale_profile"]
+
+# property submodules are imported on first attribute access (see __getattr__)
+_submodules = ['brine', 'brine_nacl', 'chunked', 'ice', 'nacl_ice', 'precision', 'si', 'sw', 'workspace']
 
 state_variable = {'temperature': 'temperature', 'temp': 'temperature', 't': 'temperature',
                   'salinity': 'salinity', 's': 'salinity'}
@@ -44,6 +47,9 @@ prop_latex = {'salinity': 'S',
               'pysic permeability': '\kappa'
               }
 
+## Default values:
+pair_variables = ['salinity', 'temperature']
+
 
 def scale_profile(profile, h_ice_f):
     """
@@ -73,6 +79,7 @@ def scale_profile(profile, h_ice_f):
 
 
 # TODO: add kwarg in arguments
+@instrument.timed('compute_phys_prop')
 def compute_phys_prop_from_core(s_profile, t_profile, si_prop, resize_core=False,
                                 display_figure=True, ice_type='sw'):
     """
@@ -87,6 +94,7 @@ def compute_phys_prop_from_core(s_profile, t_profile, si_prop, resize_core=False
     :param ice_type:
     :return:
     """
+    import pandas as pd
 
     if not isinstance(si_prop, list):
         si_prop = [si_prop]
@@ -202,6 +210,7 @@ def compute_phys_prop_from_core(s_profile, t_profile, si_prop, resize_core=False
         s_profile['variable'] = ', '.join(new_var)
 
         if display_figure:
+            import matplotlib.pyplot as plt
             ax = pysic.core.plot.plot_profile_variable(s_profile.copy(), variable_dict={'variable': prop},
                                                         ax=None, param_dict=None)
             ax.set_xlabel(prop)
@@ -212,6 +221,7 @@ def compute_phys_prop_from_core(s_profile, t_profile, si_prop, resize_core=False
     return s_profile
 
 
+@instrument.timed('compute_phys_prop')
 def compute_phys_prop_from_core_STrho(s_profile, t_profile, d_profile, si_prop, resize_core=False,
                                       display_figure=True, ice_type='sw'):
     """
@@ -227,6 +237,7 @@ def compute_phys_prop_from_core_STrho(s_profile, t_profile, d_profile, si_prop,
     :param ice_type:
     :return:
     """
+    import pandas as pd
 
     if not isinstance(si_prop, list):
         si_prop = [si_prop]
@@ -360,6 +371,7 @@ def compute_phys_prop_from_core_STrho(s_profile, t_profile, d_profile, si_prop,
         s_profile['variable'] = ', '.join(new_var)
 
         if display_figure:
+            import matplotlib.pyplot as plt
             ax = pysic.core.plot.plot_profile_variable(s_profile.copy(), variable_dict={'variable': prop},
                                                         ax=None, param_dict=None)
             ax.set_xlabel(prop)
@@ -370,6 +382,7 @@ def compute_phys_prop_from_core_STrho(s_profile, t_profile, d_profile, si_prop,
     return s_profile
 
 
+@instrument.timed('compute_phys_prop_from_core_name')
 def compute_phys_prop_from_core_name(ics_stack, S_core_name, T_core_name, si_prop, si_prop_format='step',
                                      resize_core=None, attribut_core='S', inplace=True, display_figure=False):
     """
@@ -383,6 +396,7 @@ def compute_phys_prop_from_core_name(ics_stack, S_core_name, T_core_name, si_pro
     :param inplace:
     :return:
     """
+    import pandas as pd
 
     # check parameters
     if S_core_name not in ics_stack.name.unique():
@@ -416,3 +430,281 @@ def compute_phys_prop_from_core_name(ics_stack, S_core_name, T_core_name, si_pro
     else:
         return prop_profile
 
+
+def _property_function(f_prop, ice_type='sw'):
+    """
+    :param f_prop: string, property name or alias in prop_list
+    :param ice_type: 'sw' or 'nacl'
+    :return: function, property function f(s, t) or f(s, t, rho)
+    """
+    prop = prop_list[f_prop]
+    if ice_type == 'nacl':
+        module = pysic.property.nacl_ice
+    else:
+        module = pysic.property.si
+    return getattr(module, prop.replace(" ", "_"))
+
+
+def _variable_rows(ics_stack, variable):
+    """
+    :return: boolean array, True for the rows of the variable groups containing variable
+    """
+    groups = [vg for vg in ics_stack.variable.dropna().unique() if variable in vg.split(', ')]
+    return ics_stack.variable.isin(groups).values
+
+
+def _grouped_interp(g, x, g_p, x_p, f_p):
+    """
+    Linear interpolation of several profiles at once. Profiles are concatenated along a single axis by offsetting the
+    depth of each profile by its index, so that all points are interpolated in a single call to numpy.interp.
+
+    :param g: array of int, profile index of the points to interpolate
+    :param x: array, depth of the points to interpolate
+    :param g_p: array of int, profile index of the data points
+    :param x_p: array, depth of the data points
+    :param f_p: array, value of the data points
+    :return: array, interpolated values; nan outside the depth range of the profile or if the profile has no data
+    """
+    g = np.asarray(g)
+    x = np.asarray(x, dtype=float)
+    f = np.full(x.shape, np.nan)
+
+    valid = ~np.isnan(x_p) & ~np.isnan(f_p)
+    g_p, x_p, f_p = np.asarray(g_p)[valid], np.asarray(x_p, dtype=float)[valid], np.asarray(f_p, dtype=float)[valid]
+    if not x_p.size or not x.size:
+        return f
+    order = np.lexsort((x_p, g_p))
+    g_p, x_p, f_p = g_p[order], x_p[order], f_p[order]
+
+    # first and last data point of the profile of each point
+    first = np.searchsorted(g_p, g, side='left')
+    last = np.searchsorted(g_p, g, side='right') - 1
+    inside = (last >= first) & (x >= x_p[np.minimum(first, x_p.size - 1)]) & (x <= x_p[np.maximum(last, 0)])
+
+    x0 = min(np.nanmin(x), x_p.min())
+    span = max(np.nanmax(x), x_p.max()) - x0 + 1
+    f[inside] = np.interp(g[inside] * span + (x[inside] - x0), g_p * span + (x_p - x0), f_p)
+    return f
+
+
+def _grouped_section_mean(g, y_low, y_sup, g_p, y_low_p, y_sup_p, f_p):
+    """
+    Mean of several step profiles over sections, weighted by the overlap length. The cumulative integral of each
+    step profile is interpolated at the section boundaries.
+
+    :param g: array of int, profile index of the sections
+    :param y_low, y_sup: array, section boundaries
+    :param g_p: array of int, profile index of the step profile sections
+    :param y_low_p, y_sup_p: array, step profile section boundaries
+    :param f_p: array, step profile values
+    :return: array, mean value over each section; nan if the section does not overlap the profile
+    """
+    valid = ~np.isnan(y_low_p) & ~np.isnan(y_sup_p) & ~np.isnan(f_p)
+    g_p, y_low_p, y_sup_p, f_p = g_p[valid], y_low_p[valid], y_sup_p[valid], f_p[valid]
+    if not f_p.size:
+        return np.full(len(g), np.nan)
+    order = np.lexsort((y_low_p, g_p))
+    g_p, y_low_p, y_sup_p, f_p = g_p[order], y_low_p[order], y_sup_p[order], f_p[order]
+
+    # cumulative integral and covered length at the section boundaries, restarting for each profile
+    length = y_sup_p - y_low_p
+    c_int = np.cumsum(f_p * length)
+    c_len = np.cumsum(length)
+    start = np.searchsorted(g_p, g_p, side='left')
+    offset_int = np.concatenate([[0], c_int])[start]
+    offset_len = np.concatenate([[0], c_len])[start]
+    x_n = np.column_stack([y_low_p, y_sup_p]).ravel()
+    g_n = np.repeat(g_p, 2)
+    int_n = np.column_stack([c_int - f_p * length - offset_int, c_int - offset_int]).ravel()
+    len_n = np.column_stack([c_len - length - offset_len, c_len - offset_len]).ravel()
+
+    # section boundaries outside the profile are clipped to the profile extremities
+    first = np.searchsorted(g_p, g, side='left')
+    last = np.searchsorted(g_p, g, side='right') - 1
+    has_profile = last >= first
+    y_min = np.where(has_profile, y_low_p[np.minimum(first, f_p.size - 1)], np.nan)
+    y_max = np.where(has_profile, y_sup_p[np.maximum(last, 0)], np.nan)
+    y_low = np.clip(y_low, y_min, y_max)
+    y_sup = np.clip(y_sup, y_min, y_max)
+
+    d_int = _grouped_interp(g, y_sup, g_n, x_n, int_n) - _grouped_interp(g, y_low, g_n, x_n, int_n)
+    d_len = _grouped_interp(g, y_sup, g_n, x_n, len_n) - _grouped_interp(g, y_low, g_n, x_n, len_n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(d_len > 0, d_int / d_len, np.nan)
+
+
+def pair_cores(ics_stack, variables=pair_variables):
+    """
+    Pair the cores of a stack using collection membership. Each core with data for the first variable (salinity) is
+    paired with a core of its collection with data for each of the other variables (temperature, density). The core
+    itself is chosen first, then the other cores of the collection in alphabetical order.
+
+    :param ics_stack: CoreStack
+    :param variables: list of string, default ['salinity', 'temperature']
+    :return: pd.DataFrame, one row per pair with one column per variable containing the name of the core providing
+        the variable
+    """
+    import pandas as pd
+
+    logger = logging.getLogger(__name__)
+
+    cores = {}
+    for variable in variables:
+        rows = _variable_rows(ics_stack, variable)
+        if variable in ics_stack:
+            rows &= pd.to_numeric(ics_stack[variable], errors='coerce').notnull().values
+        cores[variable] = set(ics_stack.name.values[rows])
+
+    collections = ics_stack.drop_duplicates(subset='name').set_index('name')['collection'].to_dict()
+
+    pairs = []
+    for name in sorted(cores[variables[0]]):
+        collection = collections.get(name)
+        if not isinstance(collection, str):
+            collection = ''
+        members = [name] + sorted(set(c for c in collection.split(', ') if c and c != name))
+        pair = [name]
+        for variable in variables[1:]:
+            pair.append(next((member for member in members if member in cores[variable]), None))
+        if None in pair:
+            logger.warning('%s: no %s core in collection', name,
+                           ', '.join(v for v, n in zip(variables, pair) if n is None))
+            continue
+        pairs.append(pair)
+    return pd.DataFrame(pairs, columns=variables)
+
+
+@instrument.timed('compute_phys_prop_from_stack')
+def compute_phys_prop_from_stack(ics_stack, si_prop, ice_type='sw', density=False, pairs=None, inplace=True):
+    """
+    Compute physical properties for all the salinity cores of a stack at once. Salinity cores are paired with
+    temperature (and density) cores using collection membership (see pair_cores), temperature profiles are
+    interpolated at the middle of the salinity sections, density profiles are averaged over the salinity sections,
+    and each property function is evaluated once over the whole stack.
+
+    :param ics_stack: CoreStack
+    :param si_prop: string or list of string, properties in prop_list
+    :param ice_type: 'sw' (default) or 'nacl'
+    :param density: boolean, default False. If True, density is passed to the property functions, as in
+        compute_phys_prop_from_core_STrho
+    :param pairs: pd.DataFrame, optional, core pairs as returned by pair_cores. Default pairs are computed from the
+        collections
+    :param inplace: boolean, default True. If True, the property profiles are appended to the stack, replacing
+        previously computed ones, and the stack is returned. If False, only the property profiles are returned.
+    :return: CoreStack
+    """
+    import pandas as pd
+
+    logger = logging.getLogger(__name__)
+
+    if not isinstance(si_prop, list):
+        si_prop = [si_prop]
+    for f_prop in si_prop:
+        if f_prop not in prop_list.keys():
+            logger.error('property %s not defined in the ice core property module', f_prop)
+            return pysic.core.corestack.CoreStack(ics_stack) if inplace else pysic.core.corestack.CoreStack()
+
+    variables = pair_variables + ['density'] if density else pair_variables
+    new_variable = ', '.join(variables + si_prop)
+
+    # previously computed property profiles are not used as input
+    source = ics_stack
+    if 't_name' in source:
+        source = source[source.t_name.isnull()]
+
+    if pairs is None:
+        pairs = pair_cores(source, variables)
+    pairs = pairs.reset_index(drop=True)
+    instrument.annotate(pairs=len(pairs))
+    if pairs.empty:
+        logger.warning('no salinity core could be paired')
+        return pysic.core.corestack.CoreStack(ics_stack) if inplace else pysic.core.corestack.CoreStack()
+
+    def _rows(variable, names):
+        # rows of the variable for each pair, a core used in several pairs is repeated
+        data = source[_variable_rows(source, variable) & source.name.isin(names).values]
+        data = data.merge(pd.DataFrame({'name': pairs[variable], '_pair': pairs.index}), on='name')
+        data[variable] = pd.to_numeric(data[variable], errors='coerce')
+        return data
+
+    # salinity sections, one profile per pair
+    s_rows = _rows('salinity', pairs['salinity'])
+    s_rows = s_rows[s_rows.salinity.notnull()]
+    s_rows = s_rows[[key for key in s_rows.keys() if key in pysic.core.corestack.essential_property +
+                     ['_pair', 'salinity']]]
+    s_rows = s_rows.sort_values(['_pair', 'y_mid']).reset_index(drop=True)
+    y_mid = s_rows.y_mid.astype(float).values
+    y_mid = np.where(np.isnan(y_mid), (s_rows.y_low.astype(float).values + s_rows.y_sup.astype(float).values) / 2,
+                     y_mid)
+    g = s_rows['_pair'].values
+
+    # vertical reference and ice thickness of the salinity cores, to orient the other profiles
+    s_core = s_rows.drop_duplicates('_pair').set_index('_pair')
+    s_v_ref = s_core.v_ref.reindex(pairs.index).values
+    s_hi = s_core.ice_thickness.astype(float).reindex(pairs.index).values
+    if 'length' in s_core:
+        s_hi = np.where(np.isnan(s_hi), s_core.length.astype(float).reindex(pairs.index).values, s_hi)
+
+    def _orient(data, *y_keys):
+        # express depth in the vertical reference of the salinity core
+        p = data['_pair'].values
+        flip = data.v_ref.values != s_v_ref[p]
+        if np.isnan(s_hi[p[flip]]).any():
+            logger.error('%s have no ice thickness; impossible to correct direction',
+                         ', '.join(data.name.values[flip & np.isnan(s_hi[p])].astype(str)))
+        ys = [data[key].astype(float).values for key in y_keys]
+        ys = [np.where(flip, s_hi[p] - y, y) for y in ys]
+        if len(ys) == 2:
+            # section boundaries are swapped when flipped
+            ys = [np.where(flip, ys[1], ys[0]), np.where(flip, ys[0], ys[1])]
+        return ys
+
+    # temperature interpolated at the middle of the salinity sections, in a single pass
+    t_rows = _rows('temperature', pairs['temperature'])
+    t_y, = _orient(t_rows, 'y_mid')
+    temperature = _grouped_interp(g, y_mid, t_rows['_pair'].values, t_y, t_rows.temperature.values)
+
+    prop_stack = s_rows.drop(columns=['_pair'])
+    prop_stack['temperature'] = temperature
+    prop_stack['t_name'] = pairs['temperature'].values[g]
+    args = [prop_stack.salinity.values, temperature]
+
+    if density:
+        # density averaged over the salinity sections
+        d_rows = _rows('density', pairs['density'])
+        d_low, d_sup = _orient(d_rows, 'y_low', 'y_sup')
+        rho = _grouped_section_mean(g, s_rows.y_low.astype(float).values, s_rows.y_sup.astype(float).values,
+                                    d_rows['_pair'].values, d_low, d_sup, d_rows.density.values)
+        prop_stack['density'] = rho
+        prop_stack['d_name'] = pairs['density'].values[g]
+        args.append(rho)
+
+    # each property is evaluated once over the whole stack
+    for f_prop in si_prop:
+        prop_stack[f_prop] = _property_function(f_prop, ice_type)(*args)
+
+    prop_stack['variable'] = new_variable
+    instrument.count('cores', len(pairs))
+    instrument.count('rows', len(prop_stack))
+
+    if not inplace:
+        return pysic.core.corestack.CoreStack(prop_stack)
+
+    # previously computed properties are replaced, the stack is appended once
+    ics_stack = ics_stack[~(ics_stack.name.isin(pairs['salinity']) & (ics_stack.variable == new_variable))]
+    return pysic.core.corestack.CoreStack(pd.concat([ics_stack, prop_stack], ignore_index=True, sort=False))
+
+
+def __getattr__(name):
+    """
+    Import property submodules lazily on first access (PEP 562)
+    :param name: string, attribute name
+    :return: module
+    """
+    if name in _submodules:
+        return importlib.import_module('pysic.property.' + name)
+    raise AttributeError("module 'pysic.property' has no attribute '%s'" % name)
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + _submodules)
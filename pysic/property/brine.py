@@ -8,6 +8,8 @@ import logging
 
 import numpy as np
 
+from pysic.property import precision, workspace
+
 __author__ = "Marc Oggier"
 __license__ = "GPL"
 
@@ -24,12 +26,16 @@ __all__ = ["density", "electric_conductivity", "salinity", "thermal_conductivity
 module_logger = logging.getLogger(__name__)
 
 
-def density(t, extend_t_0=False):
+def density(t, extend_t_0=False, out=None, work=None):
     """
         Calculates the density of the brine in [kg/m3]
 
         :param t : array_like, float
             Temperature [degree C]
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
 
         :return rho_b: ndarray
             The calculated density of the brine [kg/m3]
@@ -40,28 +46,36 @@ def density(t, extend_t_0=False):
                 samples during shipping and storage. J. Glaciol, 32(112)
             Zubov, N.N. (1945), L'dy Arktiki [Arctic ice]. Moscow, Izdatel'stvo Glavsevmorputi.
     """
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t)
-    if (t > 0).any():
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t_pos = np.greater(t, 0, out=work.mask('brine.density.t_pos', t.shape))
+    if t_pos.any():
         module_logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t[t > 0] = np.nan
+        t = workspace.masked(t, t_pos, np.nan, work, 'brine.density.t')
 
     # Physical constant
     a = [0.8, 1000]
 
-    s_b = salinity(t, extend_t_0=extend_t_0)
-    rho_b = (a[1] + a[0] * s_b)
+    rho_b = salinity(t, extend_t_0=extend_t_0, out=workspace.output(out, t.shape, dtype), work=work)
+    np.multiply(a[0], rho_b, out=rho_b)
+    np.add(a[1], rho_b, out=rho_b)
 
     return rho_b
 
 
-def thermal_conductivity(t):
+def thermal_conductivity(t, out=None, work=None):
     """
         Calculates thermal conductivity of brine/sea water [W/mK]
 
        :param t : array_like, float
             Temperature [degree C]
             If t is an array, s should be an array of the same length
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
 
         :return lambda_b: ndarray
             The calculated brine thermal conductivity in [W/mK]
@@ -75,23 +89,27 @@ def thermal_conductivity(t):
         ice, sea ice, and frost. In: Proceedings 3rd International symposium on Cold Regions Heat transfer, Fairbanks,
         AK, June 11-14, 1991. (Ed. by J. P. Zarling & s. L. Faussett), pp. 187-218, University of Alaska, Fairbanks
     """
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t)
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
 
-    if (t > 0).any():
+    t_pos = np.greater(t, 0, out=work.mask('brine.thermal_conductivity.t_pos', t.shape))
+    if t_pos.any():
         module_logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t[t > 0] = np.nan
+        t = workspace.masked(t, t_pos, np.nan, work, 'brine.thermal_conductivity.t')
 
     # Physical constant
     a = [0.00014, 0.030, 1.25]
     b = 0.4184
 
-    lambda_b = b * np.polyval(a, t)
+    lambda_b = workspace.polyval(a, t, workspace.output(out, t.shape, dtype))
+    np.multiply(b, lambda_b, out=lambda_b)
 
     return lambda_b
 
 
-def salinity(t, method='cw', extend_t_0=False):
+def salinity(t, method='cw', extend_t_0=False, out=None, work=None):
     """
     Calculates the salinity of the brine at a given temperature according to either Assur's model or Cox & Weeks equation.
 
@@ -100,6 +118,10 @@ def salinity(t, method='cw', extend_t_0=False):
     :param method : 'as', 'cw', Default 'cw'
         'cw' : calculate with the equation of Cox & Weeks (1983)
         'as' : calculate with Assur's model, valid if t => -23 [degree C]. If t < -23, 'cw' is used by default
+    :param out : ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work : pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
 
     :return s_b: ndarray
         The computed salinity of the brine [PsU]
@@ -110,16 +132,23 @@ def salinity(t, method='cw', extend_t_0=False):
             samples during shipping and storage. J. Glaciol, 32(112), 371–375 (Cox1983a, 10.1017/S0022143000008364)
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t)
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
 
-    if (t > 0).any():
+    t_pos = np.greater(t, 0, out=work.mask('brine.salinity.t_pos', t.shape))
+    if t_pos.any():
         module_logger.warning('For element with temperature T > 0°C: T = np.nan')
-        t[t > 0] = np.nan
+        t = workspace.masked(t, t_pos, np.nan, work, 'brine.salinity.t')
 
     if method == 'as':
-        if (t >= -23).all():
-            s_b = ((1 - 54.11 / t) ** (-1)) * 1000
+        if np.greater_equal(t, -23, out=work.mask('brine.salinity.valid', t.shape)).all():
+            s_b = workspace.output(out, t.shape, dtype)
+            np.divide(54.11, t, out=s_b)
+            np.subtract(1, s_b, out=s_b)
+            np.power(s_b, -1, out=s_b)
+            np.multiply(s_b, 1000, out=s_b)
         else:
             module_logger.warning('T must be superior to -23[°C]. Use Cox & Weeks equation instead')
             return 0
@@ -143,22 +172,24 @@ def salinity(t, method='cw', extend_t_0=False):
         else:
             b[2] = [-22.9, -2]
 
-        s_b = np.nan*np.ones_like(t)
-        for mm in range(0, 3):
-            p1 = [a[mm, 3], a[mm, 2], a[mm, 1], a[mm, 0]]
-            s_b[(b[mm, 0] <= t) & (t <= b[mm, 1])] = (np.polyval(p1, t[(b[mm, 0] <= t) & (t <= b[mm, 1])]))
+        p = [[a[mm, 3], a[mm, 2], a[mm, 1], a[mm, 0]] for mm in range(0, 3)]
+        s_b = workspace.piecewise_polyval(p, b, t, workspace.output(out, t.shape, dtype), work, 'brine.salinity')
     else:
         module_logger.warning("%s method unknown" % method)
         return 0
     return s_b
 
 
-def electric_conductivity(t):
+def electric_conductivity(t, out=None, work=None):
     """
         Calculates the electric conductivity of brine
 
         :param t : array_like, float
             Temperature in degree Celsius [°C]
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
 
         :return sigma: ndarray
             The conductivity of the brine in [S/m]
@@ -167,16 +198,24 @@ def electric_conductivity(t):
             Stogryn, A., Desargant, G.J., 1985. The dielectric properties of brine in sea ice at microwave frequencies.
                 IEEE Trans. Antennas Propagat. AP-33, 523–532.
     """
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t)
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
+
+    if work is None:
+        work = workspace.Workspace()
 
     # Physical constant
     a = [[0.08755, 0.5193], [0.1100, 1.0334]]
 
-    sigma_b = np.nan*np.ones_like(t)
+    sigma_b = workspace.output(out, t.shape, dtype)
+    sigma_b.fill(np.nan)
+    y = work.array('brine.electric_conductivity.y', t.shape, dtype)
+    mask = work.mask('brine.electric_conductivity.mask', t.shape)
 
-    sigma_b[-22.9 <= t] = np.exp(np.polyval(a[0], t[-22.9 <= t]))
-    sigma_b[t < -22.9] = np.exp(np.polyval(a[1], t[t < -22.9]))
+    np.exp(workspace.polyval(a[0], t, y), out=y)
+    np.copyto(sigma_b, y, where=np.less_equal(-22.9, t, out=mask))
+    np.exp(workspace.polyval(a[1], t, y), out=y)
+    np.copyto(sigma_b, y, where=np.less(t, -22.9, out=mask))
 
     return sigma_b
 
@@ -7,6 +7,8 @@ property/brine.py contains function to compute physical property relative to the
 import numpy as np
 import logging
 
+from pysic.property import workspace
+
 __author__ = "Marc Oggier"
 __license__ = "GPL"
 
@@ -23,6 +25,7 @@ __all__ = ["dynamic_viscosity"]
 module_logger = logging.getLogger(__name__)
 
 
+@workspace.series_output
 def dynamic_viscosity(s, t, override_t=False, override_s=False):
     """
     Returns the dynamic viscosity of NaCl solution as function of temperature and salinity (g/ kg)
@@ -55,11 +58,11 @@ def dynamic_viscosity(s, t, override_t=False, override_s=False):
         return 0
 
     if ((s <= 0).any() or (170 < s).any()) and not override_s:
-        s[(s <= 0) | (170 < s)] = np.nan
+        s = np.where((s <= 0) | (170 < s), np.nan, s)
         module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
     if ((t <= -21).any() or (10 <= t).any()) and not override_t:
-        t[(t <= -21) | (10 <= t)] = np.nan
+        t = np.where((t <= -21) | (10 <= t), np.nan, t)
         module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
     # Eq. A36: Viscosity of pure water
@@ -80,6 +83,7 @@ def dynamic_viscosity(s, t, override_t=False, override_s=False):
     return mu_b
 
 
+@workspace.series_output
 def dynamic_viscosity_liquidus(s, t, override_t=False, override_s=False):
     """
     Returns the dynamic viscosity of NaCl soluion at their freezing point
@@ -112,11 +116,11 @@ def dynamic_viscosity_liquidus(s, t, override_t=False, override_s=False):
         return 0
 
     if ((s <= 0).any() or (170 < s).any()) and not override_s:
-        s[(s <= 0) | (170 < s)] = np.nan
+        s = np.where((s <= 0) | (170 < s), np.nan, s)
         module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
     if ((t <= -21).any() or (0 <= t).any()) and not override_t:
-        t[(t <= -21) | (0 <= t)] = np.nan
+        t = np.where((t <= -21) | (0 <= t), np.nan, t)
         module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
     # Eq. A36: Viscosity of pure water
@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+property/chunked.py contains a chunked, thread-parallel evaluator of the property functions
+
+Property functions allocate several temporaries of the size of their inputs (masks, polynomial terms, ice and sea-ice
+density). On large gridded fields, evaluate() applies a property function block by block, so that the temporaries are
+limited to the size of a block, and evaluates the blocks on a pool of threads: NumPy releases the GIL within array
+operations. Results are written in a preallocated output, which may be a numpy.memmap. Inputs are read block by block
+and are not modified, even if the property function modifies its arguments.
+
+With executor='process', blocks are evaluated in a pool of worker processes instead: array inputs and the output are
+published once in shared memory (see pysic.tools.shared), and each task only sends the bounds of its block. This pays
+off for property functions dominated by small array operations, which hold the GIL.
+
+USAGE:
+    from pysic.property import chunked, si
+    s = np.load('salinity.npy', mmap_mode='r')
+    t = np.load('temperature.npy', mmap_mode='r')
+    vf_b = np.lib.format.open_memmap('vf_b.npy', mode='w+', dtype=s.dtype, shape=s.shape)
+    chunked.evaluate(si.brine_volume_fraction, s, t, out=vf_b, n_worker=8)
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "chunked.py evaluates property functions on large arrays in blocks on a thread or process pool"
+
+__all__ = ["evaluate"]
+
+import logging
+import os
+
+import numpy as np
+
+from pysic.property import precision
+from pysic.tools import instrument
+
+## Default values:
+chunk_size = 2 ** 16  # elements per block; with float64, 512 kB per input
+n_worker = None  # os.cpu_count()
+executor = 'thread'
+
+logger = logging.getLogger(__name__)
+
+
+def _flat(x, shape):
+    """
+    Flat view of an array input, without copy if x is contiguous; scalars and singletons are returned as is
+
+    :return: (flat array, True) or (x, False)
+    """
+    if np.ndim(x) == 0 or (isinstance(x, (list, np.ndarray)) and np.size(x) == 1):
+        return x, False
+    if np.shape(x) != shape:
+        raise ValueError('array inputs must have the same shape, %s != %s' % (np.shape(x), shape))
+    return np.reshape(x, -1), True
+
+
+def _evaluate_block(func, out_flat, args, bound, kwargs):
+    i0, i1 = bound
+    # each block gets its own copy: func may modify its arguments
+    block_args = [np.array(x[i0:i1]) if is_array else x for x, is_array in args]
+    result = func(*block_args, **kwargs)
+    if np.ndim(result) == 0:
+        raise ValueError('%s failed on elements %d to %d' % (getattr(func, '__name__', func), i0, i1))
+    out_flat[i0:i1] = result
+
+
+def _process_block(func, handle, args, bound, kwargs):
+    """
+    Evaluate a block in a worker process. handle holds the output followed by the array inputs; array inputs are
+    given in args by their position in handle.
+    """
+    from pysic.tools import shared
+    blocks, arrays = shared.attach_arrays(handle)
+    try:
+        args = [(arrays[x], True) if is_array else (x, False) for x, is_array in args]
+        _evaluate_block(shared.resolve(func), arrays[0], args, bound, kwargs)
+    finally:
+        del arrays, args
+        for shm in blocks:
+            shm.close()
+
+
+@instrument.timed('evaluate')
+def evaluate(func, *args, out=None, chunk_size=chunk_size, n_worker=n_worker, executor=executor, **kwargs):
+    """
+    Evaluate func(*args, **kwargs) block by block on a thread or process pool
+
+    :param func: property function, e.g. pysic.property.si.brine_volume_fraction
+    :param args: positional arguments of func. Arrays (numpy.ndarray, numpy.memmap or pandas.Series values) must have
+        the same shape and are split in blocks; scalars are passed unchanged to each block
+    :param out: array, optional. C-contiguous output of the shape of the array inputs. If None, an array of the working
+        dtype (see pysic.property.precision) is allocated.
+    :param chunk_size: int, number of elements per block
+    :param n_worker: int, number of threads or processes. Default os.cpu_count(); with 1 blocks are evaluated in the
+        current thread
+    :param executor: 'thread' (default) or 'process'. With 'process', func must be defined at module level and array
+        inputs and output are exchanged through shared memory
+    :param kwargs: keyword arguments of func, passed unchanged to each block
+    :return: out
+    """
+    if executor not in ['thread', 'process']:
+        raise ValueError("executor must be 'thread' or 'process'")
+    shape = next((np.shape(x) for x in args if np.size(x) > 1), None)
+    if shape is None:
+        raise ValueError('at least one array input is required')
+    args = [np.asarray(x) if hasattr(x, 'loc') else x for x in args]
+    args = [_flat(x, shape) for x in args]
+    size = int(np.prod(shape))
+
+    if out is None:
+        out = np.empty(shape, dtype=precision.working_dtype(*[x for x, _ in args]))
+    elif out.shape != shape:
+        raise ValueError('out must have the shape of the inputs, %s != %s' % (out.shape, shape))
+    elif not out.flags.c_contiguous:
+        raise ValueError('out must be C-contiguous')
+    out_flat = out.reshape(-1)
+
+    chunk_size = max(int(chunk_size), 1)
+    bounds = [(i0, min(i0 + chunk_size, size)) for i0 in range(0, size, chunk_size)]
+    instrument.count('chunks', len(bounds))
+
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    n_worker = max(1, min(n_worker, len(bounds)))
+    if n_worker == 1:
+        for bound in bounds:
+            _evaluate_block(func, out_flat, args, bound, kwargs)
+    elif executor == 'thread':
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=n_worker) as pool:
+            # list() raises the first exception of the blocks
+            list(pool.map(lambda bound: _evaluate_block(func, out_flat, args, bound, kwargs), bounds))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        from pysic.tools import shared
+
+        arrays = [x for x, is_array in args if is_array]
+        positions = iter(range(1, len(arrays) + 1))
+        args = [(next(positions), True) if is_array else (x, False) for x, is_array in args]
+        with shared.SharedArrays([out_flat] + arrays) as shared_arrays:
+            with ProcessPoolExecutor(max_workers=n_worker) as pool:
+                futures = [pool.submit(_process_block, shared.reference(func), shared_arrays.handle, args, bound,
+                                       kwargs) for bound in bounds]
+                for future in futures:
+                    future.result()
+            out_flat[:] = shared_arrays.arrays[0]
+    return out
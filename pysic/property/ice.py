@@ -6,6 +6,8 @@ property/ice.py contains function to compute physical property relative to pure
 import logging
 import numpy as np
 
+from pysic.property import precision, workspace
+
 __author__ = "Marc Oggier"
 __license__ = "GPL"
 
@@ -21,12 +23,16 @@ __all__ = ["density", "thermal_conductivity"]
 module_logger = logging.getLogger(__name__)
 
 
-def density(t):
+def density(t, out=None, work=None):
     """
         Calculates the density of pure water ice
 
         :param t : array_like, float
             Temperature [degree °C]
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
 
         :return	rho_i: ndarray, float
             Calculated density of the ice [kg m^{-3}]
@@ -37,29 +43,34 @@ def density(t):
                 International Library. Geophysics Division.)
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t)
-    if (t > 0).any():
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t_pos = np.greater(t, 0, out=work.mask('ice.density.t_pos', t.shape))
+    if t_pos.any():
         module_logger.warning('For element with temperature T > 0°C, T=np.nan')
-        t = t.copy()
-        t.loc[t > 0] = [np.nan] * len(t[t > 0])
-        #t[t > 0] = np.nan
+        t = workspace.masked(t, t_pos, np.nan, work, 'ice.density.t')
 
     # Physical constant
     a = [-0.1403, 916.7]
 
-    rho_ice = np.polyval(a, t)
+    rho_ice = workspace.polyval(a, t, workspace.output(out, t.shape, dtype))
 
     return rho_ice
 
 
-def thermal_conductivity(t):
+def thermal_conductivity(t, out=None, work=None):
     """
         Calculates thermal conductivity of ice [W/mK]
 
         :param t : array_like, float
             Temperature [degree °C]
             If t is an array, s, t must be the same length
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
 
         :return lambda_si: ndarray, float
             The calculated ice thermal conductivity [W/mK]
@@ -73,16 +84,20 @@ def thermal_conductivity(t):
         AK, June 11-14, 1991. (Ed. by J. P. Zarling & s. L. Faussett), pp. 187-218, University of Alaska, Fairbanks
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t)
-    if (t > 0).any():
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t_pos = np.greater(t, 0, out=work.mask('ice.thermal_conductivity.t_pos', t.shape))
+    if t_pos.any():
         module_logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t[t > 0] = np.nan
+        t = workspace.masked(t, t_pos, np.nan, work, 'ice.thermal_conductivity.t')
 
     # Physical constant
     a = [2.97*1e-5, -8.66*1e-3, 1.91]
     b = 1.16
 
-    lambda_i = b * np.polyval(a, t)
+    lambda_i = workspace.polyval(a, t, workspace.output(out, t.shape, dtype))
+    np.multiply(b, lambda_i, out=lambda_i)
 
     return lambda_i
@@ -4,6 +4,8 @@
 property.pysic.nacl.py contains function to compute physical property relative to the artificial sea ice made with
 salt made of pure NaCl
 
+Functions are not covered by the precision policy (see pysic.property.precision): their dtype follows the numpy type
+promotion of the inputs, brine_porosity computes in float64.
 """
 __author__ = "Mars Oggier, Soenke Maus"
 __lisense__ = "GPL"
@@ -23,7 +25,7 @@ import logging
 
 import numpy as np
 
-from pysic.property import sw
+from pysic.property import sw, workspace
 
 module_logger = logging.getLogger(__name__)
 
@@ -154,12 +156,14 @@ def salt_s(c, t, p=10.1325, validity=True):
     return s_nacl
 
 
-def brine_density(s_b_nacl, t=None, method='chris', validity=True):
+def brine_density(s_b_nacl, t=None, method='chris', validity=True, out=None):
     """
         Computes density of NaCl brine from salinity
 
         :param s_nacl : array_like, float
             Salinity of NaCl brine [g / kg]
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
         
         :return rho_nacl: ndarray, float
             Density of NaCl brine [kg/m3]
@@ -179,15 +183,15 @@ def brine_density(s_b_nacl, t=None, method='chris', validity=True):
             print('Occurence of brine salinity lower than 10 ')
             if validity:
                 print('Replace s_b_nacl < 10 by np.nan')
-                s_b_nacl[s_b_nacl < 10] = np.nan
+                s_b_nacl = np.where(s_b_nacl < 10, np.nan, s_b_nacl)
 
         rho_nacl = 1.000 + 0.00076 * s_b_nacl - 0.0004 * t
         rho_nacl = 1000 * rho_nacl
 
-    return rho_nacl
+    return workspace.store(rho_nacl, out)
 
 
-def brine_salinity(t, method='chris'):
+def brine_salinity(t, method='chris', out=None):
     """
         Computes brine salinity from Temperature
         Inversion of the liquidus given in Coehn-Adad (1991)
@@ -197,6 +201,8 @@ def brine_salinity(t, method='chris'):
             Temperature of the brine [degree C]
         :param method: string, default='Chris'
             Method use to compute brine salinity either Chris or Sonke
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
 
         :return s_b: ndarray, float
             Salinity of the brine [g /kg]
@@ -216,7 +222,7 @@ def brine_salinity(t, method='chris'):
         # Full implementation
         # replace all np.nan value by 999
         t = np.atleast_1d(t)
-        t[np.isnan(t)] = -999
+        t = np.where(np.isnan(t), -999, t)
 
         def pp_hs(t):
             # high salinity fit to 0.0000000003704*S^4 -0.0000004612*S^3 -0.00006939*S^2 -0.05558*S = T
@@ -246,10 +252,10 @@ def brine_salinity(t, method='chris'):
         "CRC Handbook: accuracy of about 1%"
         s_b = -17.6 * t - 0.40 * t ** 2 - 0.004 * t **3
 
-    return s_b
+    return workspace.store(s_b, out)
 
 
-def brine_porosity(s, t, method='chris', validity=False):
+def brine_porosity(s, t, method='chris', validity=False, out=None):
     """
         Computes brine porosity (phi) of NaCl artificial sea ice from salinity [g / kg] and temperature [degree C]
 
@@ -259,6 +265,8 @@ def brine_porosity(s, t, method='chris', validity=False):
             Temperature of ice [degree C]
         :param method: string, default='Chris'
             Method use to compute brine salinity either Chris or Sonke
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
 
         :return phi: ndarray, float
             Brine porosity [-]
@@ -289,7 +297,7 @@ def brine_porosity(s, t, method='chris', validity=False):
 
     phi = 1 / ((s_b / s - 1) * rho_b / rho_i + 1)
 
-    return phi
+    return workspace.store(phi, out)
 
 
 # aliases
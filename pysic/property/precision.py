@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+property/precision.py contains the floating point policy of the property functions
+
+Property functions of si, ice, brine and the sw kernels freezingtemp, density_stdsw and density_p0 compute in a
+working dtype chosen by the policy:
+    'float64': inputs are converted to float64 (default)
+    'preserve': float32 inputs are kept in float32 end to end; if any array input is not float32, float64 is used
+    'float32': inputs are converted to float32
+
+The policy is global (set_policy, or environment variable PYSIC_PRECISION at import) or limited to a block of code
+(use). Single precision halves the memory and the memory bandwidth of large gridded fields. Error of float32 versus
+float64 (maximum absolute error, relative to the largest magnitude of the property) for s in [0, 40] PSU and t in
+[-30, -0.5] °C, as stored in the accuracy dictionary:
+    ice.*, brine.*, si.density, si.heat_capacity, si.specific_heat_capacity, si.latent_heat      < 1e-6
+    si.thermal_conductivity, si.thermal_diffusivity, si.brine_volume_fraction                   < 1e-6
+    si.permeability                                                                             < 1e-5
+    si.air_volume_fraction (difference of terms close to 1, absolute error < 1e-6)              < 1e-4
+and for s in [4, 40] PSU and t in [-2, 30] °C:
+    sw.freezingtemp, sw.density_stdsw, sw.density_p0                                            < 1e-6
+The other functions of sw (salinity and conductivity conversions) and the functions of nacl_ice are not covered by the
+policy: their dtype follows the numpy type promotion of the inputs, float64 for nacl_ice.brine_porosity, and their
+float32 accuracy is not assessed.
+
+USAGE:
+    from pysic.property import precision, si
+    with precision.use('preserve'):
+        vf_b = si.brine_volume_fraction(s.astype(np.float32), t.astype(np.float32))  # float32
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "precision.py contains the dtype policy of the property functions"
+
+__all__ = ["policies", "set_policy", "use", "working_dtype", "asarray"]
+
+import contextlib
+import os
+
+import numpy as np
+
+policies = ['float64', 'preserve', 'float32']
+POLICY = os.environ.get('PYSIC_PRECISION', 'float64')
+
+# error of float32 versus float64, relative to the largest magnitude of the property
+accuracy = {'ice.density': 1e-6, 'ice.thermal_conductivity': 1e-6,
+            'brine.density': 1e-6, 'brine.salinity': 1e-6, 'brine.thermal_conductivity': 1e-6,
+            'brine.electric_conductivity': 1e-6,
+            'si.density': 1e-6, 'si.heat_capacity': 1e-6, 'si.specific_heat_capacity': 1e-6,
+            'si.latent_heat': 1e-6, 'si.thermal_conductivity': 1e-6, 'si.thermal_diffusivity': 1e-6,
+            'si.brine_volume_fraction': 1e-6, 'si.permeability': 1e-5, 'si.air_volume_fraction': 1e-4,
+            'sw.freezingtemp': 1e-6, 'sw.density_stdsw': 1e-6, 'sw.density_p0': 1e-6}
+
+
+def set_policy(policy):
+    """
+    :param policy: 'float64', 'preserve' or 'float32'
+    """
+    global POLICY
+    if policy not in policies:
+        raise ValueError('precision policy must be one of %s' % ', '.join(policies))
+    POLICY = policy
+
+
+@contextlib.contextmanager
+def use(policy):
+    """
+    Context manager setting the policy within a block
+
+    :param policy: 'float64', 'preserve' or 'float32'
+    """
+    previous = POLICY
+    set_policy(policy)
+    try:
+        yield
+    finally:
+        set_policy(previous)
+
+
+def working_dtype(*x):
+    """
+    Working dtype of a property function
+
+    :param x: inputs of the property function. Scalars, lists and strings do not constrain the dtype
+    :return: numpy.float32 or numpy.float64
+    """
+    if POLICY == 'float32':
+        return np.float32
+    if POLICY == 'preserve':
+        dtypes = [_x.dtype for _x in x if hasattr(_x, 'dtype') and np.ndim(_x) > 0]
+        if dtypes and all(dtype == np.float32 for dtype in dtypes):
+            return np.float32
+    return np.float64
+
+
+def asarray(x, dtype):
+    """
+    Convert x to an array of dtype, at least 1-D. Arrays already in dtype are returned as is, without copy.
+
+    :param x: scalar, list, numpy.ndarray or pandas.Series
+    :param dtype: numpy.float32 or numpy.float64
+    :return: numpy.ndarray
+    """
+    if hasattr(x, 'loc'):
+        x = x.values
+    return np.atleast_1d(np.asarray(x)).astype(dtype, copy=False)
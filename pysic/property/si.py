@@ -24,9 +24,70 @@ logger = logging.getLogger(__name__)
 
 from pysic.property import ice
 from pysic.property import brine
+from pysic.property import precision
+from pysic.property import workspace
 
+# Coefficients of F1 and F2, polynomials of t, in Cox & Weeks (1983) and Leppäranta & Manninen (1988)
+_cw_a = np.empty((4, 4, 2))
 
-def air_volume_fraction(s, t, rho_si='default'):
+# coefficient for -2t<=0
+_cw_a[0, 0, :] = [-0.041221, 0.090312]
+_cw_a[0, 1, :] = [-18.407, -0.016111]
+_cw_a[0, 2, :] = [0.58402, 1.2291 * 10 ** (-4)]
+_cw_a[0, 3, :] = [0.21454, 1.3603 * 10 ** (-4)]
+
+# coefficient for -22.9<t<=-2
+_cw_a[1, 0, :] = [-4.732, 0.08903]
+_cw_a[1, 1, :] = [-22.45, -0.01763]
+_cw_a[1, 2, :] = [-0.6397, -5.330 * 10 ** (-4)]
+_cw_a[1, 3, :] = [-0.01074, -8.801 * 10 ** (-6)]
+
+# coefficient for -30<t<=-22.9
+_cw_a[2, 0, :] = [9899, 8.547]
+_cw_a[2, 1, :] = [1309, 1.089]
+_cw_a[2, 2, :] = [55.27, 0.04518]
+_cw_a[2, 3, :] = [0.7160, 5.819 * 10 ** (-4)]
+
+_cw_b = np.empty((3, 2))
+_cw_b[0] = [-2, 0]
+_cw_b[1] = [-22.9, -2]
+_cw_b[2] = [-30, -22.9]
+
+
+def _cw_coefficients(t, work, key):
+    """
+    :param t: numpy.ndarray, temperature [degree C]
+    :param work: Workspace
+    :param key: string, prefix of the scratch arrays in the workspace
+    :return: f1, f2, arrays held by the workspace, nan outside [-30, 0]
+    """
+    p1 = [[_cw_a[mm, 3, 0], _cw_a[mm, 2, 0], _cw_a[mm, 1, 0], _cw_a[mm, 0, 0]] for mm in range(0, 3)]
+    p2 = [[_cw_a[mm, 3, 1], _cw_a[mm, 2, 1], _cw_a[mm, 1, 1], _cw_a[mm, 0, 1]] for mm in range(0, 3)]
+    f1 = workspace.piecewise_polyval(p1, _cw_b, t, work.array(key + '.f1', t.shape, t.dtype), work, key)
+    f2 = workspace.piecewise_polyval(p2, _cw_b, t, work.array(key + '.f2', t.shape, t.dtype), work, key)
+    return f1, f2
+
+
+def _mask_t(t, value, work, key):
+    """
+    :return: t, or a copy of t held by the workspace where t > 0 is replaced by value
+    """
+    t_pos = np.greater(t, 0, out=work.mask(key + '.t_pos', t.shape))
+    if t_pos.any():
+        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
+        t = workspace.masked(t, t_pos, value, work, key + '.t')
+    return t
+
+
+def _check_shape(t, *x, singleton=False):
+    """
+    :return: True if all x have the shape of t, or are singletons if singleton is True
+    """
+    return all(_x.shape == t.shape or (singleton and _x.size == 1) for _x in x)
+
+
+@workspace.series_output
+def air_volume_fraction(s, t, rho_si='default', out=None, work=None):
     """
     Calculates air volume fraction in sea ice [-, unitless]
     If no sea ice density value are given, it will return 0.005, the air volume fraction expected in 1st year sea ice,
@@ -40,6 +101,10 @@ def air_volume_fraction(s, t, rho_si='default'):
     :param rho_si : float, array_like, 'default', optional
         Density of the ice [kg/m3]. By default, rho_si computed from s, t.
 
+    :param out : ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work : pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
     :return vf_a: ndarray float
         The calculated air volume fraction array [-, unitless]
 
@@ -49,71 +114,43 @@ def air_volume_fraction(s, t, rho_si='default'):
     """
 
     # check array lengths
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = 999
+    dtype = precision.working_dtype(s, t, rho_si)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, 999, work, 'si.air_volume_fraction')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
     if rho_si is 'default':
         logger.info('rho_si computed from t and s')
-        rho_si = density(s, t)
-    elif isinstance(rho_si, (int, float, list)):
-        rho_si = np.atleast_1d(rho_si).astype(float)
-    if rho_si.size == 1:
-        rho_si = rho_si*np.ones_like(s)
+        rho_si = density(s, t, out=work.array('si.air_volume_fraction.rho_si', t.shape, dtype), work=work)
+    else:
+        rho_si = precision.asarray(rho_si, dtype)
 
-    if t.shape != s.shape or t.shape != rho_si.shape or s.shape != rho_si.shape:
+    if not _check_shape(t, s) or not _check_shape(t, rho_si, singleton=True):
         logger.warning('s, t, rho_si must all have the same dimensions')
         return 0
 
-    # Physical constant
-    a = np.empty((4, 4, 2))
-
-    # coefficient for -2t<=0
-    a[0, 0, :] = [-0.041221, 0.090312]
-    a[0, 1, :] = [-18.407, -0.016111]
-    a[0, 2, :] = [0.58402, 1.2291 * 10 ** (-4)]
-    a[0, 3, :] = [0.21454, 1.3603 * 10 ** (-4)]
-
-    # coefficient for -22.9<t<=-2
-    a[1, 0, :] = [-4.732, 0.08903]
-    a[1, 1, :] = [-22.45, -0.01763]
-    a[1, 2, :] = [-0.6397, -5.330 * 10 ** (-4)]
-    a[1, 3, :] = [-0.01074, -8.801 * 10 ** (-6)]
-
-    # coefficient for -30<t<=-22.9
-    a[2, 0, :] = [9899, 8.547]
-    a[2, 1, :] = [1309, 1.089]
-    a[2, 2, :] = [55.27, 0.04518]
-    a[2, 3, :] = [0.7160, 5.819 * 10 ** (-4)]
-
-    b = np.empty((3, 2))
-    b[0] = [-2, 0]
-    b[1] = [-22.9, -2]
-    b[2] = [-30, -22.9]
-
-    rho_i = ice.density(t)
-
-    f1 = np.nan * t
-    f2 = np.nan * t
-    for mm in range(0, 3):
-        p1 = [a[mm, 3, 0], a[mm, 2, 0], a[mm, 1, 0], a[mm, 0, 0]]
-        p2 = [a[mm, 3, 1], a[mm, 2, 1], a[mm, 1, 1], a[mm, 0, 1]]
-
-        f1[(b[mm, 0] <= t) & (t <= b[mm, 1])] = np.polyval(p1, t[(b[mm, 0] <= t) & (t <= b[mm, 1])])
-        f2[(b[mm, 0] <= t) & (t <= b[mm, 1])] = np.polyval(p2, t[(b[mm, 0] <= t) & (t <= b[mm, 1])])
+    rho_i = ice.density(t, out=work.array('si.air_volume_fraction.rho_i', t.shape, dtype), work=work)
+    f1, f2 = _cw_coefficients(t, work, 'si.air_volume_fraction')
 
-    vf_a = 1 - rho_si/rho_i + rho_si*s*f2 / f1*1e-3
+    # vf_a = 1 - rho_si/rho_i + rho_si*s*f2 / f1*1e-3
+    vf_a = workspace.output(out, t.shape, dtype)
+    x = work.array('si.air_volume_fraction.x', t.shape, dtype)
+    np.divide(rho_si, rho_i, out=vf_a)
+    np.subtract(1, vf_a, out=vf_a)
+    np.multiply(rho_si, s, out=x)
+    np.multiply(x, f2, out=x)
+    np.divide(x, f1, out=x)
+    np.multiply(x, 1e-3, out=x)
+    np.add(vf_a, x, out=vf_a)
 
     return vf_a
 
 
-def brine_volume_fraction(s, t, rho_si='default', vf_a=0.0005, method='cw'):
+@workspace.series_output
+def brine_volume_fraction(s, t, rho_si='default', vf_a=0.0005, method='cw', out=None, work=None):
     """
     Calculate the volume fraction of brine [-, unitless]
 
@@ -136,6 +173,10 @@ def brine_volume_fraction(s, t, rho_si='default', vf_a=0.0005, method='cw'):
         Brine volume fraction can be computed with Cox and Weeks ('cw'), with Frankenstein-Garner full or simplified method
         ('fg', 'fg-simplified'). Cf. sources
 
+    :param out : ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work : pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
     :return vf_b: ndarray
         The calculated volume fraction of brine in the sea ice [-, unitless]
 
@@ -147,33 +188,26 @@ def brine_volume_fraction(s, t, rho_si='default', vf_a=0.0005, method='cw'):
         Journal of Glaciology (Vol. 6, pp. 943–944).
     """
     # check parameters
-    if isinstance(t, (int, float, list, np.ndarray)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = 999
+    dtype = precision.working_dtype(s, t, rho_si, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, 999, work, 'si.brine_volume_fraction')
 
-    if isinstance(s, (int, float, list, np.ndarray)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
-    if isinstance(vf_a, (int, float, list, np.ndarray)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
+    vf_a = precision.asarray(vf_a, dtype)
     if vf_a.size == 1:
         logger.info('Air volume fraction set to 0.0005')
-        vf_a = vf_a * np.ones_like(s).astype(float)
 
     if rho_si is 'default':
         logger.info('rho_si computed from t and s')
-        rho_si = density(s, t)
-    elif isinstance(rho_si, (int, float)):
-        rho_si = rho_si * np.ones_like(s)
-    elif isinstance(rho_si, (list, np.ndarray)):
-        rho_si = rho_si.astype(float)
+        rho_si = density(s, t, out=work.array('si.brine_volume_fraction.rho_si', t.shape, dtype), work=work)
+    else:
+        rho_si = precision.asarray(rho_si, dtype)
 
     ## Check for rho_si, t, S --> vf_a
-    if t.shape != s.shape or t.shape != vf_a.shape or t.shape != rho_si.shape or s.shape != rho_si.shape or \
-                    s.shape != vf_a.shape or rho_si.shape != vf_a.shape:
+    if not _check_shape(t, s) or not _check_shape(t, rho_si, vf_a, singleton=True):
         logger.warning('s, t, rho_si, vf_a must all have the same dimensions')
         return 0
 
@@ -185,60 +219,39 @@ def brine_volume_fraction(s, t, rho_si='default', vf_a=0.0005, method='cw'):
         vf_b[(tlim[1] < t) & (t <= tlim[0])] = s[(tlim[1] < t) & (t <= tlim[0])] * (a[0][0] / np.abs(t[(tlim[1] < t) & (t <= tlim[0])]) + a[0][1])
         vf_b[(tlim[2] < t) & (t <= tlim[1])] = s[(tlim[2] < t) & (t <= tlim[1])] * (a[1][0] / np.abs(t[(tlim[2] < t) & (t <= tlim[1])]) + a[1][1])
         vf_b[(tlim[3] <= t) & (t <= tlim[2])] = s[(tlim[3] <= t) & (t <= tlim[2])] * (a[2][0] / np.abs(t[(tlim[3] <= t) & (t <= tlim[2])]) + a[2][1])
-        vf_b = vf_b/1000
+        vf_b = workspace.store(vf_b/1000, out)
 
     elif method == 'fg-simplified':
         tlim = [-0.5, -22.9]
         a = [49.18, 0.53]
         vf_b = np.nan*np.ones_like(t)
         vf_b[(tlim[1] < t) & (t <= tlim[0])] = s[(tlim[1] < t) & (t <= tlim[0])] * (a[0] / np.abs(t[(tlim[1] < t) & (t <= tlim[0])]) + a[1])
-        vf_b = vf_b/1000
+        vf_b = workspace.store(vf_b/1000, out)
 
     else:
-        # Physical constant
-        a = np.empty((4, 4, 2))
-
-        # coefficient for -2t<=0
-        a[0, 0, :] = [-0.041221, 0.090312]
-        a[0, 1, :] = [-18.407, -0.016111]
-        a[0, 2, :] = [0.58402, 1.2291 * 10 ** (-4)]
-        a[0, 3, :] = [0.21454, 1.3603 * 10 ** (-4)]
-
-        # coefficient for -22.9<t<=-2
-        a[1, 0, :] = [-4.732, 0.08903]
-        a[1, 1, :] = [-22.45, -0.01763]
-        a[1, 2, :] = [-0.6397, -5.330 * 10 ** (-4)]
-        a[1, 3, :] = [-0.01074, -8.801 * 10 ** (-6)]
-
-        # coefficient for -30<t<=-22.9
-        a[2, 0, :] = [9899, 8.547]
-        a[2, 1, :] = [1309, 1.089]
-        a[2, 2, :] = [55.27, 0.04518]
-        a[2, 3, :] = [0.7160, 5.819 * 10 ** (-4)]
-
-        b = np.empty((3, 2))
-        b[0] = [-2, 0]
-        b[1] = [-22.9, -2]
-        b[2] = [-30, -22.9]
-
-        vf_a = air_volume_fraction(s, t, rho_si)
-        rho_i = ice.density(t)
-
-        f1 = np.nan * t
-        f2 = np.nan * t
-        for mm in range(0, 3):
-            p1 = [a[mm, 3, 0], a[mm, 2, 0], a[mm, 1, 0], a[mm, 0, 0]]
-            p2 = [a[mm, 3, 1], a[mm, 2, 1], a[mm, 1, 1], a[mm, 0, 1]]
-
-            f1[(b[mm, 0] <= t) & (t <= b[mm, 1])] = np.polyval(p1, t[(b[mm, 0] <= t) & (t <= b[mm, 1])])
-            f2[(b[mm, 0] <= t) & (t <= b[mm, 1])] = np.polyval(p2, t[(b[mm, 0] <= t) & (t <= b[mm, 1])])
-
-        vf_b = ((1 - vf_a) * rho_i * s * 1e-3 / (f1 - rho_i * s * f2 * 1e-3))
+        vf_a = air_volume_fraction(s, t, rho_si, out=work.array('si.brine_volume_fraction.vf_a', t.shape, dtype),
+                                   work=work)
+        rho_i = ice.density(t, out=work.array('si.brine_volume_fraction.rho_i', t.shape, dtype), work=work)
+        f1, f2 = _cw_coefficients(t, work, 'si.brine_volume_fraction')
+
+        # vf_b = ((1 - vf_a) * rho_i * s * 1e-3 / (f1 - rho_i * s * f2 * 1e-3))
+        vf_b = workspace.output(out, t.shape, dtype)
+        x = work.array('si.brine_volume_fraction.x', t.shape, dtype)
+        np.subtract(1, vf_a, out=vf_b)
+        np.multiply(vf_b, rho_i, out=vf_b)
+        np.multiply(vf_b, s, out=vf_b)
+        np.multiply(vf_b, 1e-3, out=vf_b)
+        np.multiply(rho_i, s, out=x)
+        np.multiply(x, f2, out=x)
+        np.multiply(x, 1e-3, out=x)
+        np.subtract(f1, x, out=x)
+        np.divide(vf_b, x, out=vf_b)
 
     return vf_b
 
 
-def density(s, t, vf_a=0.005):
+@workspace.series_output
+def density(s, t, vf_a=0.005, out=None, work=None):
     """
         Calculates density of sea water [kg/m3]
 
@@ -253,6 +266,10 @@ def density(s, t, vf_a=0.005):
             Default value is 0.5‰, representative of 1st year sea ice before spring warming. If Vf_a is an array, vf_a,
             t and s must be the same length.
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return rho_si: ndarray
             density of the brine [kg/m3]
 
@@ -265,68 +282,40 @@ def density(s, t, vf_a=0.005):
     """
 
     # check parameters
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d([t]).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = 999  # use 999 rather np.nan
+    dtype = precision.working_dtype(s, t, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, 999, work, 'si.density')  # use 999 rather np.nan
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
-    if isinstance(vf_a, (int, float, list)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
-    if vf_a.size == 1:
-        vf_a = vf_a * np.ones_like(t)
+    vf_a = precision.asarray(vf_a, dtype)
 
-    if t.shape != s.shape or t.shape != vf_a.shape or s.shape != vf_a.shape:
+    if not _check_shape(t, s) or not _check_shape(t, vf_a, singleton=True):
         logger.warning('s, t, vf_a must all have the same dimensions unless vf_a is a singleton')
         return 0
 
-    # Physical constant
-    a = np.empty((4, 4, 2))
-
-    # coefficient for -2t<=0
-    a[0, 0, :] = [-0.041221, 0.090312]
-    a[0, 1, :] = [-18.407, -0.016111]
-    a[0, 2, :] = [0.58402, 1.2291 * 10 ** (-4)]
-    a[0, 3, :] = [0.21454, 1.3603 * 10 ** (-4)]
-
-    # coefficient for -22.9<t<=-2
-    a[1, 0, :] = [-4.732, 0.08903]
-    a[1, 1, :] = [-22.45, -0.01763]
-    a[1, 2, :] = [-0.6397, -5.330 * 10 ** (-4)]
-    a[1, 3, :] = [-0.01074, -8.801 * 10 ** (-6)]
-
-    # coefficient for -30<t<=-22.9
-    a[2, 0, :] = [9899, 8.547]
-    a[2, 1, :] = [1309, 1.089]
-    a[2, 2, :] = [55.27, 0.04518]
-    a[2, 3, :] = [0.7160, 5.819 * 10 ** (-4)]
-
-    b = np.empty((3, 2))
-    b[0] = [-2, 0]
-    b[1] = [-22.9, -2]
-    b[2] = [-30, -22.9]
-
-    rho_i = ice.density(t) * 1e-3
+    rho_i = ice.density(t, out=work.array('si.density.rho_i', t.shape, dtype), work=work)
+    np.multiply(rho_i, 1e-3, out=rho_i)
+    f1, f2 = _cw_coefficients(t, work, 'si.density')
 
-    f1 = np.nan * t
-    f2 = np.nan * t
-    for mm in range(0, 3):
-        p1 = [a[mm, 3, 0], a[mm, 2, 0], a[mm, 1, 0], a[mm, 0, 0]]
-        p2 = [a[mm, 3, 1], a[mm, 2, 1], a[mm, 1, 1], a[mm, 0, 1]]
+    # rho_si = ((1 - vf_a) * (rho_i*f1 / (f1 - rho_i*s*f2)))
+    rho_si = workspace.output(out, t.shape, dtype)
+    x = work.array('si.density.x', t.shape, dtype)
+    np.multiply(rho_i, s, out=x)
+    np.multiply(x, f2, out=x)
+    np.subtract(f1, x, out=x)
+    np.multiply(rho_i, f1, out=rho_si)
+    np.divide(rho_si, x, out=rho_si)
+    np.multiply(np.subtract(1, vf_a, out=work.array('si.density.vf', vf_a.shape, dtype)), rho_si, out=rho_si)
+    np.multiply(rho_si, 10 ** 3, out=rho_si)
 
-        f1[(b[mm, 0] <= t) & (t <= b[mm, 1])] = np.polyval(p1, t[(b[mm, 0] <= t) & (t <= b[mm, 1])])
-        f2[(b[mm, 0] <= t) & (t <= b[mm, 1])] = np.polyval(p2, t[(b[mm, 0] <= t) & (t <= b[mm, 1])])
+    return rho_si  # rho_si in SI, kg m^{-3}
 
-    rho_si = ((1 - vf_a) * (rho_i*f1 / (f1 - rho_i*s*f2)))
 
-    return rho_si * 10 ** 3  # rho_si in SI, kg m^{-3}
-
-
-def electric_conductivity(s, t, rho_si='default', vf_a=0.005):
+@workspace.series_output
+def electric_conductivity(s, t, rho_si='default', vf_a=0.005, out=None, work=None):
     """
     Calculate the electric conductivity of sea ice for a given temperature and salinity
 
@@ -342,6 +331,10 @@ def electric_conductivity(s, t, rho_si='default', vf_a=0.005):
         The default is 0.005, representative of 1st year sea ice before spring warming.
         If vf_a is an array, vf_a, s, t must have the same length.
 
+    :param out : ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work : pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
     :return sigma_si: ndarray
         conductivity of pysic in microsiemens/meter [S/m]
 
@@ -350,43 +343,36 @@ def electric_conductivity(s, t, rho_si='default', vf_a=0.005):
     Science and Technology, 52(3), 263–277. http://doi.org/10.1016/j.coldregions.2007.05.002
     """
     # check array lengths
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = np.nan
+    dtype = precision.working_dtype(s, t, rho_si, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, np.nan, work, 'si.electric_conductivity')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
     if rho_si is 'default':
         logger.info('rho_si computed from t and s')
-        rho_si = density(s, t)
-    elif isinstance(rho_si, (int, float, list)):
-        rho_si = np.atleast_1d(rho_si).astype(float)
-    if rho_si.size == 1:
-        rho_si = rho_si*np.ones_like(s)
-
-    if isinstance(vf_a, (int, float, list)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
-    if vf_a.size == 1:
-        vf_a = vf_a * np.ones_like(s)
+        rho_si = density(s, t, work=work)
+    else:
+        rho_si = precision.asarray(rho_si, dtype)
 
-    if t.shape != s.shape or t.shape != vf_a.shape or t.shape != rho_si.shape or s.shape != rho_si.shape or \
-                    s.shape != vf_a.shape or rho_si.shape != vf_a.shape:
+    vf_a = precision.asarray(vf_a, dtype)
+
+    if not _check_shape(t, s) or not _check_shape(t, rho_si, vf_a, singleton=True):
         logger.warning('s, t, rho_si, vf_a must all have the same dimensions')
         return 0
 
-    sigma_b = brine.electric_conductivity(t)
+    sigma_b = brine.electric_conductivity(t, work=work)
     vf_b = brine_volume_fraction(s, t, rho_si=rho_si, vf=vf_a)
 
     sigma_si = sigma_b*vf_b**2.88
 
-    return sigma_si
+    return workspace.store(sigma_si, out)
 
 
-def latent_heat(s, t, transformation='solidification', s0=35.):
+@workspace.series_output
+def latent_heat(s, t, transformation='solidification', s0=35., out=None, work=None):
     """
         Calculates latent heat of sea ice during solidification (freezing, f) or melting (m).
 
@@ -401,6 +387,10 @@ def latent_heat(s, t, transformation='solidification', s0=35.):
         :param s0 : optional, float
             Initial salinity of the liquid [PSU].
             Only use to calculate the latent heat of solidification, if we assume T_f = m_m*s0. Default is 35 [PSU]
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return l_si: ndarray
             latent heat of sea ice [J/kg]
 
@@ -409,22 +399,17 @@ def latent_heat(s, t, transformation='solidification', s0=35.):
 
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = np.nan
+    dtype = precision.working_dtype(s, t, s0)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, np.nan, work, 'si.latent_heat')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
-    if isinstance(s0, (int, float, list)):
-        s0 = np.atleast_1d(s0).astype(float)
-    if s0.size == 1:
-        s0 = s0 * np.ones_like(s)
+    s0 = precision.asarray(s0, dtype)
 
-    if t.shape != s.shape or t.shape != s0.shape or s.shape != s0.shape:
+    if not _check_shape(t, s) or not _check_shape(t, s0, singleton=True):
         logger.warning('s, t, s0 must all have the same dimensions, unless s0 is a singleton')
         return 0
 
@@ -442,10 +427,11 @@ def latent_heat(s, t, transformation='solidification', s0=35.):
         logger.warning('Phase transformation undefined')
         return 0
 
-    return l_si
+    return workspace.store(l_si, out)
 
 
-def permeability_from_porosity(p):
+@workspace.series_output
+def permeability_from_porosity(p, out=None):
     """
         Calculate sea ice permeability k in function of sea ice porosoty (-), according to Golden et al. hierarchical
         model for columnar sea ice.
@@ -453,6 +439,8 @@ def permeability_from_porosity(p):
         :param p : array_like, float
             sea ice porosity (-)
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
         :return k: ndarray
             permeability [m2, unitless]
 
@@ -461,15 +449,20 @@ def permeability_from_porosity(p):
             Permeability, Geophysical Research Letters, 34, doi:10.1029/2007GL030447
 
     """
-    if isinstance(p, (int, float, list)):
-        p = np.atleast_1d(p).astype(float)
+    dtype = precision.working_dtype(p)
+    p = precision.asarray(p, dtype)
 
-    k = 3 * p**3*1e-8
+    # k = 3 * p**3*1e-8
+    k = workspace.output(out, p.shape, dtype)
+    np.power(p, 3, out=k)
+    np.multiply(3, k, out=k)
+    np.multiply(k, 1e-8, out=k)
 
     return k
 
 
-def permeability(s, t, rho_si='default', vf_a=0.005):
+@workspace.series_output
+def permeability(s, t, rho_si='default', vf_a=0.005, out=None, work=None):
     """
         Calculate sea ice permeability k in function of temperature (°C) and salinity (PSU), according to Golden et al.
         hierarchical model for columnar sea ice.
@@ -487,6 +480,10 @@ def permeability(s, t, rho_si='default', vf_a=0.005):
             air volume fraction of sea ice. Default value is 0.5‰, representative of 1st year sea ice before spring
             warming. If rho_si is an array, vf_a, s, t must have the same length.
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return k: ndarray
             permeability [m2, unitless]
 
@@ -495,40 +492,34 @@ def permeability(s, t, rho_si='default', vf_a=0.005):
             Permeability, Geophysical Research Letters, 34, doi:10.1029/2007GL030447
 
     """
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = 999
+    dtype = precision.working_dtype(s, t, rho_si, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, 999, work, 'si.permeability')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
     if rho_si is 'default':
         logger.info('rho_si computed from t and s')
-        rho_si = density(s, t)
-    elif isinstance(rho_si, (int, float, list)):
-        rho_si = np.atleast_1d(rho_si).astype(float)
-    if rho_si.size == 1:
-        rho_si = rho_si*np.ones_like(s)
-
-    if isinstance(vf_a, (int, float, list)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
-    if vf_a.size == 1:
-        vf_a = vf_a * np.ones_like(s)
+        rho_si = density(s, t, out=work.array('si.permeability.rho_si', t.shape, dtype), work=work)
+    else:
+        rho_si = precision.asarray(rho_si, dtype)
+
+    vf_a = precision.asarray(vf_a, dtype)
 
-    if t.shape != s.shape or t.shape != vf_a.shape or t.shape != rho_si.shape or s.shape != rho_si.shape or \
-                    s.shape != vf_a.shape or rho_si.shape != vf_a.shape:
+    if not _check_shape(t, s) or not _check_shape(t, rho_si, vf_a, singleton=True):
         logger.warning('s, t, rho_si, vf_a must all have the same dimensions')
         return 0
 
-    k = permeability_from_porosity(brine_volume_fraction(s, t, rho_si, vf_a=vf_a))
+    k = brine_volume_fraction(s, t, rho_si, vf_a=vf_a, out=workspace.output(out, t.shape, dtype), work=work)
+    k = permeability_from_porosity(k, out=k)
 
     return k
 
 
-def resistivity(s, t, rho_si='default', vf_a=0.005):
+@workspace.series_output
+def resistivity(s, t, rho_si='default', vf_a=0.005, out=None, work=None):
     """
     Return electric resistivity of sea ice at a given temperature and salinity [s/m == us/m]
 
@@ -545,6 +536,10 @@ def resistivity(s, t, rho_si='default', vf_a=0.005):
         warming.
         If vf_a is an array, vf_a, s, t must have the same length.
 
+    :param out : ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work : pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
     :return rhoel_si: ndarray
         resistiviy of pysic in microsiemens/meter [s/m]
 
@@ -554,40 +549,33 @@ def resistivity(s, t, rho_si='default', vf_a=0.005):
     Science and Technology, 52(3), 263–277. http://doi.org/10.1016/j.coldregions.2007.05.002
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = np.nan
+    dtype = precision.working_dtype(s, t, rho_si, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, np.nan, work, 'si.resistivity')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
     if rho_si is 'default':
         logger.info('rho_si computed from t and s')
-        rho_si = density(s, t)
-    elif isinstance(rho_si, (int, float, list)):
-        rho_si = np.atleast_1d(rho_si).astype(float)
-    if rho_si.size == 1:
-        rho_si = rho_si*np.ones_like(s)
-
-    if isinstance(vf_a, (int, float, list)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
-    if vf_a.size == 1:
-        vf_a = vf_a * np.ones_like(s)
+        rho_si = density(s, t, work=work)
+    else:
+        rho_si = precision.asarray(rho_si, dtype)
+
+    vf_a = precision.asarray(vf_a, dtype)
 
-    if t.shape != s.shape or t.shape != vf_a.shape or t.shape != rho_si.shape or s.shape != rho_si.shape or \
-                    s.shape != vf_a.shape or rho_si.shape != vf_a.shape:
+    if not _check_shape(t, s) or not _check_shape(t, rho_si, vf_a, singleton=True):
         logger.warning('s, t, rho_si, vf_a must all have the same dimensions')
         return 0
 
-    rhoel_si = 1/electric_conductivity(s, t, rho_si=rho_si, vf_a=vf_a)
+    rhoel_si = 1/electric_conductivity(s, t, rho_si=rho_si, vf_a=vf_a, work=work)
 
-    return rhoel_si
+    return workspace.store(rhoel_si, out)
 
 
-def heat_capacity(s, t, method='untersteiner'):
+@workspace.series_output
+def heat_capacity(s, t, method='untersteiner', out=None, work=None):
     """
         Calculate heat capacity of sea ice in function of temperature and salinity
 
@@ -600,6 +588,10 @@ def heat_capacity(s, t, method='untersteiner'):
         :param method : optional, 'untersteiner' or 'ono, Default:'untersteiner'
             Thermal conductivity can be calculate either from 'untersteiner' or 'ono' approach
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return c_si: ndarray
             Sea-ice heat capacity [J/kgK]
 
@@ -614,15 +606,13 @@ def heat_capacity(s, t, method='untersteiner'):
             Oura., Vol. 1, pp. 599–610).
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = np.nan
+    dtype = precision.working_dtype(s, t)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, np.nan, work, 'si.heat_capacity')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
     if t.shape != s.shape:
         logger.warning('s, t must all have the same dimensions')
@@ -631,23 +621,36 @@ def heat_capacity(s, t, method='untersteiner'):
     # Pysical Constant
     c_i = 2.11 * 1e3  # [J/kgK] specific heat capacity of ice @ 0°C
 
-    c_si = np.nan * np.ones_like(t)
+    c_si = workspace.output(out, t.shape, dtype)
+    t2 = np.square(t, out=work.array('si.heat_capacity.t2', t.shape, dtype))
 
     if method == 'untersteiner':
         a = 17.2 * 1e3  # [J/kgK]
-        c_si = c_i + a * s / (t ** 2)
+        # c_si = c_i + a * s / (t ** 2)
+        np.multiply(a, s, out=c_si)
+        np.divide(c_si, t2, out=c_si)
+        np.add(c_i, c_si, out=c_si)
 
     elif method == 'ono':
         beta = 7.5  # [J/kgK^2]
         lice = 333.4 * 1e3  # [J/kg] latent heat of fusion of freshwater
         m_m = -0.05411  # [K]  slope of the liquid
 
-        c_si = c_i + beta * t - m_m * lice * s / (t ** 2)  # kJ  kg-1 K-1
+        # c_si = c_i + beta * t - m_m * lice * s / (t ** 2)
+        np.multiply(m_m * lice, s, out=t2)
+        np.divide(t2, np.square(t, out=c_si), out=t2)
+        np.multiply(beta, t, out=c_si)
+        np.add(c_i, c_si, out=c_si)
+        np.subtract(c_si, t2, out=c_si)  # kJ  kg-1 K-1
+
+    else:
+        c_si.fill(np.nan)
 
     return c_si # return [J/kgK]
 
 
-def specific_heat_capacity(s, t, method='untersteiner'):
+@workspace.series_output
+def specific_heat_capacity(s, t, method='untersteiner', out=None, work=None):
     """
         Calculate specific heat capacity of sea ice in function of temperature and salinity
 
@@ -660,6 +663,10 @@ def specific_heat_capacity(s, t, method='untersteiner'):
         :param method : optional, 'untersteiner' or 'ono, Default:'untersteiner'
             Thermal conductivity can be calculate either from 'untersteiner' or 'ono' approach
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return c_si: ndarray
             sea ice heat capacity [J/kgK^2]
 
@@ -674,13 +681,19 @@ def specific_heat_capacity(s, t, method='untersteiner'):
             Oura., Vol. 1, pp. 599–610).
     """
 
-    c = heat_capacity(s, t, method=method)  # [J/kgK]
-    rho = density(s, t)  # kg/m3
+    dtype = precision.working_dtype(s, t)
+    s = precision.asarray(s, dtype)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    c = heat_capacity(s, t, method=method, out=out, work=work)  # [J/kgK]
+    rho = density(s, t, out=work.array('si.specific_heat_capacity.rho', c.shape, c.dtype), work=work)  # kg/m3
 
-    return c * rho  # J/Km3
+    return np.multiply(c, rho, out=c)  # J/Km3
 
 
-def thermal_conductivity(s, t, method='pringle', vf_a=0.005):
+@workspace.series_output
+def thermal_conductivity(s, t, method='pringle', vf_a=0.005, out=None, work=None):
     """
         Calculates bulk thermal conductivity of sea ice in function of temperautre and salinity.s
 
@@ -699,6 +712,10 @@ def thermal_conductivity(s, t, method='pringle', vf_a=0.005):
             warming.
             If vf_a is an array, vf_a, s, t must have the same length.
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return lambda_si ndarray
             pysic thermal conductivity [W/mK]
 
@@ -713,39 +730,54 @@ def thermal_conductivity(s, t, method='pringle', vf_a=0.005):
         the geophysics of sea ice (pp. 395–463). Dordrecht (NAtO AsI B146): Martinus Nijhoff Publishers.
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = np.nan
+    dtype = precision.working_dtype(s, t, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, np.nan, work, 'si.thermal_conductivity')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s)
+    s = precision.asarray(s, dtype)
 
-    if isinstance(vf_a, (int, float, list)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
-    if vf_a.size == 1:
-        vf_a = vf_a * np.ones_like(s)
+    vf_a = precision.asarray(vf_a, dtype)
 
-    if t.shape != s.shape or t.shape != vf_a.shape or s.shape != vf_a.shape:
+    if not _check_shape(t, s) or not _check_shape(t, vf_a, singleton=True):
         logger.warning('s, t, vf_a must all have the same dimensions unless vf_a is a singleton')
         return 0
 
+    x = work.array('si.thermal_conductivity.x', t.shape, dtype)
+
     if method == 'maykut':
         # Physical constant
         a = 0.13
-        lambda_si = ice.thermal_conductivity(t) + a * s / t
+        # lambda_si = ice.thermal_conductivity(t) + a * s / t
+        lambda_si = ice.thermal_conductivity(t, out=workspace.output(out, t.shape, dtype), work=work)
+        np.multiply(a, s, out=x)
+        np.divide(x, t, out=x)
+        np.add(lambda_si, x, out=lambda_si)
         return lambda_si
 
     elif method == 'pringle':
-        rho_si = density(s, t, vf_a=vf_a)
-        rho_i = ice.density(t)
-        lambda_si = rho_si / rho_i * (2.11 - 0.011*t + 0.09*s/t - (rho_si - rho_i)*1e-3)
+        rho_si = density(s, t, vf_a=vf_a, out=work.array('si.thermal_conductivity.rho_si', t.shape, dtype),
+                         work=work)
+        rho_i = ice.density(t, out=work.array('si.thermal_conductivity.rho_i', t.shape, dtype), work=work)
+        # lambda_si = rho_si / rho_i * (2.11 - 0.011*t + 0.09*s/t - (rho_si - rho_i)*1e-3)
+        lambda_si = workspace.output(out, t.shape, dtype)
+        np.multiply(0.011, t, out=lambda_si)
+        np.subtract(2.11, lambda_si, out=lambda_si)
+        np.multiply(0.09, s, out=x)
+        np.divide(x, t, out=x)
+        np.add(lambda_si, x, out=lambda_si)
+        np.subtract(rho_si, rho_i, out=x)
+        np.multiply(x, 1e-3, out=x)
+        np.subtract(lambda_si, x, out=lambda_si)
+        np.divide(rho_si, rho_i, out=x)
+        np.multiply(x, lambda_si, out=lambda_si)
         return lambda_si
 
 
-def thermal_diffusivity(s, t, method_l='pringle', method_cp='untersteiner', rho_si='default', vf_a=0.005):
+@workspace.series_output
+def thermal_diffusivity(s, t, method_l='pringle', method_cp='untersteiner', rho_si='default', vf_a=0.005,
+                        out=None, work=None):
     """
         Calculates the thermal diffusivity of sea ice in function of temperature or salinity. 'prindle' (default) or
         'ono' method could be chosen to compute latent heat and 'untersteiner' or 'maykut' method could be chosen to
@@ -768,6 +800,10 @@ def thermal_diffusivity(s, t, method_l='pringle', method_cp='untersteiner', rho_
             density of the ice in gram per cubic centimeter [kg/m3]. Defautl value is computed from t and s..
             If rho_si is an array, rho_si, s, t must have the same length.
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
         :return sigma_si:
             thermal diffusivity of sea ice [m2/s]
 
@@ -775,36 +811,34 @@ def thermal_diffusivity(s, t, method_l='pringle', method_cp='untersteiner', rho_
             material thermal diffusivity is given by sigma = lambda/(rho c_p)
 
     """
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
-    if (t > 0).any():
-        logger.warning('Some element of t > 0°C. Replacing them with nan-value')
-        t = t.copy()
-        t.loc[t > 0] = np.nan
+    dtype = precision.working_dtype(s, t, rho_si, vf_a)
+    t = precision.asarray(t, dtype)
+    if work is None:
+        work = workspace.Workspace()
+    t = _mask_t(t, np.nan, work, 'si.thermal_diffusivity')
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
+    s = precision.asarray(s, dtype)
 
-    if rho_si is 'default':
-        logger.info('rho_si computed from t and s')
-        rho_si = density(s, t)
-    elif isinstance(rho_si, (int, float, list)):
-        rho_si = np.atleast_1d(rho_si).astype(float)
-    if rho_si.size == 1:
-        rho_si = rho_si*np.ones_like(s)
-
-    if isinstance(vf_a, (int, float, list)):
-        vf_a = np.atleast_1d(vf_a).astype(float)
-    if vf_a.size == 1:
-        vf_a = vf_a * np.ones_like(s)
+    if rho_si is not 'default':
+        rho_si = precision.asarray(rho_si, dtype)
+        if not _check_shape(t, rho_si, singleton=True):
+            logger.warning('s, t, rho_si, vf_a must all have the same dimensions')
+            return 0
+
+    vf_a = precision.asarray(vf_a, dtype)
 
-    if t.shape != s.shape or t.shape != vf_a.shape or t.shape != rho_si.shape or s.shape != rho_si.shape or \
-                    s.shape != vf_a.shape or rho_si.shape != vf_a.shape:
+    if not _check_shape(t, s) or not _check_shape(t, vf_a, singleton=True):
         logger.warning('s, t, rho_si, vf_a must all have the same dimensions')
         return 0
 
-    sigma_si = thermal_conductivity(s, t, method=method_l, vf_a=vf_a) /\
-               (specific_heat_capacity(s, t, method=method_cp) * density(s, t, vf_a=vf_a))
+    # sigma_si = lambda_si / (c_si * rho_si)
+    sigma_si = thermal_conductivity(s, t, method=method_l, vf_a=vf_a, out=workspace.output(out, t.shape, dtype),
+                                    work=work)
+    c_si = specific_heat_capacity(s, t, method=method_cp,
+                                  out=work.array('si.thermal_diffusivity.c_si', t.shape, dtype), work=work)
+    rho_si = density(s, t, vf_a=vf_a, out=work.array('si.thermal_diffusivity.rho_si', t.shape, dtype), work=work)
+    np.multiply(c_si, rho_si, out=c_si)
+    np.divide(sigma_si, c_si, out=sigma_si)
 
     return sigma_si
 
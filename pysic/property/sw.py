@@ -8,11 +8,14 @@ r.C. Millard and K. Yang 1992. "CTD Calibration and Processing Methods used by W
     Draft April 14, 1992 (Personal communication)
 CSIrO MatLAB Seawater Library, Phil Morgan, CMr (maintained by Lindsay Pender), last updated December 2003
 
+freezingtemp, density_stdsw and density_p0 follow the precision policy (see pysic.property.precision); the salinity and
+conductivity conversions are not covered by the policy, their dtype follows the numpy type promotion of the inputs.
 """
 import numpy as np
 import logging
-from scipy import optimize
 from pysic.property.brine_nacl import dynamic_viscosity as nacl_dynamic_viscosity
+from pysic.property import precision
+from pysic.property import workspace
 __author__ = "Marc Oggier"
 __license__ = "GPL"
 
@@ -28,7 +31,8 @@ __all__ = ["freezingtemp", "salt", "salt_c", "conductivity2salinity", "salinity2
 module_logger = logging.getLogger(__name__)
 
 
-def freezingtemp(s, p=10.1325, validity=True):
+@workspace.series_output
+def freezingtemp(s, p=10.1325, validity=True, out=None, work=None):
     """
         Computes freezing temperature of seawater [degree C] for given salinity s and pressure p
 
@@ -45,6 +49,11 @@ def freezingtemp(s, p=10.1325, validity=True):
             For all data out of the validity, it returns np.nan if True and computed the value if False
             Default is True
 
+        :param out : ndarray, optional
+            Output array, see pysic.property.workspace
+        :param work : pysic.property.workspace.Workspace, optional
+            Scratch arrays reused between calls
+
         :return t_f: ndarray
             Freezing point of seawater [degree C]
 
@@ -57,28 +66,40 @@ def freezingtemp(s, p=10.1325, validity=True):
             t_f=-2.588567 [degree C] for s=40.0 [PSU] and p=500 [dbar]
     """
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
-
-    if isinstance(p, (int, float, list)):
-        p = np.atleast_1d(p).astype(float)
+    dtype = precision.working_dtype(s, p)
+    s = precision.asarray(s, dtype)
+    p = precision.asarray(p, dtype)
 
-    if s.shape != p.shape:
+    if s.shape != p.shape and p.size != 1:
         module_logger.warning('s, p must all have the same dimensions')
         return 0
 
-    if s[s < 4].any() or s[40 < s].any():
+    if work is None:
+        work = workspace.Workspace()
+    s_invalid = work.mask('sw.freezingtemp.s_invalid', s.shape)
+    np.logical_or(np.less(s, 4, out=s_invalid), np.less(40, s, out=work.mask('sw.freezingtemp.s_sup', s.shape)),
+                  out=s_invalid)
+    if s_invalid.any():
         if validity:
             module_logger.info('For element with salinity out of range 4 < s < 40,  s=np.nan')
-            s[s < 4] = np.nan
-            s[40 < s] = np.nan
+            s = workspace.masked(s, s_invalid, np.nan, work, 'sw.freezingtemp.s')
         else:
             module_logger.warning('some s value re out of validity domain')
 
     a = [-0.0575, +1.710523e-3, -2.154996e-4]
     b = [-7.53e-4]
 
-    t_f = (a[0] + a[1] * (np.sqrt(s)) + a[2]*s)*s + b[0]*p
+    # t_f = (a[0] + a[1] * (np.sqrt(s)) + a[2]*s)*s + b[0]*p
+    t_f = workspace.output(out, s.shape, dtype)
+    x = work.array('sw.freezingtemp.x', s.shape, t_f.dtype)
+    np.sqrt(s, out=t_f)
+    np.multiply(a[1], t_f, out=t_f)
+    np.add(a[0], t_f, out=t_f)
+    np.multiply(a[2], s, out=x)
+    np.add(t_f, x, out=t_f)
+    np.multiply(t_f, s, out=t_f)
+    np.multiply(b[0], p, out=x)
+    np.add(t_f, x, out=t_f)
 
     return t_f
 
@@ -199,7 +220,7 @@ def salrt(t):
     return rt
 
 
-def sals(rt, t, validity=True):
+def sals(rt, t, validity=True, out=None):
     """
     Computes salinity of sea water as a function of rt and t at constant pressure p = 0 dbar
     Validity domain is -2 <= t <= 35 [degree C] and 2 <= s <= 42 [PSU]
@@ -210,6 +231,8 @@ def sals(rt, t, validity=True):
         Temperature [degree C (IPTS-68)]
     :param validity: bool, Default True
         If True returns np.nan for all data out of the validity domain. If false, compute value anyway
+    :param out: ndarray, optional
+        Output array, see pysic.property.workspace
 
     :return s:ndarray float
         salinity [PSU (PSS-78)]
@@ -232,6 +255,7 @@ def sals(rt, t, validity=True):
     if t[t < -2].any() or t[35 < t].any():
         if validity:
             module_logger.info('For element with salinity out of range -2 < t < 35,  t = np.nan')
+            t = t.astype(float)
             t[t < -2] = np.nan
             t[35 < t] = np.nan
         else:
@@ -255,10 +279,10 @@ def sals(rt, t, validity=True):
         else:
             module_logger.warning('Some computed salinity value are out of the validity domain: 2 < s < 42 [PSU])')
 
-    return s
+    return workspace.store(s, out)
 
 
-def salt(r, t, p, validity=True):
+def salt(r, t, p, validity=True, out=None):
     """
     Computes salinity from conductivity ratio. UNESCO 1983 polynomial.
     Validity domain is -2 <= t <= 35 [degree C] and 2 <= s <= 42 [PSU]
@@ -271,6 +295,8 @@ def salt(r, t, p, validity=True):
         Pressure [dbar]
     :param validity: bool, Default True
         If True returns np.nan for all data out of the validity domain. If false, compute value anyway
+    :param out: ndarray, optional
+        Output array, see pysic.property.workspace
 
     :return s: ndarray float
         Salinity [PSU (PSS-78)]
@@ -295,12 +321,12 @@ def salt(r, t, p, validity=True):
     rt = salrt(t)
     rp = salrp(r, t, p)
     rrt = r / (rp * rt)
-    s = sals(rrt, t, validity=validity)
+    s = sals(rrt, t, validity=validity, out=out)
 
     return s
 
 
-def salt_c(c, t, p=None, validity=True):
+def salt_c(c, t, p=None, validity=True, out=None):
     """
     Computes salinity from conductivity ratio. UNESCO 1983 polynomial.
     Validity domain is -2 <= t <= 35 [degree C] and 2 <= s <= 42 [PSU]
@@ -313,6 +339,8 @@ def salt_c(c, t, p=None, validity=True):
         Pressure [dbar], default p=0
     :param validity: bool, Default True
         If True returns np.nan for all data out of the validity domain. If false, compute value anyway
+    :param out: ndarray, optional
+        Output array, see pysic.property.workspace
 
     :return s: ndarray float
         Salinity [PSU (PSS-78)]
@@ -339,7 +367,7 @@ def salt_c(c, t, p=None, validity=True):
 
     r = c/c3515()
 
-    s = salt(r, t, p, validity=validity)
+    s = salt(r, t, p, validity=validity, out=out)
     return s
 
 
@@ -369,13 +397,16 @@ def salinity2conductivity(s, t=15, p= 10.1325):
         p = np.atleast_1d(p).astype(float)
 
     if (s <= 0).any() or (1000 < s).any():
-        s[(s <= 0) | (1000 < s)] = np.nan
+        s = np.where((s <= 0) | (1000 < s), np.nan, s)
         module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
     if s.shape != t.shape or s.shape != p.shape or p.shape != t.shape:
         module_logger.warning('s, p, t must all have the same dimensions')
         return 0
 
+    # scipy is only needed for the inversion, import it here to keep the module import light
+    from scipy import optimize
+
     stp = np.vstack([s, t, p]).transpose()
 
     # initial condition
@@ -446,12 +477,17 @@ def dynamic_viscosity(s, t, override_s=True, override_t=True):
     return mu
 
 
-def density_stdsw(t):
+@workspace.series_output
+def density_stdsw(t, out=None, work=None):
     """
     Returns the densti of standard mean ocean water
 
     :param t: array-like, float
         Temperature [degree C (IPTS-68)], t = 10-180
+    :param out: ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work: pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
 
     :source:
         - Fofonoff, P. and Millard, R.C. Jr, Unesco 1983. Algorithms for computation of fundamental properties of
@@ -460,8 +496,8 @@ def density_stdsw(t):
           seawater", Deap-Sea Research., 1980, Vol27A, pp255-264.
     """
 
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
+    dtype = precision.working_dtype(t)
+    t = precision.asarray(t, dtype)
 
     # if ((s <= 0).any() or (130 < s).any()) and not override_s:
     #     s[(s <= 0) | (1000 < s)] = np.nan
@@ -471,8 +507,11 @@ def density_stdsw(t):
     #     t[(t <= 10) | (1000 < t)] = np.nan
     #     module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
+    if work is None:
+        work = workspace.Workspace()
+
     # Constant
-    t68 = t * 1.00024
+    t68 = np.multiply(t, 1.00024, out=work.array('sw.density_stdsw.t68', t.shape, dtype))
     a0 = 999.842594
     a1 = 6.793952e-2
     a2 = -9.095290e-3
@@ -481,12 +520,19 @@ def density_stdsw(t):
     a5 = 6.536332e-9
 
     # Equation 14, p.17 in UNESCO (1983)
-    rho = a0 + (a1 + (a2 + (a3 + (a4 + a5 * t68) * t68) * t68) * t68) * t68
+    # rho = a0 + (a1 + (a2 + (a3 + (a4 + a5 * t68) * t68) * t68) * t68) * t68
+    rho = workspace.output(out, t.shape, t68.dtype)
+    np.multiply(a5, t68, out=rho)
+    for a in [a4, a3, a2, a1]:
+        np.add(a, rho, out=rho)
+        np.multiply(rho, t68, out=rho)
+    np.add(a0, rho, out=rho)
 
     return rho
 
 
-def density_p0(s, t, override_s=True, override_t=True):
+@workspace.series_output
+def density_p0(s, t, override_s=True, override_t=True, out=None, work=None):
     """
     Returns the seawaer density as function of salinity and temperature at atmospheric pressure
 
@@ -500,6 +546,10 @@ def density_p0(s, t, override_s=True, override_t=True):
         Override validity domain for temperature, default False
     :param p: array-like, float
         Pressure [dbar]
+    :param out: ndarray, optional
+        Output array, see pysic.property.workspace
+    :param work: pysic.property.workspace.Workspace, optional
+        Scratch arrays reused between calls
     :return c: ndarray float
         density at atmospheric pressure [kg m^-3]
 
@@ -510,10 +560,9 @@ def density_p0(s, t, override_s=True, override_t=True):
           seawater", Deap-Sea Research., 1980, Vol27A, pp255-264.
     """
 
-    if isinstance(s, (int, float, list)):
-        s = np.atleast_1d(s).astype(float)
-    if isinstance(t, (int, float, list)):
-        t = np.atleast_1d(t).astype(float)
+    dtype = precision.working_dtype(s, t)
+    s = precision.asarray(s, dtype)
+    t = precision.asarray(t, dtype)
 
     if s.shape != t.shape:
         module_logger.error('s, t must all have the same dimensions')
@@ -527,8 +576,11 @@ def density_p0(s, t, override_s=True, override_t=True):
     #     t[(t <= 10) | (1000 < t)] = np.nan
     #     module_logger.warning('salinity value must be 0 < s < 1000 [PSU]')
 
+    if work is None:
+        work = workspace.Workspace()
+
     # Constant
-    t68 = t * 1.00024
+    t68 = np.multiply(t, 1.00024, out=work.array('sw.density_p0.t68', t.shape, dtype))
 
     # Equation 13, p.1 in UNESCO (1983)
 
@@ -544,8 +596,29 @@ def density_p0(s, t, override_s=True, override_t=True):
 
     d0 = 4.8314e-4
 
-    rho = density_stdsw(t) + (b0 + b1 * t68**1 + b2 * t68**2 + b3 * t68**3 + b4 * t68**4) * s
-    rho += (c0 + (c1 + c2 * t68) * t68) * s * np.sqrt(s) + d0 * s**2;
+    # rho = density_stdsw(t) + (b0 + b1 * t68**1 + b2 * t68**2 + b3 * t68**3 + b4 * t68**4) * s
+    rho = density_stdsw(t, out=workspace.output(out, t.shape, dtype), work=work)
+    x = work.array('sw.density_p0.x', t.shape, dtype)
+    y = work.array('sw.density_p0.y', t.shape, dtype)
+    np.multiply(b1, t68, out=x)
+    np.add(b0, x, out=x)
+    for n, b in [(2, b2), (3, b3), (4, b4)]:
+        np.power(t68, n, out=y)
+        np.multiply(b, y, out=y)
+        np.add(x, y, out=x)
+    np.multiply(x, s, out=x)
+    np.add(rho, x, out=rho)
+
+    # rho += (c0 + (c1 + c2 * t68) * t68) * s * np.sqrt(s) + d0 * s**2
+    np.multiply(c2, t68, out=x)
+    np.add(c1, x, out=x)
+    np.multiply(x, t68, out=x)
+    np.add(c0, x, out=x)
+    np.multiply(x, s, out=x)
+    np.multiply(x, np.sqrt(s, out=y), out=x)
+    np.multiply(d0, np.square(s, out=y), out=y)
+    np.add(x, y, out=x)
+    np.add(rho, x, out=rho)
     return rho
 
 #
@@ -602,7 +675,7 @@ def density_p0(s, t, override_s=True, override_t=True):
 
 
 # aliases:
-def conductivity2salinity(c, t, p=None, validity=True):
+def conductivity2salinity(c, t, p=None, validity=True, out=None):
     """
     Computes salinity from electrical conductivity . UNESCO 1983 polynomial.
     Validity domain is -2 <= t <= 35 [degree C] and 2 <= s <= 42 [PSU]
@@ -615,11 +688,13 @@ def conductivity2salinity(c, t, p=None, validity=True):
         Pressure [dbar]
     :param validity: bool, Default True
         If True returns np.nan for all data out of the validity domain. If false, compute value anyway
+    :param out: ndarray, optional
+        Output array, see pysic.property.workspace
 
     :return s: ndarray float
         Salinity [PSU (PSS-78)]
     """
-    s = salt_c(c, t, p=p, validity=validity)
+    s = salt_c(c, t, p=p, validity=validity, out=out)
     return s
 
 
@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+property/workspace.py contains the scratch arrays and helpers shared by the property functions
+
+Property functions take two optional arguments:
+    out: array of the shape of the inputs, the result is written in out and out is returned
+    work: Workspace, scratch arrays kept between calls
+
+Inputs are never modified: values out of the validity domain are masked in a copy of the input held by the workspace.
+With out and work, the kernels used in time-stepping loops (ice, brine, si density, brine volume fraction, heat
+capacity, thermal conductivity and diffusivity, permeability, sw freezing temperature and density) evaluate without
+allocating arrays after the first call. Without work, a workspace is created for the call. Without out, si, sw and
+brine_nacl functions of pandas.Series return a pandas.Series (see series_output).
+
+USAGE:
+    from pysic.property import si, workspace
+    work = workspace.Workspace()
+    d = np.empty_like(t)
+    for step in range(n_step):
+        si.thermal_diffusivity(s, t, out=d, work=work)
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "workspace.py contains scratch arrays and output helpers for the property functions"
+
+__all__ = ["Workspace", "output", "store", "series_output", "masked", "polyval", "piecewise_polyval"]
+
+import functools
+import inspect
+
+import numpy as np
+import pandas as pd
+
+
+class Workspace():
+    """
+    Scratch arrays of the property functions, reused between calls. Arrays are identified by a key and reallocated
+    only if the shape or the dtype changes. A workspace must not be shared between threads.
+    """
+
+    def __init__(self):
+        self._arrays = {}
+
+    def array(self, key, shape, dtype=float):
+        """
+        :param key: string, array name, prefixed by the function name
+        :param shape: tuple
+        :param dtype: numpy dtype
+        :return: numpy.ndarray, uninitialized
+        """
+        x = self._arrays.get(key)
+        if x is None or x.shape != shape or x.dtype != dtype:
+            x = np.empty(shape, dtype=dtype)
+            self._arrays[key] = x
+        return x
+
+    def mask(self, key, shape):
+        """
+        :return: boolean numpy.ndarray, uninitialized
+        """
+        return self.array(key, shape, dtype=bool)
+
+    @property
+    def nbytes(self):
+        return sum(x.nbytes for x in self._arrays.values())
+
+    def clear(self):
+        self._arrays.clear()
+
+
+def output(out, shape, dtype):
+    """
+    :param out: array or None
+    :return: out, or a new array of shape and dtype if out is None
+    """
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape:
+        raise ValueError('out must have the shape of the inputs, %s != %s' % (out.shape, shape))
+    return out
+
+
+def store(x, out):
+    """
+    :param x: numpy.ndarray, result
+    :param out: array or None
+    :return: x if out is None, otherwise out, holding a copy of x
+    """
+    if out is None:
+        return x
+    if out.shape != x.shape:
+        raise ValueError('out must have the shape of the inputs, %s != %s' % (out.shape, x.shape))
+    np.copyto(out, x)
+    return out
+
+
+def series_output(func):
+    """
+    Decorator of the property functions: if out is not given and inputs are pandas.Series, the result is returned as a
+    pandas.Series with the index of the first Series input, named as the Series inputs if they share the same name
+
+    :param func: property function
+    :return: function
+    """
+    parameters = list(inspect.signature(func).parameters)
+    i_out = parameters.index('out') if 'out' in parameters else None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        x = func(*args, **kwargs)
+        if i_out is not None and (kwargs.get('out') if len(args) <= i_out else args[i_out]) is not None:
+            return x
+        inputs = [arg for arg in args + tuple(kwargs.values()) if isinstance(arg, pd.Series)]
+        if not inputs or np.ndim(x) != 1 or len(x) != len(inputs[0]):
+            return x
+        names = set(arg.name for arg in inputs)
+        return pd.Series(np.asarray(x), index=inputs[0].index, name=names.pop() if len(names) == 1 else None)
+    return wrapper
+
+
+def masked(x, condition, value, work, key):
+    """
+    Replace the elements of x where condition is True by value, without modifying x
+
+    :param x: numpy.ndarray
+    :param condition: boolean numpy.ndarray
+    :param value: float, replacement value
+    :param work: Workspace
+    :param key: string, name of the copy in the workspace
+    :return: x if condition is False everywhere, otherwise a copy of x held by the workspace
+    """
+    if not condition.any():
+        return x
+    x_masked = work.array(key, x.shape, x.dtype)
+    np.copyto(x_masked, x)
+    np.copyto(x_masked, value, where=condition)
+    return x_masked
+
+
+def polyval(p, x, out):
+    """
+    Evaluate the polynomial p at x in out, with the same operations as numpy.polyval
+
+    :param p: list of float, coefficients, highest degree first
+    :param x: numpy.ndarray
+    :param out: numpy.ndarray, may not be x
+    :return: out
+    """
+    np.multiply(x, 0, out=out)
+    for pv in p:
+        np.multiply(out, x, out=out)
+        np.add(out, pv, out=out)
+    return out
+
+
+def piecewise_polyval(p_list, bounds, x, out, work, key):
+    """
+    Evaluate polynomials on intervals of x: out is nan outside the intervals, where intervals overlap the last one
+    applies
+
+    :param p_list: list of polynomial coefficients, highest degree first
+    :param bounds: list of [x_low, x_sup], closed intervals
+    :param x: numpy.ndarray
+    :param out: numpy.ndarray
+    :param work: Workspace
+    :param key: string, prefix of the scratch arrays in the workspace
+    :return: out
+    """
+    y = work.array(key + '.y', x.shape, out.dtype)
+    in_range = work.mask(key + '.in_range', x.shape)
+    above = work.mask(key + '.above', x.shape)
+    out.fill(np.nan)
+    for p, (x_low, x_sup) in zip(p_list, bounds):
+        np.less_equal(x_low, x, out=in_range)
+        np.less_equal(x, x_sup, out=above)
+        np.logical_and(in_range, above, out=in_range)
+        polyval(p, x, y)
+        np.copyto(out, y, where=in_range)
+    return out
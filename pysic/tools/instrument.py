@@ -0,0 +1,248 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.tools.instrument : opt-in timing spans and counters for pysic
+
+Import, read_profile, stacking, discretization, statistics and property computation are wrapped in nested timing
+spans; files, sheets, rows, cells, cores and bins are counted. Instrumentation is disabled by default: span() then
+returns a shared no-op context manager and count() returns immediately, so the cost left in the instrumented functions
+is a test on a module flag. Set the environment variable PYSIC_INSTRUMENT=1 to enable it at import.
+
+Spans recorded in worker processes are not collected.
+
+USAGE:
+    from pysic.tools import instrument
+    instrument.enable()
+    ics_dict = pysic.core.import_ic_list(ic_list)
+    instrument.summary()
+    instrument.export_json('pysic_report.json')
+    instrument.export_chrome_trace('pysic_trace.json')  # open in chrome://tracing or ui.perfetto.dev
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "instrument.py contains timing spans and counters to profile pysic"
+
+__all__ = ["enable", "disable", "reset", "span", "timed", "annotate", "count", "report", "summary", "export_json",
+           "export_chrome_trace"]
+
+import functools
+import json
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('PYSIC_INSTRUMENT', '0') not in ['', '0']
+
+_lock = threading.Lock()
+_local = threading.local()
+_events = []
+_counters = {}
+_t0 = time.perf_counter()
+
+
+class _NullSpan():
+    """
+    Shared no-op span returned when instrumentation is disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class Span():
+    """
+    Timing span, nested in the span open in the same thread
+    """
+    __slots__ = ('name', 'path', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = _stack()
+        self.path = stack[-1].path + '/' + self.name if stack else self.name
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        _stack().pop()
+        # list.append is atomic, no lock needed
+        _events.append((self.path, self.name, self.start - _t0, end - self.start, threading.get_ident(), self.args))
+        return False
+
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        _local.stack = []
+        return _local.stack
+
+
+def enable():
+    """
+    Enable instrumentation
+    """
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """
+    Disable instrumentation, recorded spans and counters are kept
+    """
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """
+    Discard recorded spans and counters
+    """
+    global _t0
+    with _lock:
+        del _events[:]
+        _counters.clear()
+        _t0 = time.perf_counter()
+
+
+def span(name, **args):
+    """
+    Context manager timing the enclosed block
+    :param name: string, span name
+    :param args: extra information attached to the span (e.g. file name)
+    :return: context manager
+    """
+    if not ENABLED:
+        return _null_span
+    return Span(name, args)
+
+
+def timed(name):
+    """
+    Decorator timing each call of a function in a span
+    :param name: string, span name
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def annotate(**args):
+    """
+    Attach information to the innermost open span of the current thread
+    """
+    if not ENABLED:
+        return
+    stack = _stack()
+    if stack:
+        stack[-1].args.update(args)
+
+
+def count(name, n=1):
+    """
+    Increment a counter
+    :param name: string, counter name (e.g. 'files', 'sheets', 'rows', 'cells', 'bins')
+    :param n: int, increment
+    """
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def report():
+    """
+    Aggregate recorded spans by path
+    :return: dict, {'spans': {path: {'count', 'total', 'mean', 'min', 'max'}}, 'counters': {name: value}}
+        time in second
+    """
+    spans = {}
+    for path, _, _, duration, _, _ in list(_events):
+        if path not in spans:
+            spans[path] = {'count': 0, 'total': 0., 'min': duration, 'max': duration}
+        s = spans[path]
+        s['count'] += 1
+        s['total'] += duration
+        s['min'] = min(s['min'], duration)
+        s['max'] = max(s['max'], duration)
+    for path in spans:
+        spans[path]['mean'] = spans[path]['total'] / spans[path]['count']
+    with _lock:
+        counters = dict(_counters)
+    return {'spans': dict(sorted(spans.items())), 'counters': counters}
+
+
+def summary():
+    """
+    Print recorded spans as an indented tree, followed by the counters
+    """
+    _report = report()
+    print('%-48s %8s %12s %12s' % ('span', 'count', 'total [ms]', 'mean [ms]'))
+    for path, s in _report['spans'].items():
+        depth = path.count('/')
+        print('%-48s %8d %12.2f %12.3f' % ('  ' * depth + path.split('/')[-1], s['count'], s['total'] * 1e3,
+                                            s['mean'] * 1e3))
+    if _report['counters']:
+        print('')
+        for name, value in sorted(_report['counters'].items()):
+            print('%-48s %8d' % (name, value))
+
+
+def export_json(filepath):
+    """
+    Write the aggregated report to a json file
+    :param filepath: string
+    :return: string, filepath
+    """
+    with open(filepath, 'w') as f:
+        json.dump(report(), f, indent=2)
+    return filepath
+
+
+def export_chrome_trace(filepath):
+    """
+    Write the recorded spans and counters in the Chrome trace event format
+    :param filepath: string
+    :return: string, filepath
+    """
+    pid = os.getpid()
+    trace = []
+    t_end = 0
+    for path, name, start, duration, tid, args in list(_events):
+        event = {'name': name, 'cat': path.split('/')[0], 'ph': 'X', 'ts': start * 1e6, 'dur': duration * 1e6,
+                 'pid': pid, 'tid': tid}
+        if args:
+            event['args'] = {key: str(value) for key, value in args.items()}
+        trace.append(event)
+        t_end = max(t_end, start + duration)
+    with _lock:
+        counters = dict(_counters)
+    if counters:
+        trace.append({'name': 'counters', 'ph': 'C', 'ts': t_end * 1e6, 'pid': pid, 'args': counters})
+    with open(filepath, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+    return filepath
@@ -0,0 +1,250 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.tools.kernels : optional compiled kernels for discretization and diffusion
+
+Loop kernels for the step profile remap (section to bin overlap sweep), the gap filling of step profiles and the
+5-point stencil update of the diffusion equation. When Numba is installed the kernels are compiled at their first call
+(and cached on disk) and discretize_profile uses them instead of the NumPy implementation; without Numba, or with the
+environment variable PYSIC_NUMBA=0, the NumPy implementation is used. The kernels sum in the same order as the NumPy
+implementation: both backends return the same values.
+
+Without Numba the kernels remain callable as plain Python functions, which is only useful to check them on small arrays.
+
+USAGE:
+    from pysic.tools import kernels
+    kernels.ENABLED  # True if discretize_profile uses the compiled kernels
+    kernels.disable()
+    u = kernels.diffusion_step(u0, u, k, dt, dx2, dy2)
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "kernels.py contains optional numba kernels for discretization and diffusion"
+
+__all__ = ["HAS_NUMBA", "enable", "disable", "remap_sweep", "bin_sections", "fill_gap", "diffusion_step"]
+
+import logging
+import os
+
+import numpy as np
+
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    numba = None
+    HAS_NUMBA = False
+
+ENABLED = HAS_NUMBA and os.environ.get('PYSIC_NUMBA', '1') not in ['', '0']
+
+TOL = 1e-6
+
+logger = logging.getLogger(__name__)
+
+
+def enable():
+    """
+    Use the compiled kernels in discretize_profile
+    """
+    global ENABLED
+    if not HAS_NUMBA:
+        logger.warning('numba is not installed, the NumPy implementation is used')
+        return
+    ENABLED = True
+
+
+def disable():
+    """
+    Use the NumPy implementation in discretize_profile
+    """
+    global ENABLED
+    ENABLED = False
+
+
+def _jit(func):
+    if HAS_NUMBA:
+        return numba.njit(cache=True, nogil=True)(func)
+    return func
+
+
+@_jit
+def _bin_range(y_low, y_sup, y_bins, j):
+    """
+    Range of the bins overlapped by section j, empty if section j is not defined
+    """
+    n_bin = len(y_bins) - 1
+    if n_bin <= 0 or np.isnan(y_low[j]) or np.isnan(y_sup[j]):
+        return 0, 0
+    i_first = min(max(np.searchsorted(y_bins, y_low[j], side='right') - 1, 0), n_bin - 1)
+    i_last = min(max(np.searchsorted(y_bins, y_sup[j], side='left') - 1, 0), n_bin - 1)
+    return i_first, max(i_last + 1, i_first)
+
+
+@_jit
+def _remap_sweep(y_low, y_sup, x, y_bins, mass):
+    n_bin = max(len(y_bins) - 1, 0)
+    n_var = x.shape[1]
+    S = np.zeros((n_bin, n_var))
+    L = np.zeros((n_bin, n_var))
+    for j in range(len(y_low)):
+        i0, i1 = _bin_range(y_low, y_sup, y_bins, j)
+        length = y_sup[j] - y_low[j]
+        for i in range(i0, i1):
+            overlap = min(y_sup[j], y_bins[i + 1]) - max(y_low[j], y_bins[i])
+            if overlap <= TOL:
+                continue
+            if mass:
+                weight = overlap * (1 / length) if length > 0 else 0.
+            else:
+                weight = overlap
+            for m in range(n_var):
+                if not np.isnan(x[j, m]):
+                    S[i, m] += weight * x[j, m]
+                    L[i, m] += overlap
+    return S, L
+
+
+def remap_sweep(y_low, y_sup, x, y_bins, mass=False):
+    """
+    Remap step profiles from source sections to target bins with a single sweep over the section-bin overlaps. Same
+    values as pysic.core.profile.remap_profile.
+
+    :param y_low, y_sup: array, section boundaries, sorted
+    :param x: array (n,) or (n, m), section values
+    :param y_bins: array, target bin boundaries, sorted
+    :param mass: boolean, default False. If True, the remap is mass-conserving
+    :return: X, W, arrays (len(y_bins) - 1, m)
+    """
+    x = np.asarray(x, dtype=float)
+    x = np.ascontiguousarray(x.reshape(len(x), -1))
+    y_bins = np.ascontiguousarray(y_bins, dtype=float)
+    S, L = _remap_sweep(np.ascontiguousarray(y_low, dtype=float), np.ascontiguousarray(y_sup, dtype=float), x,
+                        y_bins, mass)
+    if mass:
+        X = S
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            X = S / L
+    X[L == 0] = np.nan
+    W = L / np.diff(y_bins)[:, None]
+    return X, W
+
+
+@_jit
+def _bin_sections(y_low, y_sup, y_bins):
+    n_bin = max(len(y_bins) - 1, 0)
+    j_first = np.full(n_bin, -1, dtype=np.int64)
+    j_last = np.full(n_bin, -1, dtype=np.int64)
+    for j in range(len(y_low)):
+        i0, i1 = _bin_range(y_low, y_sup, y_bins, j)
+        for i in range(i0, i1):
+            overlap = min(y_sup[j], y_bins[i + 1]) - max(y_low[j], y_bins[i])
+            if overlap <= TOL:
+                continue
+            if j_first[i] < 0:
+                j_first[i] = j
+            j_last[i] = j
+    return j_first, j_last
+
+
+def bin_sections(y_low, y_sup, y_bins):
+    """
+    First and last section overlapping each bin
+
+    :param y_low, y_sup: array, section boundaries, sorted
+    :param y_bins: array, target bin boundaries, sorted
+    :return: j_first, j_last, int arrays (len(y_bins) - 1,), -1 for bins without section
+    """
+    return _bin_sections(np.ascontiguousarray(y_low, dtype=float), np.ascontiguousarray(y_sup, dtype=float),
+                         np.ascontiguousarray(y_bins, dtype=float))
+
+
+@_jit
+def _fill_gap(y_low, y_sup, x):
+    x_out = x.copy()
+    n = len(x)
+    j_prev = -1
+    for j in range(n):
+        if not np.isnan(x[j]):
+            j_prev = j
+            continue
+        if j_prev < 0:
+            continue
+        j_next = j + 1
+        while j_next < n and np.isnan(x[j_next]):
+            j_next += 1
+        if j_next == n:
+            break
+        y = y_low[j] + (y_sup[j] - y_low[j]) / 2
+        x_out[j] = x[j_prev] + (y - y_sup[j_prev]) * (x[j_next] - x[j_prev]) / (y_low[j_next] - y_sup[j_prev])
+    return x_out
+
+
+def _fill_gap_numpy(y_low, y_sup, x):
+    n = len(x)
+    valid = ~np.isnan(x)
+    j_prev = np.maximum.accumulate(np.where(valid, np.arange(n), -1))
+    j_next = np.minimum.accumulate(np.where(valid, np.arange(n), n)[::-1])[::-1]
+    fill = ~valid & (j_prev >= 0) & (j_next < n)
+    j_prev = j_prev[fill]
+    j_next = j_next[fill]
+    y = y_low[fill] + (y_sup[fill] - y_low[fill]) / 2
+    x_out = x.copy()
+    x_out[fill] = x[j_prev] + (y - y_sup[j_prev]) * (x[j_next] - x[j_prev]) / (y_low[j_next] - y_sup[j_prev])
+    return x_out
+
+
+def fill_gap(y_low, y_sup, x):
+    """
+    Fill the sections without value by linear interpolation between the values of the adjacent sections, at the middle
+    of the section. Sections before the first or after the last value are not filled.
+
+    :param y_low, y_sup: array, section boundaries, sorted
+    :param x: array (n,), section values
+    :return: array (n,)
+    """
+    y_low = np.ascontiguousarray(y_low, dtype=float)
+    y_sup = np.ascontiguousarray(y_sup, dtype=float)
+    x = np.ascontiguousarray(x, dtype=float)
+    if ENABLED:
+        return _fill_gap(y_low, y_sup, x)
+    return _fill_gap_numpy(y_low, y_sup, x)
+
+
+@_jit
+def _diffusion_step(u0, u, k, dt, dx2, dy2):
+    for i in range(1, u0.shape[0] - 1):
+        for j in range(1, u0.shape[1] - 1):
+            u[i, j] = u0[i, j] + k[i, j] * dt * ((u0[i + 1, j] - 2 * u0[i, j] + u0[i - 1, j]) / dx2
+                                                 + (u0[i, j + 1] - 2 * u0[i, j] + u0[i, j - 1]) / dy2)
+    return u
+
+
+def _diffusion_step_numpy(u0, u, k, dt, dx2, dy2):
+    u[1:-1, 1:-1] = u0[1:-1, 1:-1] + k[1:-1, 1:-1] * dt * (
+        (u0[2:, 1:-1] - 2 * u0[1:-1, 1:-1] + u0[:-2, 1:-1]) / dx2
+        + (u0[1:-1, 2:] - 2 * u0[1:-1, 1:-1] + u0[1:-1, :-2]) / dy2)
+    return u
+
+
+def diffusion_step(u0, u, k, dt, dx2, dy2):
+    """
+    Explicit time step of the 2D diffusion equation, 5-point stencil. Boundary values of u are not modified.
+
+    :param u0: 2D array, field at time t
+    :param u: 2D array, field at time t + dt, updated in place
+    :param k: 2D array, diffusivity
+    :param dt: float, time step
+    :param dx2, dy2: float, squared grid spacing along the first and second axis
+    :return: u
+    """
+    if ENABLED:
+        return _diffusion_step(u0, u, k, float(dt), float(dx2), float(dy2))
+    return _diffusion_step_numpy(u0, u, k, dt, dx2, dy2)
@@ -0,0 +1,133 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.tools.pipeline : prefetching reader for file ingestion
+
+Reading a spreadsheet is a mix of file reads, zip decompression, XML parsing and Python object construction. On
+network-mounted or spinning disks the reads dominate. Prefetcher reads the files ahead on a pool of I/O threads while
+the consumer parses the files already in memory. At most depth files are read ahead and held in memory: a new read is
+only started when the consumer takes a file (backpressure). Files are delivered in the order of the input list.
+
+Prefetcher.stats holds the time the consumer waited for the I/O ('io_wait') and the time it spent processing the files
+('parse'), along with the cumulated read time of the I/O threads ('read'), the number of files and of bytes read.
+
+USAGE:
+    from pysic.tools import pipeline
+    with pipeline.Prefetcher(ic_list, depth=4) as files:
+        for ic_path, data in files:
+            ic_data = pysic.core.import_ic_path(ic_path, data=data)
+    files.stats
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "pipeline.py contains a prefetching file reader for the ingestion of spreadsheets"
+
+__all__ = ["Prefetcher", "read_file"]
+
+import collections
+import logging
+import time
+
+from pysic.tools import instrument
+
+## Default values:
+depth = 4  # files read ahead
+n_io = 2  # I/O threads
+
+logger = logging.getLogger(__name__)
+
+
+def read_file(path):
+    """
+    Read a whole file in memory
+
+    :param path: string, path to the file
+    :return: (bytes, read time in second), bytes is None if the file cannot be read
+    """
+    t0 = time.perf_counter()
+    with instrument.span('read_file'):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.debug('%s cannot be read ahead: %s', path, e)
+            data = None
+    return data, time.perf_counter() - t0
+
+
+class Prefetcher():
+    """
+    Iterate over (path, bytes) of a list of files, read ahead on a pool of I/O threads. bytes is None if the file
+    cannot be read; the consumer then falls back on the path.
+    """
+
+    def __init__(self, paths, depth=depth, n_io=n_io):
+        """
+        :param paths: list of string, paths to the files
+        :param depth: int, maximum number of files read ahead and held in memory
+        :param n_io: int, number of I/O threads
+        """
+        self.paths = list(paths)
+        self.depth = max(int(depth), 1)
+        self.n_io = max(1, min(int(n_io), self.depth))
+        self.stats = {'files': 0, 'bytes': 0, 'read': 0.0, 'io_wait': 0.0, 'parse': 0.0}
+        self._executor = None
+        self._pending = collections.deque()
+
+    def __iter__(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.n_io, thread_name_prefix='pysic-io')
+        paths = iter(self.paths)
+        for path in paths:
+            self._pending.append((path, self._executor.submit(read_file, path)))
+            if len(self._pending) >= self.depth:
+                break
+
+        while self._pending:
+            path, future = self._pending.popleft()
+            t0 = time.perf_counter()
+            with instrument.span('io_wait'):
+                data, t_read = future.result()
+            self.stats['io_wait'] += time.perf_counter() - t0
+            # backpressure: the next read starts only once a file is taken by the consumer
+            path_next = next(paths, None)
+            if path_next is not None:
+                self._pending.append((path_next, self._executor.submit(read_file, path_next)))
+
+            self.stats['files'] += 1
+            self.stats['read'] += t_read
+            if data is not None:
+                self.stats['bytes'] += len(data)
+                instrument.count('prefetch_bytes', len(data))
+            t0 = time.perf_counter()
+            yield path, data
+            self.stats['parse'] += time.perf_counter() - t0
+        logger.info('%d files, %d bytes read ahead: %.3f s waiting for I/O, %.3f s parsing (%.3f s reading)',
+                    self.stats['files'], self.stats['bytes'], self.stats['io_wait'], self.stats['parse'],
+                    self.stats['read'])
+
+    def close(self):
+        """
+        Cancel the pending reads and stop the I/O threads
+        """
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,342 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.tools.shared : shared-memory transport of stacks and arrays to worker processes
+
+Sending a CoreStack to a pool of worker processes pickles the whole DataFrame for each task. SharedStack publishes the
+columns of a stack once in shared memory (multiprocessing.shared_memory), one block per column; string and object
+columns are published as integer codes, their distinct values travel with the handle. The handle, a small picklable
+description of the blocks, is sent to the workers instead of the data; workers attach zero-copy views of the columns by
+block name and build only the rows they work on.
+
+map_partitions runs a function over row partitions of a stack in a pool of worker processes, using this transport.
+Blocks are released (unlinked) by the publisher when the SharedStack is closed.
+
+USAGE:
+    from pysic.tools import shared
+    with shared.SharedStack(ics_stack) as stack:
+        handle = stack.handle  # send the handle to the workers
+    # in a worker
+    with shared.attach(handle) as view:
+        salinity = view.column('salinity')  # zero-copy view
+        profile = view.frame(rows)  # DataFrame of the selected rows
+
+    results = shared.map_partitions(func, ics_stack, partitions, n_worker=4)
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "shared.py publishes stacks and arrays in shared memory for worker processes"
+
+__all__ = ["SharedStack", "SharedArrays", "attach", "attach_arrays", "map_partitions", "reference", "resolve"]
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from pysic.tools import instrument
+
+## Default values:
+n_worker = None  # os.cpu_count()
+
+logger = logging.getLogger(__name__)
+
+
+def _publish(x):
+    """
+    Copy an array in a new shared memory block
+
+    :return: SharedMemory, spec (block name, shape, dtype)
+    """
+    from multiprocessing import shared_memory
+    x = np.ascontiguousarray(x)
+    shm = shared_memory.SharedMemory(create=True, size=max(x.nbytes, 1))
+    np.ndarray(x.shape, dtype=x.dtype, buffer=shm.buf)[...] = x
+    return shm, (shm.name, x.shape, x.dtype.str)
+
+
+def _attach(spec):
+    """
+    :param spec: (block name, shape, dtype), as returned by _publish
+    :return: SharedMemory, zero-copy array view of the block
+    """
+    from multiprocessing import shared_memory
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _release(blocks, unlink):
+    for shm in blocks:
+        shm.close()
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedStack():
+    """
+    Columns of a stack published in shared memory. Numeric, boolean and datetime columns are published as is; other
+    columns are published as integer codes (see pandas.factorize) and restored when attached. The index is not
+    published: rows are addressed by position.
+    """
+
+    def __init__(self, stack, columns=None):
+        """
+        :param stack: CoreStack, Profile or pandas.DataFrame
+        :param columns: list of string, optional. Default all the columns
+        """
+        if columns is None:
+            columns = list(stack.columns)
+        self._blocks = []
+        specs = []
+        try:
+            for column in columns:
+                values = stack[column].values
+                if isinstance(stack[column].dtype, np.dtype) and values.dtype.kind in 'biufcmM':
+                    categories = None
+                    missing = None
+                else:
+                    values, categories = pd.factorize(values)
+                    categories = np.asarray(categories, dtype=object)
+                    # missing values are restored as None if the column only holds None as missing value
+                    isnull = pd.isnull(stack[column].values)
+                    missing = None if isnull.any() and all(v is None for v in stack[column].values[isnull]) \
+                        else np.nan
+                shm, spec = _publish(values)
+                self._blocks.append(shm)
+                specs.append((column, spec, categories, missing))
+        except Exception:
+            _release(self._blocks, unlink=True)
+            raise
+        self.handle = {'n_row': len(stack), 'columns': specs}
+        instrument.count('shared_bytes', sum(shm.size for shm in self._blocks))
+
+    @property
+    def nbytes(self):
+        return sum(shm.size for shm in self._blocks)
+
+    def close(self):
+        """
+        Release the shared memory blocks. Views attached by the workers must be closed first.
+        """
+        _release(self._blocks, unlink=True)
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class StackView():
+    """
+    View of a SharedStack attached in a worker
+    """
+
+    def __init__(self, handle):
+        self.n_row = handle['n_row']
+        self._blocks = []
+        self._columns = {}
+        try:
+            for column, spec, categories, missing in handle['columns']:
+                shm, values = _attach(spec)
+                self._blocks.append(shm)
+                self._columns[column] = (values, categories, missing)
+        except Exception:
+            _release(self._blocks, unlink=False)
+            raise
+
+    @property
+    def columns(self):
+        return list(self._columns.keys())
+
+    def column(self, column):
+        """
+        :return: np.array, zero-copy view of a numeric column, integer codes (-1 if missing) for other columns. The view
+            must not be used once the StackView is closed.
+        """
+        return self._columns[column][0]
+
+    def frame(self, rows=None, columns=None):
+        """
+        :param rows: array of int or boolean, optional. Rows to select, default all rows
+        :param columns: list of string, optional. Default all the columns
+        :return: pandas.DataFrame, copy of the selected rows
+        """
+        if columns is None:
+            columns = self.columns
+        data = {}
+        for column in columns:
+            values, categories, missing = self._columns[column]
+            values = values if rows is None else values[rows]
+            if categories is not None:
+                codes = values
+                values = categories[np.where(codes < 0, 0, codes)] if len(categories) else \
+                    np.full(len(codes), missing, dtype=object)
+                if (codes < 0).any():
+                    values[codes < 0] = missing
+            elif rows is None:
+                values = values.copy()
+            data[column] = values
+        return pd.DataFrame(data, columns=columns)
+
+    def close(self):
+        _release(self._blocks, unlink=False)
+        self._blocks = []
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach(handle):
+    """
+    :param handle: SharedStack.handle
+    :return: StackView
+    """
+    return StackView(handle)
+
+
+class SharedArrays():
+    """
+    Arrays published in shared memory. The arrays attribute holds views of the shared arrays in the publisher, valid
+    until the SharedArrays is closed.
+    """
+
+    def __init__(self, arrays):
+        """
+        :param arrays: list of array
+        """
+        self._blocks = []
+        self.handle = []
+        self.arrays = []
+        try:
+            for x in arrays:
+                shm, spec = _publish(np.asarray(x))
+                self._blocks.append(shm)
+                self.handle.append(spec)
+                self.arrays.append(np.ndarray(spec[1], dtype=spec[2], buffer=shm.buf))
+        except Exception:
+            _release(self._blocks, unlink=True)
+            raise
+
+    def close(self):
+        self.arrays = []
+        _release(self._blocks, unlink=True)
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def attach_arrays(handle):
+    """
+    :param handle: SharedArrays.handle
+    :return: list of SharedMemory, list of zero-copy array views. SharedMemory must be closed once the views are no
+        longer used.
+    """
+    blocks, arrays = [], []
+    try:
+        for spec in handle:
+            shm, x = _attach(spec)
+            blocks.append(shm)
+            arrays.append(x)
+    except Exception:
+        _release(blocks, unlink=False)
+        raise
+    return blocks, arrays
+
+
+def reference(func):
+    """
+    Most pysic modules override __name__, so that their functions cannot be pickled by reference to func.__module__;
+    such functions are sent to the workers as (module, qualified name), taken from the module spec. The module of a
+    decorated function is the module of the wrapped function (functools.wraps), its qualified name the one of the
+    decorated function.
+
+    :return: func or (module name, qualified name)
+    """
+    import inspect
+    spec = getattr(inspect.unwrap(func), '__globals__', {}).get('__spec__')
+    if spec is None or spec.name == func.__module__:
+        return func
+    return spec.name, func.__qualname__
+
+
+def resolve(func):
+    """
+    :param func: function or (module name, qualified name), as returned by reference
+    :return: function
+    """
+    if not isinstance(func, tuple):
+        return func
+    import importlib
+    module, qualname = func
+    func = importlib.import_module(module)
+    for attr in qualname.split('.'):
+        func = getattr(func, attr)
+    return func
+
+
+def _run_partition(func, handle, rows, columns, args, kwargs):
+    with attach(handle) as view:
+        stack = view.frame(rows, columns)
+    return resolve(func)(stack, *args, **kwargs)
+
+
+@instrument.timed('map_partitions')
+def map_partitions(func, stack, partitions, n_worker=n_worker, columns=None, args=None, **kwargs):
+    """
+    Apply func to row partitions of a stack in a pool of worker processes. The stack is published once in shared
+    memory; each task only sends the row positions of its partition.
+
+    :param func: function func(stack, *args, **kwargs), defined at module level. stack is a pandas.DataFrame holding
+        the rows of the partition, with a RangeIndex
+    :param stack: CoreStack, Profile or pandas.DataFrame
+    :param partitions: list of array of int, row positions of each partition
+    :param n_worker: int, number of worker processes. Default os.cpu_count(); with 1 partitions are processed in the
+        current process, without shared memory
+    :param columns: list of string, optional. Columns sent to the workers, default all the columns
+    :param args: list of tuple, optional. Positional arguments of func for each partition
+    :param kwargs: keyword arguments of func
+    :return: list, result of func for each partition, in the order of partitions
+    """
+    if n_worker is None:
+        n_worker = os.cpu_count() or 1
+    n_worker = max(1, min(n_worker, len(partitions)))
+    instrument.count('partitions', len(partitions))
+
+    if columns is None:
+        columns = list(stack.columns)
+    if args is None:
+        args = [()] * len(partitions)
+    if n_worker == 1:
+        return [func(pd.DataFrame(stack[columns]).iloc[rows].reset_index(drop=True), *_args, **kwargs)
+                for rows, _args in zip(partitions, args)]
+
+    from concurrent.futures import ProcessPoolExecutor
+    with SharedStack(stack, columns=columns) as shared_stack:
+        logger.debug('%d bytes published in shared memory', shared_stack.nbytes)
+        with ProcessPoolExecutor(max_workers=n_worker) as executor:
+            futures = [executor.submit(_run_partition, reference(func), shared_stack.handle, np.asarray(rows), columns,
+                                       _args, kwargs)
+                       for rows, _args in zip(partitions, args)]
+            return [future.result() for future in futures]
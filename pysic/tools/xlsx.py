@@ -0,0 +1,534 @@
+#! /usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+pysic.tools.xlsx : fast reader of the xlsx ice core spreadsheets
+
+openpyxl builds a Cell object, with its style, for each cell of the workbook, even for the sheets that are not used.
+This reader opens the xlsx zip archive directly, parses the shared-strings table once per workbook and stream-parses
+only the sheets requested, with the incremental expat parser. Sheets are parsed when the workbook is opened, so that
+layout errors are raised there. Cell values are stored per sheet in a 2-D numpy array (object dtype), from which the
+profile readers take whole columns (Worksheet.block).
+
+Values follow openpyxl (load_workbook with data_only=False): numbers are int or float, cells with a date or time
+number format are converted to datetime (see openpyxl.utils.datetime.from_excel), formulas are returned as '=...'
+strings. Worksheet implements the part of the openpyxl worksheet interface used by pysic ([], cell, iter_rows,
+iter_cols, max_row, max_column, title); max_row and max_column count the cells openpyxl creates (cells written in the
+sheet, merged cells, cells holding a comment or a hyperlink, and cells accessed).
+
+Layouts the reader does not handle (shared or array formulas, workbook parts not found, very large sheets) raise
+LayoutError: the caller then falls back on openpyxl. The reader is enabled by default; set the environment variable
+PYSIC_FAST_XLSX=0 to disable it.
+
+USAGE:
+    from pysic.tools import xlsx
+    wb = xlsx.load_workbook(ic_path, sheets=['summary', 'S_ice'])
+    ws = wb['S_ice']
+    ws['C1'].value
+    salinity = ws.block(8, ws.max_row, 4, 4)[:, 0]  # numpy array of object
+    wb.close()
+"""
+
+__author__ = "Marc Oggier"
+__license__ = "GPL"
+
+__maintainer__ = "Marc Oggier"
+__contact__ = "Marc Oggier"
+__email__ = "moggier@alaska.edu"
+__status__ = "dev"
+__date__ = "2026/10/18"
+__comment__ = "xlsx.py contains a fast reader of xlsx spreadsheets"
+
+__all__ = ["ENABLED", "LayoutError", "enable", "disable", "load_workbook", "Workbook", "Worksheet"]
+
+import logging
+import os
+import posixpath
+import re
+import warnings
+import zipfile
+from xml.parsers import expat
+
+import numpy as np
+
+from pysic.tools import instrument
+
+ENABLED = os.environ.get('PYSIC_FAST_XLSX', '1') not in ['', '0']
+
+MAX_CELLS = 2 ** 24  # larger sheets are left to openpyxl
+CHUNK_SIZE = 2 ** 16  # bytes fed to the parser at once
+
+logger = logging.getLogger(__name__)
+
+_coordinate = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+
+
+class LayoutError(Exception):
+    """
+    Spreadsheet layout not handled by the fast reader
+    """
+    pass
+
+
+def enable():
+    """
+    Read the spreadsheets with the fast reader, openpyxl for the layouts it does not handle
+    """
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    """
+    Read the spreadsheets with openpyxl
+    """
+    global ENABLED
+    ENABLED = False
+
+
+def _column_index(letters, cache={}):
+    try:
+        return cache[letters]
+    except KeyError:
+        index = 0
+        for letter in letters.upper():
+            index = index * 26 + ord(letter) - 64
+        cache[letters] = index
+        return index
+
+
+def _coordinate_to_tuple(coordinate):
+    """
+    :param coordinate: string, e.g. 'C4'
+    :return: (row, column)
+    """
+    match = _coordinate.match(coordinate)
+    if match is None:
+        raise LayoutError('%s is not a cell coordinate' % coordinate)
+    return int(match.group(2)), _column_index(match.group(1))
+
+
+def _range_to_tuples(ref):
+    """
+    :param ref: string, cell or range of cells, e.g. 'A1:B2'
+    :return: list of (row, column) of the cells in the range
+    """
+    if ':' not in ref:
+        return [_coordinate_to_tuple(ref)]
+    first, last = ref.split(':', 1)
+    (row_min, col_min), (row_max, col_max) = _coordinate_to_tuple(first), _coordinate_to_tuple(last)
+    return [(row, col) for row in range(row_min, row_max + 1) for col in range(col_min, col_max + 1)]
+
+
+def _parse(stream, handlers):
+    """
+    Parse a xml stream incrementally with expat
+
+    :param stream: file-like object
+    :param handlers: dict {handler name: function}, e.g. {'StartElementHandler': start}
+    """
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    for name, handler in handlers.items():
+        setattr(parser, name, handler)
+    while True:
+        data = stream.read(CHUNK_SIZE)
+        parser.Parse(data, not data)
+        if not data:
+            break
+
+
+def _local(name):
+    return name.rpartition(':')[2]
+
+
+def _relationships(archive, part):
+    """
+    :return: dict {relationship id: (type, target path in the archive)} of a part
+    """
+    directory, filename = posixpath.split(part)
+    rels_path = posixpath.join(directory, '_rels', filename + '.rels')
+    rels = {}
+    if rels_path not in archive.namelist():
+        return rels
+
+    def start(name, attrs):
+        if _local(name) == 'Relationship' and attrs.get('TargetMode') != 'External':
+            target = attrs['Target']
+            target = target.lstrip('/') if target.startswith('/') else \
+                posixpath.normpath(posixpath.join(directory, target))
+            rels[attrs['Id']] = (attrs['Type'], target)
+
+    with archive.open(rels_path) as stream:
+        _parse(stream, {'StartElementHandler': start})
+    return rels
+
+
+class _Cell():
+    """
+    Cell returned by the worksheet interface
+    """
+    __slots__ = ('row', 'column', 'value')
+
+    def __init__(self, row, column, value):
+        self.row = row
+        self.column = column
+        self.value = value
+
+
+class Worksheet():
+    """
+    Values of a sheet, in a 2-D numpy array of object: cell (row, column) is values[row - 1, column - 1]
+    """
+
+    def __init__(self, title, values, max_row, max_column):
+        self.title = title
+        self.values = values
+        self._max_row = max_row
+        self._max_column = max_column
+
+    @property
+    def max_row(self):
+        return self._max_row
+
+    @property
+    def max_column(self):
+        return self._max_column
+
+    def _touch(self, row, column):
+        # openpyxl creates the cells accessed
+        self._max_row = max(self._max_row, row)
+        self._max_column = max(self._max_column, column)
+
+    def cell(self, row, column):
+        """
+        :param row: int, 1-based
+        :param column: int, 1-based
+        :return: cell, with attributes row, column and value
+        """
+        if row < 1 or column < 1:
+            raise ValueError('Row or column values must be at least 1')
+        self._touch(row, column)
+        if row <= self.values.shape[0] and column <= self.values.shape[1]:
+            return _Cell(row, column, self.values[row - 1, column - 1])
+        return _Cell(row, column, None)
+
+    def __getitem__(self, coordinate):
+        return self.cell(*_coordinate_to_tuple(coordinate))
+
+    def block(self, min_row, max_row, min_col, max_col):
+        """
+        Values of a block of cells, without building cells
+
+        :return: numpy.ndarray of object, shape (max_row - min_row + 1, max_col - min_col + 1)
+        """
+        n_row = max(max_row - min_row + 1, 0)
+        n_col = max(max_col - min_col + 1, 0)
+        if n_row and n_col:
+            self._touch(max_row, max_col)
+        block = np.full((n_row, n_col), None, dtype=object)
+        values = self.values[min_row - 1:max_row, min_col - 1:max_col]
+        block[:values.shape[0], :values.shape[1]] = values
+        return block
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
+        min_row, max_row = min_row or 1, max_row or self.max_row
+        min_col, max_col = min_col or 1, max_col or self.max_column
+        block = self.block(min_row, max_row, min_col, max_col)
+        for i_row, values in enumerate(block):
+            if values_only:
+                yield tuple(values)
+            else:
+                yield tuple(_Cell(min_row + i_row, min_col + i_col, value) for i_col, value in enumerate(values))
+
+    def iter_cols(self, min_col=None, max_col=None, min_row=None, max_row=None, values_only=False):
+        min_row, max_row = min_row or 1, max_row or self.max_row
+        min_col, max_col = min_col or 1, max_col or self.max_column
+        block = self.block(min_row, max_row, min_col, max_col)
+        for i_col, values in enumerate(block.T):
+            if values_only:
+                yield tuple(values)
+            else:
+                yield tuple(_Cell(min_row + i_row, min_col + i_col, value) for i_row, value in enumerate(values))
+
+
+class _SheetParser():
+    """
+    Stream parser of a sheet xml, cell values converted as by openpyxl.worksheet._reader.WorkSheetParser
+    """
+
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.cells = []
+        self.refs = []  # merged cells and cells holding a hyperlink
+        self.row = 0
+        self.column = 0
+        self._cell = None
+        self._text = None
+        self._inline = None
+        self._depth = []
+
+    def start(self, name, attrs):
+        name = _local(name)
+        self._depth.append(name)
+        if name == 'c':
+            coordinate = attrs.get('r')
+            if coordinate:
+                row, self.column = _coordinate_to_tuple(coordinate)
+            else:
+                self.column += 1
+                row = self.row
+            self._cell = [row, self.column, attrs.get('t', 'n'), int(attrs.get('s', 0) or 0), None, None]
+        elif name == 'row':
+            row = attrs.get('r')
+            self.row = int(float(row)) if row else self.row + 1
+            self.column = 0
+        elif self._cell is not None:
+            if name == 'v' and self._inline is None:
+                self._text = []
+            elif name == 'f':
+                if attrs.get('t') in ['shared', 'array', 'dataTable']:
+                    raise LayoutError('%s formula' % attrs.get('t'))
+                self._text = []
+            elif name == 'is':
+                self._inline = []
+            elif name == 't' and self._inline is not None and self._depth[-2] in ['is', 'r']:
+                self._text = []
+        elif name == 'mergeCell' or name == 'hyperlink':
+            self.refs.append((name, attrs.get('ref')))
+
+    def end(self, name):
+        name = _local(name)
+        self._depth.pop()
+        if self._cell is None:
+            return
+        if name == 'v' and self._text is not None:
+            self._cell[4] = ''.join(self._text)
+            self._text = None
+        elif name == 'f':
+            self._cell[5] = '=' + ''.join(self._text)
+            self._text = None
+        elif name == 't' and self._text is not None:
+            self._inline.extend(self._text)
+            self._text = None
+        elif name == 'c':
+            self.cells.append(self._value(*self._cell))
+            self._cell = None
+            self._inline = None
+
+    def text(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def _value(self, row, column, data_type, style_id, value, formula):
+        if formula is not None:
+            return row, column, formula
+        if data_type == 'inlineStr':
+            return row, column, ''.join(self._inline) if self._inline is not None else None
+        value = value or None
+        if value is None:
+            return row, column, None
+        if data_type == 'n':
+            value = float(value) if '.' in value or 'E' in value or 'e' in value else int(value)
+            if style_id in self.workbook.date_styles:
+                from openpyxl.utils.datetime import from_excel
+                try:
+                    value = from_excel(value, self.workbook.epoch,
+                                       timedelta=style_id in self.workbook.timedelta_styles)
+                except (OverflowError, ValueError):
+                    warnings.warn('Cell %d, %d is marked as a date but the serial value %s is outside the limits for '
+                                  'dates. The cell will be treated as an error.' % (row, column, value))
+                    value = '#VALUE!'
+        elif data_type == 's':
+            value = self.workbook.shared_strings[int(value)]
+        elif data_type == 'b':
+            value = bool(int(value))
+        elif data_type == 'd':
+            from openpyxl.utils.datetime import from_ISO8601
+            value = from_ISO8601(value)
+        return row, column, value
+
+
+class Workbook():
+    """
+    xlsx workbook opened by the fast reader
+    """
+
+    def __init__(self, filename, sheets=None):
+        """
+        :param filename: string or file-like object
+        :param sheets: list of string, optional. Sheets to read, default all the sheets
+        """
+        try:
+            self._archive = zipfile.ZipFile(filename)
+        except zipfile.BadZipFile as e:
+            raise LayoutError(str(e))
+        self._shared_strings = None
+        self._worksheets = {}
+        try:
+            self._read_workbook()
+            self.sheetnames = list(self._sheets.keys())
+            for sheet in self.sheetnames:
+                if sheets is None or sheet in sheets:
+                    self._worksheets[sheet] = self._read_sheet(sheet)
+        except (KeyError, ValueError, expat.ExpatError) as e:
+            raise LayoutError('workbook not read: %s' % e)
+        finally:
+            self.close()
+
+    def _read_workbook(self):
+        archive = self._archive
+        names = archive.namelist()
+        package_rels = _relationships(archive, '')
+        part = next((target for _type, target in package_rels.values() if _type.endswith('/officeDocument')),
+                    'xl/workbook.xml')
+        if part not in names:
+            raise KeyError(part)
+        self._rels = _relationships(archive, part)
+
+        sheets = {}
+        self.epoch_1904 = False
+
+        def start(name, attrs):
+            name = _local(name)
+            if name == 'sheet':
+                rel_id = next(value for key, value in attrs.items() if _local(key) == 'id')
+                sheets[attrs['name']] = self._rels[rel_id][1]
+            elif name == 'workbookPr':
+                self.epoch_1904 = attrs.get('date1904') in ['1', 'true']
+
+        with archive.open(part) as stream:
+            _parse(stream, {'StartElementHandler': start})
+        self._sheets = sheets
+
+        from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+        self.epoch = CALENDAR_MAC_1904 if self.epoch_1904 else CALENDAR_WINDOWS_1900
+        self._styles()
+
+    def _part(self, rel_type):
+        return next((target for _type, target in self._rels.values() if _type.endswith(rel_type)), None)
+
+    def _styles(self):
+        """
+        Index the cell styles with a date or a time number format, as openpyxl.styles.stylesheet
+        """
+        from openpyxl.styles.numbers import BUILTIN_FORMATS_REVERSE, builtin_format_code, is_date_format, \
+            is_timedelta_format
+
+        custom = {}
+        num_fmt_ids = []
+        in_cell_xfs = []
+
+        def start(name, attrs):
+            name = _local(name)
+            if name == 'numFmt':
+                custom[int(attrs['numFmtId'])] = attrs['formatCode']
+            elif name == 'cellXfs':
+                in_cell_xfs.append(True)
+            elif name == 'xf' and in_cell_xfs:
+                num_fmt_ids.append(int(attrs.get('numFmtId', 0)))
+
+        def end(name):
+            if _local(name) == 'cellXfs':
+                in_cell_xfs.clear()
+
+        part = self._part('/styles')
+        if part is not None and part in self._archive.namelist():
+            with self._archive.open(part) as stream:
+                _parse(stream, {'StartElementHandler': start, 'EndElementHandler': end})
+
+        self.date_styles = set()
+        self.timedelta_styles = set()
+        for style_id, num_fmt_id in enumerate(num_fmt_ids):
+            if num_fmt_id in custom:
+                fmt = custom[num_fmt_id]
+                if fmt in BUILTIN_FORMATS_REVERSE:
+                    fmt = builtin_format_code(BUILTIN_FORMATS_REVERSE[fmt])
+            else:
+                fmt = builtin_format_code(num_fmt_id)
+            if is_date_format(fmt):
+                self.date_styles.add(style_id)
+            if is_timedelta_format(fmt):
+                self.timedelta_styles.add(style_id)
+
+    @property
+    def shared_strings(self):
+        """
+        Shared-strings table, read on first access and kept for all the sheets
+        """
+        if self._shared_strings is None:
+            from openpyxl.reader.strings import read_string_table
+            part = self._part('/sharedStrings')
+            if part is None or part not in self._archive.namelist():
+                self._shared_strings = []
+            else:
+                with self._archive.open(part) as stream:
+                    self._shared_strings = read_string_table(stream)
+        return self._shared_strings
+
+    @instrument.timed('parse_sheet')
+    def _read_sheet(self, sheet):
+        instrument.annotate(sheet=sheet)
+        part = self._sheets[sheet]
+        parser = _SheetParser(self)
+        with self._archive.open(part) as stream:
+            _parse(stream, {'StartElementHandler': parser.start, 'EndElementHandler': parser.end,
+                            'CharacterDataHandler': parser.text})
+
+        # cells created by openpyxl besides the cells of the sheet: merged cells, cells with hyperlink or comment
+        created = []
+        for kind, ref in parser.refs:
+            if ref:
+                cells = _range_to_tuples(ref)
+                created.extend(cells[1:] if kind == 'mergeCell' else cells)
+        for _type, target in _relationships(self._archive, part).values():
+            if _type.endswith('/comments') and target in self._archive.namelist():
+                def start(name, attrs):
+                    if _local(name) == 'comment':
+                        created.append(_coordinate_to_tuple(attrs['ref']))
+                with self._archive.open(target) as stream:
+                    _parse(stream, {'StartElementHandler': start})
+
+        rows = [cell[0] for cell in parser.cells] + [cell[0] for cell in created]
+        columns = [cell[1] for cell in parser.cells] + [cell[1] for cell in created]
+        max_row, max_column = (max(rows), max(columns)) if rows else (1, 1)
+        n_row = max([cell[0] for cell in parser.cells], default=0)
+        n_column = max([cell[1] for cell in parser.cells], default=0)
+        if n_row * n_column > MAX_CELLS:
+            raise LayoutError('%s: %d x %d cells' % (sheet, n_row, n_column))
+
+        values = np.full((n_row, n_column), None, dtype=object)
+        for row, column, value in parser.cells:
+            values[row - 1, column - 1] = value
+        # merged cells, except the top-left one, are emptied
+        for kind, ref in parser.refs:
+            if kind == 'mergeCell' and ref:
+                for row, column in _range_to_tuples(ref)[1:]:
+                    if row <= n_row and column <= n_column:
+                        values[row - 1, column - 1] = None
+        instrument.count('cells', len(parser.cells))
+        return Worksheet(sheet, values, max_row, max_column)
+
+    def __getitem__(self, sheet):
+        if sheet not in self._worksheets:
+            raise KeyError('Worksheet {0} does not exist.'.format(sheet))
+        return self._worksheets[sheet]
+
+    def __contains__(self, sheet):
+        return sheet in self._worksheets
+
+    def close(self):
+        """
+        Close the archive; the sheets read remain accessible
+        """
+        self._archive.close()
+
+
+def load_workbook(filename, sheets=None):
+    """
+    Open a xlsx workbook with the fast reader
+
+    :param filename: string or file-like object
+    :param sheets: list of string, optional. Sheets to read, default all the sheets
+    :return: Workbook
+    """
+    return Workbook(filename, sheets=sheets)
@@ -52,6 +52,7 @@ setup(
                  'Topic :: Scientific/Engineering :: Physics'],
     packages=packages,
     install_requires=requirements,
+    extras_require={'numba': ['numba'], 'netcdf': ['netCDF4']},
     author='Marc Oggier',
     author_email='moggier@alaska.edu',
     download_url='https://github.com/megavolts/pysic',